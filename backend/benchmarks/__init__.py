@@ -0,0 +1,13 @@
+"""
+Benchmarks for the LAKBAI backend
+Run from the backend directory, e.g. `python -m benchmarks.bench_batch`
+
+    mock_osrm    local OSRM stand-in with latency, failure injection and fixture replay
+    fixtures     Legazpi itinerary workloads and recorded OSRM responses
+    bench_batch  serial vs concurrent /api/routes/batch fan-out
+    bench_load   load test reporting rps, latency percentiles and cache hit rate as JSON
+                 (needs --synthetic until Legazpi fixtures are recorded)
+    bench_serialization  JSON encoder and gzip/brotli cost for a 20-segment batch response
+    bench_recommendations  /api/recommendations/batch vs one call per route
+    check_redis_cache  smoke check of the redis route cache backend against fakeredis
+"""
@@ -0,0 +1,66 @@
+"""
+Benchmark /api/routes/batch serial vs concurrent OSRM fan-out
+Points routing_api at a local mock OSRM, so no Cloud Run services are hit
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.mock_osrm import start_mock_osrm
+
+def build_segments(num_stops):
+    """Build a chain of segments between synthetic stops around Legazpi"""
+    stops = [[123.73 + i * 0.004, 13.14 + (i % 3) * 0.003] for i in range(num_stops)]
+    return [
+        {'id': f"stop{i}-stop{i + 1}", 'from': stops[i], 'to': stops[i + 1]}
+        for i in range(num_stops - 1)
+    ]
+
+def time_batch(client, routing_api, segments, concurrency):
+    """Time one cold-cache batch request at the given concurrency"""
+    routing_api.set_batch_concurrency(concurrency)
+    routing_api.route_cache.clear()
+
+    start = time.perf_counter()
+    response = client.post('/api/routes/batch', json={'segments': segments})
+    elapsed = time.perf_counter() - start
+
+    assert response.status_code == 200
+    assert len(response.get_json()) == len(segments)
+    return elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--stops', type=int, default=12)
+    parser.add_argument('--latency', type=float, default=0.05, help='mock OSRM seconds per request')
+    parser.add_argument('--concurrency', type=int, default=8)
+    args = parser.parse_args()
+
+    mock = start_mock_osrm(latency=args.latency)
+    for name in ('OSRM_CAR_URL', 'OSRM_BICYCLE_URL', 'OSRM_FOOT_URL'):
+        os.environ[name] = mock.url
+    os.environ['ROUTE_CACHE_PATH'] = os.path.join(tempfile.mkdtemp(), 'bench_cache.sqlite3')
+
+    import routing_api
+
+    client = routing_api.app.test_client()
+    segments = build_segments(args.stops)
+    lookups = len(segments) * 3
+
+    serial = time_batch(client, routing_api, segments, 1)
+    concurrent = time_batch(client, routing_api, segments, args.concurrency)
+
+    print(f"{len(segments)} segments x 3 profiles = {lookups} OSRM lookups, {args.latency * 1000:.0f} ms mock latency")
+    print(f"{'serial (concurrency=1)':<32}{serial * 1000:8.1f} ms")
+    print(f"{f'concurrent (concurrency={args.concurrency})':<32}{concurrent * 1000:8.1f} ms")
+    print(f"speedup: {serial / concurrent:.1f}x")
+
+    mock.shutdown()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,232 @@
+"""
+Load test for the routing API
+Replays Legazpi itinerary workloads against /api/route and /api/routes/batch
+and reports requests per second, latency percentiles and cache hit rate.
+routing_api runs in-process against a local mock OSRM, or pass --target to
+drive an already running routing API.
+
+No recorded Legazpi responses ship with the repo (recording needs the OSRM
+services, see benchmarks/fixtures.py), so run with --synthetic, which lets
+the mock generate routes:
+
+    python -m benchmarks.bench_load --synthetic --clients 8 --passes 2
+
+Once legazpi_routes.json has been recorded, drop --synthetic to replay it;
+without the file and without --synthetic the benchmark exits
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fixtures import DEFAULT_FIXTURE_PATH, load_fixtures, load_itineraries
+from benchmarks.mock_osrm import start_mock_osrm
+
+PROFILES = ['car', 'bicycle', 'foot']
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+
+def start_routing_api(mock, cache_path):
+    """Serve routing_api on a local threaded server backed by the mock OSRM"""
+    for name in ('OSRM_CAR_URL', 'OSRM_BICYCLE_URL', 'OSRM_FOOT_URL'):
+        os.environ[name] = mock.url
+    os.environ['ROUTE_CACHE_PATH'] = cache_path
+
+    from werkzeug.serving import WSGIRequestHandler, make_server
+    import routing_api
+
+    class QuietHandler(WSGIRequestHandler):
+        def log_request(self, *args, **kwargs):
+            pass
+
+    server = make_server('127.0.0.1', 0, routing_api.app, threaded=True, request_handler=QuietHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+def build_tasks(itineraries, mode, passes, seed):
+    """
+    One task per itinerary per pass, shuffled so clients overlap on popular pairs
+    'route' tasks request each leg with /api/route, 'batch' tasks send the whole
+    itinerary to /api/routes/batch, 'mixed' alternates between them
+    """
+    rng = random.Random(seed)
+    tasks = []
+    for _ in range(passes):
+        run = list(itineraries)
+        rng.shuffle(run)
+        for index, itinerary in enumerate(run):
+            kind = mode if mode != 'mixed' else ('route', 'batch')[index % 2]
+            tasks.append((kind, itinerary))
+    return tasks
+
+def run_task(session, base_url, kind, itinerary, profiles):
+    """Replay one itinerary and return (endpoint, seconds, ok) samples"""
+    coords = itinerary['coords']
+    samples = []
+    if kind == 'batch':
+        segments = [
+            {'id': f"{a}-{b}", 'from': coords[i], 'to': coords[i + 1]}
+            for i, (a, b) in enumerate(zip(itinerary['poi_ids'], itinerary['poi_ids'][1:]))
+        ]
+        requests_to_send = [('/api/routes/batch', {'segments': segments, 'profiles': profiles})]
+    else:
+        requests_to_send = [
+            ('/api/route', {'from': coords[i], 'to': coords[i + 1], 'profiles': profiles})
+            for i in range(len(coords) - 1)
+        ]
+
+    for endpoint, body in requests_to_send:
+        start = time.perf_counter()
+        try:
+            response = session.post(base_url + endpoint, json=body, timeout=60)
+            ok = response.status_code == 200
+        except requests.RequestException:
+            ok = False
+        samples.append((endpoint, time.perf_counter() - start, ok))
+    return samples
+
+def cache_counters(base_url):
+    info = requests.get(base_url + '/api/cache/info', timeout=10).json()
+    return info.get('hits', 0) + info.get('stale_hits', 0), info.get('misses', 0)
+
+def summarize(latencies, errors, elapsed):
+    values = np.array(latencies) * 1000
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'rps': round(len(latencies) / elapsed, 2) if elapsed > 0 else None,
+        'p50_ms': round(float(np.percentile(values, 50)), 2),
+        'p90_ms': round(float(np.percentile(values, 90)), 2),
+        'p95_ms': round(float(np.percentile(values, 95)), 2),
+        'p99_ms': round(float(np.percentile(values, 99)), 2),
+        'max_ms': round(float(values.max()), 2)
+    }
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+def compare(result, baseline):
+    """Print throughput and latency changes against a previous result file"""
+    print(f"\nvs baseline {baseline.get('revision') or '?'} ({baseline.get('timestamp')})")
+    for endpoint, current in result['endpoints'].items():
+        previous = baseline.get('endpoints', {}).get(endpoint)
+        if not previous:
+            continue
+        for field in ('rps', 'p50_ms', 'p95_ms', 'p99_ms'):
+            if previous.get(field):
+                change = (current[field] - previous[field]) / previous[field] * 100
+                print(f"  {endpoint:<20}{field:<8}{previous[field]:>10} -> {current[field]:<10} ({change:+.1f}%)")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--target', help='base URL of a running routing API (skips the mock)')
+    parser.add_argument('--clients', type=int, default=8, help='concurrent simulated users')
+    parser.add_argument('--passes', type=int, default=2, help='times every itinerary is replayed')
+    parser.add_argument('--mode', choices=['route', 'batch', 'mixed'], default='mixed')
+    parser.add_argument('--profiles', nargs='+', default=PROFILES)
+    parser.add_argument('--latency', type=float, default=0.05, help='mock OSRM seconds per request')
+    parser.add_argument('--jitter', type=float, default=0.02, help='mock OSRM +/- latency seconds')
+    parser.add_argument('--failure-rate', type=float, default=0.0, help='mock OSRM 503 rate')
+    parser.add_argument('--no-route-rate', type=float, default=0.0, help='mock OSRM NoRoute rate')
+    parser.add_argument('--fixtures', default=DEFAULT_FIXTURE_PATH, help='recorded OSRM responses for the mock to replay')
+    parser.add_argument('--synthetic', action='store_true', help='let the mock generate routes instead of replaying fixtures')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='write results JSON here (default: benchmarks/results/load-<time>.json)')
+    parser.add_argument('--baseline', help='previous results JSON to compare against')
+    args = parser.parse_args()
+
+    mock = server = None
+    if args.target:
+        base_url = args.target.rstrip('/')
+    else:
+        try:
+            fixtures = None if args.synthetic else load_fixtures(args.fixtures)
+        except FileNotFoundError as e:
+            sys.exit(f"{e}, or pass --synthetic to benchmark against generated routes")
+        mock = start_mock_osrm(latency=args.latency, jitter=args.jitter, failure_rate=args.failure_rate,
+                               no_route_rate=args.no_route_rate, fixtures=fixtures, seed=args.seed)
+        server, base_url = start_routing_api(mock, os.path.join(tempfile.mkdtemp(), 'bench_cache.sqlite3'))
+
+    itineraries = load_itineraries()
+    tasks = build_tasks(itineraries, args.mode, args.passes, args.seed)
+    local = threading.local()
+
+    def worker(task):
+        if not hasattr(local, 'session'):
+            local.session = requests.Session()
+        return run_task(local.session, base_url, *task, args.profiles)
+
+    hits_before, misses_before = cache_counters(base_url)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.clients) as executor:
+        samples = [sample for task_samples in executor.map(worker, tasks) for sample in task_samples]
+    elapsed = time.perf_counter() - start
+    hits_after, misses_after = cache_counters(base_url)
+
+    hits, misses = hits_after - hits_before, misses_after - misses_before
+    endpoints = {}
+    for endpoint in sorted({sample[0] for sample in samples}):
+        selected = [sample for sample in samples if sample[0] == endpoint]
+        endpoints[endpoint] = summarize([s[1] for s in selected], sum(not s[2] for s in selected), elapsed)
+
+    result = {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'revision': git_revision(),
+        'python': platform.python_version(),
+        'config': {k: v for k, v in vars(args).items() if k not in ('output', 'baseline')},
+        'itineraries': len(itineraries),
+        'elapsed_s': round(elapsed, 3),
+        'overall': summarize([s[1] for s in samples], sum(not s[2] for s in samples), elapsed),
+        'endpoints': endpoints,
+        'cache': {
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': round(hits / (hits + misses), 4) if hits + misses else None
+        },
+        'osrm': {'calls': mock.calls, 'injected_failures': mock.failures, 'fixture_hits': mock.fixture_hits} if mock else None
+    }
+
+    print(f"{len(tasks)} itinerary replays by {args.clients} clients in {elapsed:.2f} s")
+    print(f"{'endpoint':<20}{'requests':>9}{'errors':>8}{'rps':>9}{'p50':>9}{'p95':>9}{'p99':>9}")
+    for endpoint, stats in list(endpoints.items()) + [('overall', result['overall'])]:
+        print(f"{endpoint:<20}{stats['requests']:>9}{stats['errors']:>8}{stats['rps']:>9}"
+              f"{stats['p50_ms']:>9}{stats['p95_ms']:>9}{stats['p99_ms']:>9}")
+    if result['cache']['hit_rate'] is not None:
+        print(f"cache hit rate: {result['cache']['hit_rate'] * 100:.1f}% ({hits} hits, {misses} misses)")
+    if mock:
+        print(f"mock OSRM calls: {mock.calls}")
+
+    output = args.output or os.path.join(RESULTS_DIR, f"load-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(result, f, indent=2)
+    print(f"💾 Results written to {output}")
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            compare(result, json.load(f))
+
+    if server:
+        server.shutdown()
+    if mock:
+        mock.shutdown()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""
+Benchmark /api/recommendations/batch against one /api/recommendations call per route
+Routes are prefixes of the Legazpi itinerary workload; the recommendation
+cache is cleared before each run so both sides compute every route
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fixtures import load_itineraries
+
+def build_routes(num_routes, seed):
+    """Distinct itinerary prefixes of 1-4 POIs"""
+    rng = random.Random(seed)
+    prefixes = sorted({
+        tuple(itinerary['poi_ids'][:length])
+        for itinerary in load_itineraries()
+        for length in range(1, min(4, len(itinerary['poi_ids'])) + 1)
+    })
+    rng.shuffle(prefixes)
+    return [list(prefix) for prefix in prefixes[:num_routes]]
+
+def time_singles(client, recommendation_api, routes, num_recs):
+    recommendation_api.recommendation_cache.clear()
+    start = time.perf_counter()
+    for route in routes:
+        response = client.post('/api/recommendations', json={'current_route': route, 'num_recommendations': num_recs})
+        assert response.status_code == 200
+    return time.perf_counter() - start
+
+def time_batch(client, recommendation_api, routes, num_recs):
+    recommendation_api.recommendation_cache.clear()
+    body = {
+        'requests': [{'id': str(i), 'current_route': route} for i, route in enumerate(routes)],
+        'num_recommendations': num_recs
+    }
+    start = time.perf_counter()
+    response = client.post('/api/recommendations/batch', json=body)
+    elapsed = time.perf_counter() - start
+    assert response.status_code == 200
+    assert response.get_json()['count'] == len(routes)
+    return elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--routes', type=int, default=50)
+    parser.add_argument('--num-recs', type=int, default=10)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    # No routing API is running, so leave route prefetching off
+    os.environ['ROUTING_API_URL'] = ''
+    os.chdir(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    with contextlib.redirect_stdout(io.StringIO()):
+        import recommendation_api
+        city = recommendation_api.RECOMMENDER_DEFAULT_CITY
+        recommendation_api.start_recommender_warmup(city)
+        recommendation_api.recommenders.wait(city)
+    if recommendation_api.get_recommender(city) is None:
+        sys.exit(f"Recommender failed to load: {recommendation_api.recommenders.state(city)['last_error']}")
+
+    client = recommendation_api.app.test_client()
+    routes = build_routes(args.routes, args.seed)
+
+    # Recommender logging is per route, so keep it out of both timings
+    with contextlib.redirect_stdout(io.StringIO()):
+        singles = time_singles(client, recommendation_api, routes, args.num_recs)
+        batch = time_batch(client, recommendation_api, routes, args.num_recs)
+
+    print(f"{len(routes)} routes, {args.num_recs} recommendations each")
+    print(f"{'single calls':<16}{singles * 1000:10.1f} ms{len(routes) / singles:10.1f} routes/s")
+    print(f"{'one batch call':<16}{batch * 1000:10.1f} ms{len(routes) / batch:10.1f} routes/s")
+    print(f"speedup: {singles / batch:.1f}x")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+"""
+Benchmark JSON serialization and compression of a batch route response
+Builds a /api/routes/batch response of 20 segments x 3 profiles with full
+GeoJSON geometries and times Flask's default JSON provider against the
+orjson-backed FastJSONProvider, then reports body sizes per content coding
+"""
+
+import argparse
+import gzip
+import os
+import random
+import statistics
+import sys
+import time
+
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from http_responses import FastJSONProvider, brotli, orjson
+
+def build_batch_response(num_segments, points_per_route, seed):
+    """Batch response shaped like /api/routes/batch, with random-walk geometries around Legazpi"""
+    rng = random.Random(seed)
+    results = {}
+    for i in range(num_segments):
+        segment = {}
+        for profile, speed in (('car', 30), ('bicycle', 15), ('foot', 5)):
+            lng, lat = 123.73 + i * 0.004, 13.14 + (i % 3) * 0.003
+            coordinates = []
+            for _ in range(points_per_route):
+                lng += rng.uniform(-0.0002, 0.0004)
+                lat += rng.uniform(-0.0002, 0.0004)
+                coordinates.append([round(lng, 6), round(lat, 6)])
+            distance = round(rng.uniform(800, 4000), 1)
+            segment[profile] = {
+                'duration': round(distance / 1000 / speed * 60),
+                'distance': distance,
+                'geometry': {'type': 'LineString', 'coordinates': coordinates}
+            }
+        segment['distance_formatted'] = f"{distance / 1000:.1f} km"
+        results[f"stop{i}-stop{i + 1}"] = segment
+    return results
+
+def time_jsonify(app, payload, repeat):
+    """Median milliseconds for app.json.response(payload).get_data()"""
+    timings = []
+    with app.app_context():
+        for _ in range(repeat):
+            start = time.perf_counter()
+            body = app.json.response(payload).get_data()
+            timings.append(time.perf_counter() - start)
+    return statistics.median(timings) * 1000, body
+
+def time_call(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings) * 1000, result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--segments', type=int, default=20)
+    parser.add_argument('--points', type=int, default=400, help='geometry coordinates per route')
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--gzip-level', type=int, default=4)
+    parser.add_argument('--brotli-quality', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    payload = build_batch_response(args.segments, args.points, args.seed)
+
+    baseline_app = Flask('baseline')
+    baseline_app.json = DefaultJSONProvider(baseline_app)
+    fast_app = Flask('fast')
+    fast_app.json = FastJSONProvider(fast_app)
+
+    baseline_ms, baseline_body = time_jsonify(baseline_app, payload, args.repeat)
+    fast_ms, fast_body = time_jsonify(fast_app, payload, args.repeat)
+
+    print(f"{args.segments} segments x 3 profiles, {args.points} coordinates per route")
+    print(f"{'serializer':<28}{'median ms':>10}{'bytes':>12}")
+    print(f"{'json (Flask default)':<28}{baseline_ms:>10.2f}{len(baseline_body):>12}")
+    if orjson is None:
+        print('orjson is not installed; FastJSONProvider falls back to the json module')
+    print(f"{'FastJSONProvider':<28}{fast_ms:>10.2f}{len(fast_body):>12}")
+    print(f"speedup: {baseline_ms / fast_ms:.1f}x")
+
+    print(f"\n{'content coding':<28}{'median ms':>10}{'bytes':>12}{'ratio':>8}")
+    codings = [('identity', lambda: fast_body),
+               (f"gzip (level {args.gzip_level})", lambda: gzip.compress(fast_body, args.gzip_level, mtime=0))]
+    if brotli is not None:
+        codings.append((f"br (quality {args.brotli_quality})",
+                        lambda: brotli.compress(fast_body, quality=args.brotli_quality)))
+    else:
+        print('brotli is not installed; only gzip is offered')
+    for name, encode in codings:
+        ms, body = time_call(encode, args.repeat)
+        print(f"{name:<28}{ms:>10.2f}{len(body):>12}{len(body) / len(fast_body):>8.2f}")
+
+if __name__ == '__main__':
+    main()
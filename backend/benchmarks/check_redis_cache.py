@@ -0,0 +1,123 @@
+"""
+Smoke check for the Redis route cache backend
+Runs the RedisRouteCache operations the routing API relies on, then serves
+two /api/route requests through routing_api with ROUTE_CACHE_BACKEND=redis.
+By default both talk to an in-process fakeredis server on a local port, so
+no Redis install is needed; pass --redis-url to check a real server instead
+(its keys under the check prefix are cleared).
+
+    pip install redis fakeredis
+    python -m benchmarks.check_redis_cache
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.mock_osrm import start_mock_osrm
+from route_cache import RedisRouteCache
+
+PREFIX = 'lakbai-check'
+
+def start_fake_redis():
+    """Serve fakeredis over RESP on a free local port; returns (server, url)"""
+    try:
+        from fakeredis import TcpFakeServer
+    except ImportError:
+        sys.exit('fakeredis is not installed (pip install fakeredis), or pass --redis-url')
+    server = TcpFakeServer(('127.0.0.1', 0))
+    threading.Thread(target=server.serve_forever, name='fake-redis', daemon=True).start()
+    host, port = server.server_address
+    return server, f"redis://{host}:{port}/0"
+
+def check(condition, message):
+    if not condition:
+        raise AssertionError(message)
+    print(f"✅ {message}")
+
+def check_cache_operations(url):
+    cache = RedisRouteCache(url, PREFIX, ttl=60, stale_ttl=600, negative_ttl=30, negative_max_ttl=300)
+    cache.clear()
+
+    route = {'duration': 7, 'distance': 2400.5, 'geometry': {'type': 'LineString', 'coordinates': [[1, 2], [3, 4]]}}
+    cache.set('driving:a', route)
+    cache.set_many({'driving:b': {**route, 'duration': 9}, 'driving:c': {**route, 'duration': 11}})
+    check(cache.get('driving:a') == route, 'set/get round-trips a route')
+    check(set(cache.get_many(['driving:a', 'driving:b', 'driving:missing'])) == {'driving:a', 'driving:b'},
+          'get_many returns only cached keys')
+
+    cache.put_entries([('driving:old', json.dumps(route), time.time() - 120)])
+    check(cache.lookup('driving:old') == (route, True), 'entries past ttl are served as stale')
+
+    cache.record_failure('driving:bad')
+    check(cache.backing_off('driving:bad') and not cache.backing_off('driving:a'), 'backing_off reports failing keys')
+    cache.flush_stats()
+    negative_before = cache.info()['negative_hits']
+    cache.backing_off('driving:bad')
+    cache.flush_stats()
+    check(cache.info()['negative_hits'] == negative_before, 'backing_off leaves the counters alone')
+    check(cache.is_failing('driving:bad'), 'is_failing reports failing keys')
+    cache.clear_failures()
+    check(not cache.backing_off('driving:bad'), 'clear_failures forgets failed lookups')
+
+    entries = sorted(key for key, _, _ in cache.iter_entries())
+    check(entries == ['driving:a', 'driving:b', 'driving:c', 'driving:old'], 'iter_entries lists every servable entry')
+
+    cache.record_lookups(3, 2)
+    info = cache.info()
+    check(info['backend'] == 'redis' and info['hits'] >= 3 and info['misses'] >= 2,
+          'flushed hit/miss counters show up in info')
+    check(info['size'] == 4, 'info counts stored routes')
+
+    cache.clear()
+    check(cache.get('driving:a') is None and cache.info()['size'] == 0, 'clear drops every route')
+
+def check_routing_api(url):
+    mock = start_mock_osrm(latency=0)
+    for name in ('OSRM_CAR_URL', 'OSRM_BICYCLE_URL', 'OSRM_FOOT_URL'):
+        os.environ[name] = mock.url
+    os.environ.update(ROUTE_CACHE_BACKEND='redis', ROUTE_CACHE_REDIS_URL=url, ROUTE_CACHE_REDIS_PREFIX=PREFIX,
+                      ROUTE_STORE_PATH=os.path.join(tempfile.mkdtemp(), 'missing.bin'))
+    import routing_api
+
+    client = routing_api.app.test_client()
+    body = {'from': [123.7400, 13.1400], 'to': [123.7500, 13.1500], 'profiles': ['car']}
+    first = client.post('/api/route', json=body)
+    calls = mock.calls
+    second = client.post('/api/route', json=body)
+    check(first.status_code == second.status_code == 200, 'routing_api answers /api/route on the redis backend')
+    check(mock.calls == calls and first.get_json() == second.get_json(), 'the repeat request is served from redis')
+
+    routing_api.route_cache.flush_stats()
+    info = client.get('/api/cache/info').get_json()
+    check(info['backend'] == 'redis' and info['hits'] >= 1 and 'worker' in info,
+          '/api/cache/info reports redis totals and this worker separately')
+    routing_api.route_cache.clear()
+    mock.shutdown()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--redis-url', help='check this server instead of an in-process fakeredis')
+    args = parser.parse_args()
+
+    server = None
+    url = args.redis_url
+    if url is None:
+        server, url = start_fake_redis()
+    print(f"Checking the redis route cache at {url}")
+    try:
+        check_cache_operations(url)
+        check_routing_api(url)
+    finally:
+        if server is not None:
+            server.shutdown()
+    print('🎉 Redis route cache checks passed')
+
+if __name__ == '__main__':
+    main()
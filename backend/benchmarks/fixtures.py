@@ -0,0 +1,141 @@
+"""
+Benchmark fixtures for LAKBAI
+Realistic itinerary workloads from the Legazpi user visit sequences, and
+recorded OSRM responses for their POI pairs that the mock OSRM can replay
+
+The recorded responses are not committed: they have to be fetched from the
+OSRM services. Until they are recorded, run bench_load.py with --synthetic
+
+    python -m benchmarks.fixtures record --output benchmarks/fixtures/legazpi_routes.json
+"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from benchmarks.mock_osrm import fixture_key
+from route_keys import load_poi_coordinates
+
+POI_CSV_PATH = os.path.join(BACKEND_DIR, 'Data', 'POI-Legazpi.csv')
+VISITS_CSV_PATH = os.path.join(BACKEND_DIR, 'Data', 'userVisits-Legazpi-allPOI.csv')
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+DEFAULT_FIXTURE_PATH = os.path.join(FIXTURES_DIR, 'legazpi_routes.json')
+
+FIXTURE_VERSION = 1
+
+def load_itineraries(visits_path=VISITS_CSV_PATH, poi_path=POI_CSV_PATH):
+    """
+    Visit sequences as itineraries of known POIs, in the order they were visited
+    Repeat visits to the same POI in a row are collapsed and single-stop
+    sequences are dropped. Each itinerary is {'id', 'poi_ids', 'coords'}.
+    """
+    pois = load_poi_coordinates(poi_path)
+    sequences = {}
+    with open(visits_path, newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f, delimiter=';'):
+            sequences.setdefault(row['seqID'], []).append((int(row['dateTaken']), int(row['poiID'])))
+
+    itineraries = []
+    for seq_id, visits in sorted(sequences.items()):
+        poi_ids = []
+        for _, poi_id in sorted(visits):
+            if poi_id in pois and (not poi_ids or poi_ids[-1] != poi_id):
+                poi_ids.append(poi_id)
+        if len(poi_ids) >= 2:
+            itineraries.append({
+                'id': seq_id,
+                'poi_ids': poi_ids,
+                'coords': [list(pois[poi_id]) for poi_id in poi_ids]
+            })
+    return itineraries
+
+def itinerary_pairs(itineraries):
+    """Distinct consecutive (from, to) coordinate pairs across itineraries"""
+    pairs = []
+    seen = set()
+    for itinerary in itineraries:
+        for a, b in zip(itinerary['coords'], itinerary['coords'][1:]):
+            if (tuple(a), tuple(b)) not in seen:
+                seen.add((tuple(a), tuple(b)))
+                pairs.append((tuple(a), tuple(b)))
+    return pairs
+
+def record_fixtures(osrm_urls, itineraries, workers=4):
+    """
+    Fetch /route responses for every itinerary pair from real OSRM services
+    `osrm_urls` maps OSRM profile names to base URLs; failed requests are skipped
+    """
+    session = requests.Session()
+    jobs = [(profile, pair) for profile in osrm_urls for pair in itinerary_pairs(itineraries)]
+
+    def fetch(job):
+        profile, (a, b) = job
+        url = (f"{osrm_urls[profile]}/route/v1/{profile}/{a[0]},{a[1]};{b[0]},{b[1]}"
+               f"?overview=full&geometries=geojson")
+        try:
+            response = session.get(url, timeout=(3.05, 20))
+            response.raise_for_status()
+            return fixture_key('route', profile, [a, b]), response.json()
+        except Exception as e:
+            print(f"Skipping {profile} {a} -> {b}: {e}")
+            return None
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        recorded = [result for result in executor.map(fetch, jobs) if result is not None]
+
+    return {
+        'version': FIXTURE_VERSION,
+        'recorded_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'sources': osrm_urls,
+        'responses': dict(recorded)
+    }
+
+def load_fixtures(path=DEFAULT_FIXTURE_PATH):
+    """Recorded responses by fixture key"""
+    if not os.path.exists(path):
+        raise FileNotFoundError(
+            f"No recorded fixtures at {path}; run `python -m benchmarks.fixtures record` first"
+        )
+    with open(path, encoding='utf-8') as f:
+        fixtures = json.load(f)
+    if fixtures.get('version') != FIXTURE_VERSION:
+        raise ValueError(f"{path} is not a version {FIXTURE_VERSION} fixture file")
+    return fixtures['responses']
+
+def main():
+    parser = argparse.ArgumentParser(description='Record or list Legazpi benchmark fixtures')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    record = subparsers.add_parser('record', help='record OSRM responses for itinerary POI pairs')
+    record.add_argument('--car-url', default=os.environ.get('OSRM_CAR_URL', 'https://osrm-car-q2drvffsoa-as.a.run.app'))
+    record.add_argument('--bicycle-url', default=os.environ.get('OSRM_BICYCLE_URL', 'https://osrm-bicycle-q2drvffsoa-as.a.run.app'))
+    record.add_argument('--foot-url', default=os.environ.get('OSRM_FOOT_URL', 'https://osrm-foot-q2drvffsoa-as.a.run.app'))
+    record.add_argument('--workers', type=int, default=4)
+    record.add_argument('--output', default=DEFAULT_FIXTURE_PATH)
+
+    subparsers.add_parser('itineraries', help='print the itinerary workload as JSON')
+    args = parser.parse_args()
+
+    itineraries = load_itineraries()
+    if args.command == 'itineraries':
+        print(json.dumps(itineraries, indent=2))
+        return
+
+    urls = {'driving': args.car_url, 'cycling': args.bicycle_url, 'foot': args.foot_url}
+    fixtures = record_fixtures(urls, itineraries, args.workers)
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(fixtures, f)
+    print(f"💾 {len(fixtures['responses'])} responses from {len(itineraries)} itineraries written to {args.output}")
+
+if __name__ == '__main__':
+    main()
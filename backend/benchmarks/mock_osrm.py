@@ -0,0 +1,168 @@
+"""
+Local OSRM stand-in for LAKBAI benchmarks
+Answers /route/v1 and /table/v1 requests with straight-line routes, or replays
+recorded responses, after a configurable delay and with injected failures
+"""
+
+import json
+import math
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+# Rough travel speeds in meters per second for synthetic durations
+PROFILE_SPEEDS = {
+    'driving': 8.3,
+    'cycling': 4.2,
+    'foot': 1.4,
+}
+
+def haversine_m(a, b):
+    """Great-circle distance in meters between two (lng, lat) points"""
+    lng1, lat1 = map(math.radians, a)
+    lng2, lat2 = map(math.radians, b)
+    h = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+    return 2 * 6371000 * math.asin(math.sqrt(h))
+
+def parse_coordinates(text):
+    """Parse an OSRM `lng,lat;lng,lat` coordinate list"""
+    return [tuple(float(v) for v in pair.split(',')) for pair in text.split(';')]
+
+def synthetic_route(coords, profile):
+    """Build an OSRM-shaped route through `coords` with a 1.3 detour factor"""
+    speed = PROFILE_SPEEDS.get(profile, PROFILE_SPEEDS['driving'])
+    legs = []
+    for i in range(len(coords) - 1):
+        distance = haversine_m(coords[i], coords[i + 1]) * 1.3
+        legs.append({
+            'duration': distance / speed,
+            'distance': distance,
+            'steps': [{'geometry': {'type': 'LineString', 'coordinates': [list(coords[i]), list(coords[i + 1])]}}],
+        })
+    return {
+        'duration': sum(leg['duration'] for leg in legs),
+        'distance': sum(leg['distance'] for leg in legs),
+        'geometry': {'type': 'LineString', 'coordinates': [list(c) for c in coords]},
+        'legs': legs,
+    }
+
+def synthetic_table(coords, profile, query):
+    """Build an OSRM table response for the requested sources and destinations"""
+    def indices(name):
+        if name not in query or query[name][0] == 'all':
+            return list(range(len(coords)))
+        return [int(i) for i in query[name][0].split(';')]
+
+    rows = [[synthetic_route([coords[s], coords[d]], profile) for d in indices('destinations')]
+            for s in indices('sources')]
+    return {
+        'code': 'Ok',
+        'durations': [[route['duration'] for route in row] for row in rows],
+        'distances': [[route['distance'] for route in row] for row in rows],
+    }
+
+def fixture_key(service, profile, coords):
+    """Replay key for an OSRM request: service, profile and coordinates at OSRM's 5 decimals"""
+    points = ';'.join(f"{round(lng, 5)},{round(lat, 5)}" for lng, lat in coords)
+    return f"{service}/{profile}/{points}"
+
+class MockOSRMHandler(BaseHTTPRequestHandler):
+    """Request handler; server attributes hold latency, failure rates, fixtures and counters"""
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.calls += 1
+            delay = max(server.latency + server.random.uniform(-server.jitter, server.jitter), 0)
+            roll = server.random.random()
+        time.sleep(delay)
+
+        if roll < server.failure_rate:
+            with server.lock:
+                server.failures += 1
+            self._send(503, {'code': 'ServiceUnavailable'})
+            return
+
+        parsed = urlsplit(self.path)
+        parts = parsed.path.strip('/').split('/')
+        if len(parts) != 4 or parts[0] not in ('route', 'table'):
+            self._send(400, {'code': 'InvalidUrl'})
+            return
+
+        profile, coords = parts[2], parse_coordinates(parts[3])
+        if roll < server.failure_rate + server.no_route_rate:
+            self._send(400, {'code': 'NoRoute', 'message': 'Impossible route between points'})
+            return
+
+        recorded = server.fixtures.get(fixture_key(parts[0], profile, coords))
+        if recorded is not None:
+            with server.lock:
+                server.fixture_hits += 1
+            self._send(200, recorded)
+        elif parts[0] == 'route':
+            self._send(200, {'code': 'Ok', 'routes': [synthetic_route(coords, profile)]})
+        else:
+            self._send(200, synthetic_table(coords, profile, parse_qs(parsed.query)))
+
+    def _send(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def start_mock_osrm(latency=0.05, port=0, jitter=0.0, failure_rate=0.0, no_route_rate=0.0,
+                    fixtures=None, seed=None):
+    """
+    Start a mock OSRM server on a background thread and return it
+    Each request waits `latency` +/- `jitter` seconds; `failure_rate` of them
+    get a 503 and `no_route_rate` a NoRoute answer. `fixtures` maps
+    fixture keys to recorded responses, replayed instead of synthetic ones.
+    """
+    server = ThreadingHTTPServer(('127.0.0.1', port), MockOSRMHandler)
+    server.daemon_threads = True
+    server.latency = latency
+    server.jitter = jitter
+    server.failure_rate = failure_rate
+    server.no_route_rate = no_route_rate
+    server.fixtures = fixtures or {}
+    server.random = random.Random(seed)
+    server.calls = 0
+    server.failures = 0
+    server.fixture_hits = 0
+    server.lock = threading.Lock()
+    server.url = f"http://127.0.0.1:{server.server_address[1]}"
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Run a local OSRM stand-in')
+    parser.add_argument('--port', type=int, default=5000)
+    parser.add_argument('--latency', type=float, default=0.05, help='seconds per request')
+    parser.add_argument('--jitter', type=float, default=0.0, help='+/- seconds added to the latency')
+    parser.add_argument('--failure-rate', type=float, default=0.0, help='fraction of requests answered with 503')
+    parser.add_argument('--no-route-rate', type=float, default=0.0, help='fraction of requests answered with NoRoute')
+    parser.add_argument('--fixtures', help='recorded responses from benchmarks.fixtures record')
+    args = parser.parse_args()
+
+    fixtures = None
+    if args.fixtures:
+        with open(args.fixtures, encoding='utf-8') as f:
+            fixtures = json.load(f)['responses']
+
+    mock = start_mock_osrm(latency=args.latency, port=args.port, jitter=args.jitter, failure_rate=args.failure_rate,
+                           no_route_rate=args.no_route_rate, fixtures=fixtures)
+    print(f"Mock OSRM listening on {mock.url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        mock.shutdown()
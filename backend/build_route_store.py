@@ -0,0 +1,66 @@
+"""
+Build the precomputed POI-to-POI route store for LAKBAI
+Fetches duration and distance for every ordered POI pair and profile with
+OSRM table calls, optionally with simplified per-pair geometry, and writes
+the memory-mappable file routing_api.py loads at startup
+
+Usage:
+    python build_route_store.py                       # matrices only
+    python build_route_store.py --geometry --simplify 5
+"""
+
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+import routing_api
+from route_geometry import shape_geometry
+from route_store import write_route_store
+
+def build_route_store(output: str, profiles, with_geometry: bool = False, simplify: float = 5.0):
+    """Fetch every POI-to-POI route for `profiles` and write the store to `output`"""
+    poi_ids = sorted(routing_api.poi_coordinates)
+    coords = [routing_api.poi_coordinates[poi_id] for poi_id in poi_ids]
+    n = len(poi_ids)
+
+    durations = np.full((len(profiles), n, n), np.nan, dtype=np.float32)
+    distances = np.full((len(profiles), n, n), np.nan, dtype=np.float32)
+    geometries = [] if with_geometry else None
+
+    for k, profile in enumerate(profiles):
+        start = time.time()
+        np.fill_diagonal(durations[k], 0)
+        np.fill_diagonal(distances[k], 0)
+        for i, j, seconds, meters in routing_api.iter_table_cells(coords, profile, list(range(n))):
+            durations[k, i, j] = seconds / 60
+            distances[k, i, j] = meters
+        print(f"✅ {profile}: {n}x{n} matrix in {time.time() - start:.1f}s")
+
+        if with_geometry:
+            start = time.time()
+            jobs = [(coords[i], coords[j], profile) for i in range(n) for j in range(n) if i != j]
+            # Straight from OSRM: the cache and the current store may hold already-simplified geometry
+            with ThreadPoolExecutor(max_workers=routing_api.ROUTE_BATCH_CONCURRENCY) as executor:
+                routes = iter(list(executor.map(lambda job: routing_api.fetch_route(*job), jobs)))
+            lines = []
+            for i in range(n):
+                for j in range(n):
+                    route = next(routes) if i != j else None
+                    lines.append(shape_geometry(route['geometry'], 'polyline', simplify) if route else '')
+            geometries.append(lines)
+            print(f"✅ {profile}: {len(jobs)} geometries in {time.time() - start:.1f}s")
+
+    write_route_store(output, poi_ids, coords, profiles, durations, distances, geometries)
+    print(f"💾 Route store written to {output}")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Precompute POI-to-POI routes for the routing API')
+    parser.add_argument('--output', default=routing_api.ROUTE_STORE_PATH)
+    parser.add_argument('--profiles', nargs='+', default=['driving', 'cycling', 'foot'])
+    parser.add_argument('--geometry', action='store_true', help='also store per-pair route geometry')
+    parser.add_argument('--simplify', type=float, default=5.0, help='geometry simplification tolerance in meters')
+    args = parser.parse_args()
+
+    build_route_store(args.output, args.profiles, args.geometry, args.simplify)
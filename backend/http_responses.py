@@ -0,0 +1,124 @@
+"""
+HTTP response layer for the LAKBAI APIs
+Fast JSON serialization through orjson, gzip/brotli compression for clients
+that accept it, and ETag/Cache-Control validators so browser and CDN caches
+can absorb repeated route requests
+"""
+
+import gzip
+import hashlib
+import json
+from typing import Optional
+
+from flask import Response
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Response types worth compressing; everything else (snapshots, images) is sent as is
+COMPRESSIBLE_MIMETYPES = ('application/json', 'application/geo+json', 'text/plain', 'text/html')
+
+class FastJSONProvider(DefaultJSONProvider):
+    """
+    Flask JSON provider backed by orjson when it is installed
+    orjson encodes float-heavy GeoJSON several times faster than the json
+    module and serializes numpy arrays and scalars natively. Without orjson
+    this behaves exactly like Flask's default provider.
+    """
+
+    def dumps(self, obj, **kwargs) -> str:
+        if orjson is None or kwargs:
+            return super().dumps(obj, **kwargs)
+        return self._orjson_dumps(obj).decode()
+
+    def loads(self, s, **kwargs):
+        if orjson is None or kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def _orjson_dumps(self, obj) -> bytes:
+        options = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            options |= orjson.OPT_SORT_KEYS
+        return orjson.dumps(obj, default=self.default, option=options)
+
+    def response(self, *args, **kwargs) -> Response:
+        """Like Flask's jsonify, but without the bytes -> str -> bytes round trip"""
+        if orjson is None:
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(self._orjson_dumps(obj), mimetype=self.mimetype)
+
+def available_encodings():
+    """Content codings this process can produce, most preferred first"""
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+def choose_encoding(accept_encoding) -> Optional[str]:
+    """Best coding from a werkzeug Accept-Encoding header that we support, or None"""
+    best = None
+    best_quality = 0
+    for encoding in available_encodings():
+        quality = accept_encoding[encoding]
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+def compress_response(response: Response, accept_encoding, min_bytes: int = 1024,
+                      gzip_level: int = 4, brotli_quality: int = 5) -> Response:
+    """
+    Compress a buffered response body in place when the client accepts it
+    Streamed, already encoded, small and non-text responses are left alone
+    """
+    if (response.is_streamed or response.direct_passthrough or response.status_code < 200
+            or response.status_code in (204, 304) or 'Content-Encoding' in response.headers
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+        return response
+
+    response.vary.add('Accept-Encoding')
+    body = response.get_data()
+    if len(body) < min_bytes:
+        return response
+    encoding = choose_encoding(accept_encoding)
+    if encoding is None:
+        return response
+
+    if encoding == 'br':
+        response.set_data(brotli.compress(body, quality=brotli_quality))
+    else:
+        response.set_data(gzip.compress(body, compresslevel=gzip_level, mtime=0))
+    response.headers['Content-Encoding'] = encoding
+    return response
+
+def set_cache_validators(response: Response, request, max_age: int) -> Response:
+    """
+    Add a weak ETag over the uncompressed body and a public Cache-Control
+    A GET or HEAD whose If-None-Match matches gets an empty 304 instead. The
+    ETag is weak so it stays valid across gzip and brotli encodings of the
+    same body.
+    """
+    if response.is_streamed or response.status_code != 200:
+        return response
+
+    response.vary.add('Accept-Encoding')
+    response.set_etag(hashlib.sha1(response.get_data()).hexdigest(), weak=True)
+    response.cache_control.public = True
+    response.cache_control.max_age = max_age
+    if request.method in ('GET', 'HEAD') and request.if_none_match.contains_weak(response.get_etag()[0]):
+        response.status_code = 304
+        response.set_data(b'')
+        response.headers.pop('Content-Type', None)
+    return response
+
+def dumps_compact(obj) -> str:
+    """Compact JSON text for bodies built outside jsonify, such as streamed records"""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS).decode()
+    return json.dumps(obj, separators=(',', ':'))
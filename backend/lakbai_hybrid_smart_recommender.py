@@ -9,12 +9,42 @@ import pandas as pd
 import numpy as np
 import json
 import pickle
+import threading
 import time
+import weakref
 from collections import defaultdict
+import itertools
 
 # Set DATA_DIR for file path compatibility
 DATA_DIR = os.environ.get("DATA_DIR", "Data")
 
+# Process-wide counter stamped on every smart cache load or build, so caches
+# of recommendations can tell when the data behind them changed
+_smart_cache_generations = itertools.count(1)
+
+# BERT models already loaded in this process by model path, so a city's
+# recommender that is rebuilt while the old one is alive reuses its model
+_shared_bert_models = weakref.WeakValueDictionary()
+_shared_bert_models_lock = threading.Lock()
+
+def smart_cache_path(city):
+    """Smart cache file for a city; Legazpi keeps the original name"""
+    return "smart_cache.pkl" if city == "Legazpi" else f"smart_cache_{city}.pkl"
+
+def _deep_sizeof(obj, seen=None):
+    """Approximate bytes held by nested dicts, lists, tuples, sets and their items"""
+    if seen is None:
+        seen = set()
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(_deep_sizeof(k, seen) + _deep_sizeof(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(_deep_sizeof(item, seen) for item in obj)
+    return size
+
 def get_themes_ids(pois):
     """Extract theme mappings from POI data (copied to avoid torch imports)"""
     theme2num = dict()
@@ -41,9 +71,10 @@ def get_themes_ids(pois):
     return theme2num, num2theme, poi2theme
 
 class HybridSmartRecommender:
-    def __init__(self, city="Legazpi", cache_file="smart_cache.pkl"):
+    def __init__(self, city="Legazpi", cache_file=None, rebuild_cache=False):
         self.city = city
-        self.cache_file = cache_file
+        self.cache_file = cache_file or smart_cache_path(city)
+        self.rebuild_cache = rebuild_cache  # ignore a saved smart cache, e.g. after the CSVs changed
         self.pois = None
         self.bert_model = None
         self.user_visits = None
@@ -54,13 +85,17 @@ class HybridSmartRecommender:
         self.bert_predictions_cache = {}  # Cache BERT predictions
         self.popular_routes_from_data = {}  # From actual user data
         self.poi_embeddings = {}
+        self.poi_index = {}  # poiID -> get_poi_info() dict
+        self.nearby_rows = {}  # poiID -> nearby POIs by distance, built on first use
+        self.smart_cache_generation = 0
+        self._footprint = None
         
         print(f"🧠 Hybrid Smart Recommender for {city}")
         print("=" * 60)
         
         if not self.initialize():
             print("❌ Initialization failed!")
-            sys.exit(1)
+            raise RuntimeError(f"Failed to initialize recommender for {city}")
     
     def initialize(self):
         """Initialize with both speed optimizations and BERT intelligence"""
@@ -74,6 +109,7 @@ class HybridSmartRecommender:
             
             # Use local get_themes_ids to avoid importing BTRec_RecTour23 (which imports torch)
             self.theme2num, self.num2theme, self.poi2theme = get_themes_ids(self.pois)
+            self.build_poi_index()
             
             print(f"✅ Loaded {len(self.pois)} POIs and user visit data")
             
@@ -81,7 +117,7 @@ class HybridSmartRecommender:
             self.load_bert_model()
             
             # Build smart cache
-            if not self.load_smart_cache():
+            if self.rebuild_cache or not self.load_smart_cache():
                 self.build_smart_cache()
             
             print("✅ Recommender initialized successfully!")
@@ -94,26 +130,33 @@ class HybridSmartRecommender:
             return False
     
     def load_bert_model(self):
-        """Load your trained BERT model from output_Legazpi_e1_bert/"""
+        """Load your trained BERT model from output_{city}_e1_bert/"""
         try:
             from simpletransformers.classification import ClassificationModel
             
-            model_path = os.path.join(os.path.dirname(__file__), "output_Legazpi_e1_bert")
+            model_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), f"output_{self.city}_e1_bert")
             
             if not os.path.exists(model_path):
                 print(f"⚠️  BERT model not found at {model_path}")
                 self.bert_model = None
                 return False
             
-            print(f"🤖 Loading BERT model from {model_path}...")
-            
-            # Load the trained model (NOT from BTRec_RecTour23!)
-            self.bert_model = ClassificationModel(
-                'bert',
-                model_path,
-                use_cuda=False,  # Use CPU (works on any machine)
-                args={'silent': True, 'use_multiprocessing': False}
-            )
+            with _shared_bert_models_lock:
+                self.bert_model = _shared_bert_models.get(model_path)
+                if self.bert_model is not None:
+                    print(f"♻️ Reusing BERT model already loaded from {model_path}")
+                    return True
+                
+                print(f"🤖 Loading BERT model from {model_path}...")
+                
+                # Load the trained model (NOT from BTRec_RecTour23!)
+                self.bert_model = ClassificationModel(
+                    'bert',
+                    model_path,
+                    use_cuda=False,  # Use CPU (works on any machine)
+                    args={'silent': True, 'use_multiprocessing': False}
+                )
+                _shared_bert_models[model_path] = self.bert_model
             
             print("✅ BERT model loaded successfully!")
             print("🎯 AI-powered recommendations are now active")
@@ -142,6 +185,8 @@ class HybridSmartRecommender:
         
         # 4. Save cache
         self.save_smart_cache()
+        self.nearby_rows = {}
+        self.smart_cache_generation = next(_smart_cache_generations)
         
         build_time = time.time() - start_time
         print(f"✅ Smart cache built in {build_time:.2f} seconds")
@@ -263,54 +308,75 @@ class HybridSmartRecommender:
                 for transition in self.popular_routes_from_data['transitions'][from_poi][:3]:
                     routes_to_precompute.append([from_poi, transition['poi']])
         
-        # Pre-compute BERT predictions
-        for route in routes_to_precompute:
-            try:
-                predictions = self.get_bert_predictions_for_route(route)
-                route_key = tuple(route)
-                self.bert_predictions_cache[route_key] = predictions
-                print(f"✅ Cached BERT predictions for route {route}")
-                
-                # Limit to prevent too much computation
-                if len(self.bert_predictions_cache) >= 50:
-                    break
-                    
-            except Exception as e:
-                print(f"⚠️  Failed to cache predictions for {route}: {e}")
-                continue
+        # Pre-compute BERT predictions in one batch, limited to prevent too much computation
+        routes_to_precompute = routes_to_precompute[:50]
+        for route, predictions in zip(routes_to_precompute, self.get_bert_predictions_for_routes(routes_to_precompute)):
+            self.bert_predictions_cache[tuple(route)] = predictions
+            print(f"✅ Cached BERT predictions for route {route}")
         
         print(f"✅ Pre-computed {len(self.bert_predictions_cache)} BERT prediction sets")
     
     def get_bert_predictions_for_route(self, route):
         """Get BERT predictions for a specific route using the trained model"""
+        return self.get_bert_predictions_for_routes([route])[0]
+    
+    def get_bert_predictions_for_routes(self, routes):
+        """BERT predictions for many routes from a single batched predict call"""
         if not self.bert_model:
-            return []
+            return [[] for _ in routes]
         
         try:
-            # Format route as text input for BERT
-            route_text = self._format_route_for_bert(route)
-            
-            if not route_text:
-                return []
+            # Format routes as text input for BERT; empty texts are not sent
+            route_texts = [self._format_route_for_bert(route) for route in routes]
+            batch = [index for index, text in enumerate(route_texts) if text]
+            results = [[] for _ in routes]
+            if not batch:
+                return results
+            
+            # Get BERT predictions (one predicted class/POI per route)
+            predictions, raw_outputs = self.bert_model.predict([route_texts[index] for index in batch])
+            for index, prediction, raw_output in zip(batch, predictions, raw_outputs):
+                results[index] = self._bert_prediction_for_output(routes[index], prediction, raw_output)
+            return results
             
-            # Get BERT prediction (returns predicted class/POI)
-            predictions, raw_outputs = self.bert_model.predict([route_text])
-            
-            # predictions[0] is the predicted POI class (0-168 maps to POI IDs)
-            predicted_class = int(predictions[0])
-            
-            # Get confidence score
-            import numpy as np
-            confidence = float(np.max(raw_outputs[0]))
-            
-            # Map class to POI ID (classes might correspond to POI IDs)
-            # Try the class number as POI ID first
-            poi_id = predicted_class
-            
-            # Make sure it's not already in route and exists
+        except Exception as e:
+            print(f"⚠️  BERT prediction failed: {e}")
+            import traceback
+            traceback.print_exc()
+            return [[] for _ in routes]
+    
+    def _bert_prediction_for_output(self, route, prediction, raw_output):
+        """Turn one route's BERT output into at most one recommendation"""
+        # prediction is the predicted POI class (0-168 maps to POI IDs)
+        predicted_class = int(prediction)
+        
+        # Get confidence score
+        confidence = float(np.max(raw_output))
+        
+        # Map class to POI ID (classes might correspond to POI IDs)
+        # Try the class number as POI ID first
+        poi_id = predicted_class
+        
+        # Make sure it's not already in route and exists
+        if poi_id not in route:
+            poi_info = self.get_poi_info(poi_id)
+            if poi_info:
+                return [{
+                    'poi_id': poi_id,
+                    'name': poi_info['name'],
+                    'theme': poi_info['theme'],
+                    'score': confidence,
+                    'reason': 'AI-powered BERT prediction based on your route'
+                }]
+        
+        # If first prediction doesn't work, try top 3
+        top_3_indices = np.argsort(raw_output)[-3:][::-1]
+        for idx in top_3_indices:
+            poi_id = int(idx)
             if poi_id not in route:
                 poi_info = self.get_poi_info(poi_id)
                 if poi_info:
+                    confidence = float(raw_output[idx])
                     return [{
                         'poi_id': poi_id,
                         'name': poi_info['name'],
@@ -318,30 +384,8 @@ class HybridSmartRecommender:
                         'score': confidence,
                         'reason': 'AI-powered BERT prediction based on your route'
                     }]
-            
-            # If first prediction doesn't work, try top 3
-            top_3_indices = np.argsort(raw_outputs[0])[-3:][::-1]
-            for idx in top_3_indices:
-                poi_id = int(idx)
-                if poi_id not in route:
-                    poi_info = self.get_poi_info(poi_id)
-                    if poi_info:
-                        confidence = float(raw_outputs[0][idx])
-                        return [{
-                            'poi_id': poi_id,
-                            'name': poi_info['name'],
-                            'theme': poi_info['theme'],
-                            'score': confidence,
-                            'reason': 'AI-powered BERT prediction based on your route'
-                        }]
-            
-            return []
-            
-        except Exception as e:
-            print(f"⚠️  BERT prediction failed: {e}")
-            import traceback
-            traceback.print_exc()
-            return []
+        
+        return []
     
     def _format_route_for_bert(self, route):
         """Format route as text input for BERT model"""
@@ -447,6 +491,8 @@ class HybridSmartRecommender:
                 self.bert_predictions_cache = cache_data['bert_predictions_cache']
                 self.theme_groups = cache_data['theme_groups']
                 self.distance_matrix = cache_data['distance_matrix']
+                self.nearby_rows = {}
+                self.smart_cache_generation = next(_smart_cache_generations)
                 
                 print(f"✅ Smart cache loaded: {len(self.bert_predictions_cache)} BERT predictions cached")
                 return True
@@ -464,27 +510,45 @@ class HybridSmartRecommender:
                 'distance_matrix': self.distance_matrix
             }
             
-            with open(self.cache_file, 'wb') as f:
+            # Write then rename, so a reloading or starting process never reads a partial file
+            temp_file = f"{self.cache_file}.{os.getpid()}.tmp"
+            with open(temp_file, 'wb') as f:
                 pickle.dump(cache_data, f)
+            os.replace(temp_file, self.cache_file)
             print(f"✅ Smart cache saved")
             
         except Exception as e:
             print(f"❌ Smart cache save failed: {e}")
     
+    def build_poi_index(self):
+        """Index POI details by ID so lookups skip scanning the DataFrame"""
+        self.poi_index = {}
+        for poi in self.pois.itertuples(index=False):
+            self.poi_index.setdefault(int(poi.poiID), {
+                'id': int(poi.poiID),
+                'name': poi.poiName,
+                'theme': poi.theme,
+                'lat': float(poi.lat),
+                'long': float(poi.long)
+            })
+        self.nearby_rows = {}
+    
     def get_poi_info(self, poi_id):
         """Get POI information"""
-        poi_row = self.pois[self.pois['poiID'] == poi_id]
-        if poi_row.empty:
-            return None
-        
-        poi = poi_row.iloc[0]
-        return {
-            'id': poi['poiID'],
-            'name': poi['poiName'],
-            'theme': poi['theme'],
-            'lat': poi['lat'],
-            'long': poi['long']
-        }
+        return self.poi_index.get(poi_id)
+    
+    def get_nearby_row(self, poi_id):
+        """POIs within the nearby radius of `poi_id` as (poi_id, distance), nearest first"""
+        row = self.nearby_rows.get(poi_id)
+        if row is None:
+            row = []
+            for other in range(1, len(self.pois) + 1):
+                distance = self.distance_matrix.get((poi_id, other), 999)
+                if distance < 0.5 and other in self.poi_index:  # Within reasonable distance
+                    row.append((other, distance))
+            row.sort(key=lambda item: item[1])
+            self.nearby_rows[poi_id] = row
+        return row
     
     def _get_popular_starting_pois(self, num_recommendations=10):
         """Get popular POIs as starting recommendations"""
@@ -565,15 +629,62 @@ class HybridSmartRecommender:
         print(f"📍 Returning {len(recommendations[:num_recommendations])} popular starting POIs")
         return recommendations[:num_recommendations]
     
+    def route_order_matters(self, route):
+        """
+        Whether recommendations for `route` can depend on its POI order
+        Only BERT sees the order: cached predictions are keyed by the exact
+        route, and real-time predictions read it as text
+        """
+        return self.bert_model is not None or tuple(route) in self.bert_predictions_cache
+    
     def recommend_next_pois(self, current_route, num_recommendations=10):
         """Smart recommendations using both BERT and real data"""
+        return self.recommend_next_pois_batch([current_route], num_recommendations)[0]
+    
+    def recommend_next_pois_batch(self, routes, num_recommendations=10):
+        """
+        Recommendations for many routes at once
+        `num_recommendations` is one count for every route or a list with one
+        per route. Routes that still need real-time BERT predictions share a
+        single batched predict call.
+        """
         start_time = time.time()
-        recommendations = []
-        scored_recommendations = {}  # Use dict to track and merge scores
+        counts = num_recommendations if isinstance(num_recommendations, list) else [num_recommendations] * len(routes)
+        results = [None] * len(routes)
+        scored = {}
         
-        if not current_route or len(current_route) == 0:
-            print("📍 Empty route - returning popular starting POIs")
-            return self._get_popular_starting_pois(num_recommendations)
+        for index, (current_route, count) in enumerate(zip(routes, counts)):
+            if not current_route or len(current_route) == 0:
+                print("📍 Empty route - returning popular starting POIs")
+                results[index] = self._get_popular_starting_pois(count)
+            else:
+                scored[index] = self._score_candidates(current_route, count)
+        
+        # Strategy 5: Real-time BERT if we still need more (expensive, use sparingly)
+        needs_bert = [index for index in scored if len(scored[index]) < counts[index]] if self.bert_model else []
+        if needs_bert:
+            print(f"🤖 Getting real-time BERT predictions for {len(needs_bert)} route(s)...")
+            try:
+                predictions = self.get_bert_predictions_for_routes([routes[index] for index in needs_bert])
+                for index, bert_predictions in zip(needs_bert, predictions):
+                    self._add_realtime_bert(scored[index], routes[index], bert_predictions)
+            except Exception as e:
+                print(f"⚠️  Real-time BERT failed: {e}")
+        
+        for index, scored_recommendations in scored.items():
+            results[index] = self._rank_recommendations(scored_recommendations, counts[index])
+        
+        elapsed_time = time.time() - start_time
+        if len(routes) == 1:
+            print(f"⚡ Generated {len(results[0])} recommendations in {elapsed_time*1000:.1f}ms")
+        else:
+            print(f"⚡ Generated recommendations for {len(routes)} routes in {elapsed_time*1000:.1f}ms")
+        
+        return results
+    
+    def _score_candidates(self, current_route, num_recommendations):
+        """Scored candidates for a non-empty route from transitions, themes, cached BERT and nearby POIs"""
+        scored_recommendations = {}  # Use dict to track and merge scores
         
         # Get last POI for context
         last_poi = current_route[-1]
@@ -656,21 +767,15 @@ class HybridSmartRecommender:
             print("🌟 Adding nearby POIs for more variety")
             # Get all POIs sorted by distance from last location
             nearby_pois = []
-            for poi_id in range(1, len(self.pois) + 1):
+            for poi_id, distance in self.get_nearby_row(last_poi):
                 if poi_id not in current_route and poi_id not in scored_recommendations:
-                    dist_key = (last_poi, poi_id)
-                    distance = self.distance_matrix.get(dist_key, 999)
-                    if distance < 0.5:  # Within reasonable distance
-                        poi_info = self.get_poi_info(poi_id)
-                        if poi_info:
-                            nearby_pois.append({
-                                'poi_id': poi_id,
-                                'distance': distance,
-                                'theme': poi_info['theme']
-                            })
+                    nearby_pois.append({
+                        'poi_id': poi_id,
+                        'distance': distance,
+                        'theme': self.poi_index[poi_id]['theme']
+                    })
             
-            # Sort by distance and add diverse themes
-            nearby_pois.sort(key=lambda x: x['distance'])
+            # Add diverse themes, nearest first
             themes_added = set()
             for poi_data in nearby_pois:
                 if len(scored_recommendations) >= num_recommendations:
@@ -693,29 +798,28 @@ class HybridSmartRecommender:
                     }
                     themes_added.add(poi_info['theme'])
         
-        # Strategy 5: Real-time BERT if we still need more (expensive, use sparingly)
-        if len(scored_recommendations) < num_recommendations and self.bert_model:
-            print("🤖 Getting real-time BERT predictions...")
-            try:
-                bert_predictions = self.get_bert_predictions_for_route(current_route)
-                for pred in bert_predictions[:3]:
-                    poi_id = pred['poi_id']
-                    if poi_id not in current_route:
-                        if poi_id not in scored_recommendations:
-                            scored_recommendations[poi_id] = {
-                                'poi_id': poi_id,
-                                'name': pred['name'],
-                                'theme': pred['theme'],
-                                'score': pred['score'] * 1.3,
-                                'reason': 'Advanced AI recommendation for your route',
-                                'sources': ['bert_realtime']
-                            }
-                        else:
-                            scored_recommendations[poi_id]['score'] += pred['score'] * 0.5
-                            scored_recommendations[poi_id]['sources'].append('bert_realtime')
-            except Exception as e:
-                print(f"⚠️  Real-time BERT failed: {e}")
-        
+        return scored_recommendations
+    
+    def _add_realtime_bert(self, scored_recommendations, current_route, bert_predictions):
+        """Merge real-time BERT predictions into a route's scored candidates"""
+        for pred in bert_predictions[:3]:
+            poi_id = pred['poi_id']
+            if poi_id not in current_route:
+                if poi_id not in scored_recommendations:
+                    scored_recommendations[poi_id] = {
+                        'poi_id': poi_id,
+                        'name': pred['name'],
+                        'theme': pred['theme'],
+                        'score': pred['score'] * 1.3,
+                        'reason': 'Advanced AI recommendation for your route',
+                        'sources': ['bert_realtime']
+                    }
+                else:
+                    scored_recommendations[poi_id]['score'] += pred['score'] * 0.5
+                    scored_recommendations[poi_id]['sources'].append('bert_realtime')
+    
+    def _rank_recommendations(self, scored_recommendations, num_recommendations):
+        """Top scored candidates with their reasons finalized"""
         # Sort by combined score and return top recommendations
         recommendations = sorted(
             scored_recommendations.values(), 
@@ -730,11 +834,38 @@ class HybridSmartRecommender:
             # Remove internal sources field
             del rec['sources']
         
-        elapsed_time = time.time() - start_time
-        print(f"⚡ Generated {len(recommendations)} recommendations in {elapsed_time*1000:.1f}ms")
-        
         return recommendations
     
+    def memory_footprint(self):
+        """
+        Approximate memory held by this recommender, computed once per smart cache
+        {'data_bytes', 'model_bytes', 'model_id'}: POI and visit frames plus the
+        smart cache structures, and the BERT parameters (model_id identifies a
+        model shared with other recommenders)
+        """
+        if self._footprint is None or self._footprint[0] != self.smart_cache_generation:
+            data_bytes = 0
+            for frame in (self.pois, self.user_visits):
+                if frame is not None:
+                    data_bytes += int(frame.memory_usage(deep=True).sum())
+            seen = set()
+            for structure in (self.popular_routes_from_data, self.bert_predictions_cache, self.theme_groups,
+                              self.distance_matrix, self.poi_index, self.nearby_rows):
+                data_bytes += _deep_sizeof(structure, seen)
+            
+            model_bytes = 0
+            if self.bert_model is not None:
+                try:
+                    model_bytes = sum(p.numel() * p.element_size() for p in self.bert_model.model.parameters())
+                except Exception:
+                    pass
+            self._footprint = (self.smart_cache_generation, {
+                'data_bytes': data_bytes,
+                'model_bytes': model_bytes,
+                'model_id': id(self.bert_model) if self.bert_model is not None else None
+            })
+        return self._footprint[1]
+    
     def get_recommendation_stats(self):
         """Get statistics about the recommendation system"""
         stats = {
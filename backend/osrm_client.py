@@ -0,0 +1,136 @@
+"""
+Pooled OSRM HTTP client for LAKBAI
+One keep-alive requests.Session per OSRM base URL, so Cloud Run connections
+and their TLS sessions are reused, with a per-host concurrency limit and
+jittered retries bounded by a total deadline
+"""
+
+import random
+import threading
+import time
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import routing_metrics as metrics
+
+# Upstream statuses worth another attempt; everything else is final
+RETRY_STATUSES = (429, 502, 503, 504)
+
+class OsrmClient:
+    """Keep-alive session for one OSRM host"""
+
+    def __init__(self, base_url: str, pool_size: int = 16, max_concurrency: int = 16,
+                 connect_timeout: float = 3.05, read_timeout: float = 10, retries: int = 2,
+                 backoff: float = 0.2, deadline: float = 15):
+        self.base_url = base_url
+        self.host = urlsplit(base_url).netloc or base_url
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.deadline = deadline
+
+        # Retries are handled here so they share the deadline; the adapter never retries
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+
+    def _sleep_before_retry(self, attempt: int, deadline: float) -> bool:
+        """Full-jitter exponential backoff; False when the deadline leaves no room"""
+        delay = random.uniform(0, self.backoff * 2 ** attempt)
+        if time.monotonic() + delay >= deadline:
+            return False
+        time.sleep(delay)
+        return True
+
+    def get(self, url: str, deadline: Optional[float] = None) -> requests.Response:
+        """
+        GET `url`, retrying connection errors, timeouts and 429/5xx gateway
+        responses until `deadline` (a time.monotonic() value, defaulting to
+        the client's total deadline from now)
+        Raises the last requests exception when every attempt fails
+        """
+        if deadline is None:
+            deadline = time.monotonic() + self.deadline
+
+        attempt = 0
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or not self._slots.acquire(timeout=remaining):
+                raise requests.Timeout(f"OSRM deadline exceeded for {self.host}")
+            try:
+                remaining = max(deadline - time.monotonic(), 0.001)
+                timeout = (min(self.connect_timeout, remaining), min(self.read_timeout, remaining))
+                response = self.session.get(url, timeout=timeout)
+                if response.status_code not in RETRY_STATUSES:
+                    return response
+                response.raise_for_status()
+            except (requests.ConnectionError, requests.Timeout, requests.HTTPError):
+                if attempt >= self.retries or not self._sleep_before_retry(attempt, deadline):
+                    raise
+            finally:
+                self._slots.release()
+
+            attempt += 1
+            metrics.osrm_retries.inc(host=self.host)
+
+    def info(self) -> Dict:
+        return {
+            'base_url': self.base_url,
+            'connect_timeout': self.connect_timeout,
+            'read_timeout': self.read_timeout,
+            'retries': self.retries,
+            'deadline': self.deadline
+        }
+
+class TokenBucket:
+    """Rate budget: `rate` tokens per second on average, bursts of up to `burst`"""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def try_acquire(self, tokens: float = 1) -> bool:
+        """Take `tokens` if available, without waiting"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens < tokens:
+                return False
+            self._tokens -= tokens
+            return True
+
+class OsrmClientPool:
+    """Lazily created OsrmClient per base URL, all sharing the same settings"""
+
+    def __init__(self, **settings):
+        self.settings = settings
+        self._clients: Dict[str, OsrmClient] = {}
+        self._lock = threading.Lock()
+
+    def for_url(self, base_url: str) -> OsrmClient:
+        client = self._clients.get(base_url)
+        if client is None:
+            with self._lock:
+                client = self._clients.get(base_url)
+                if client is None:
+                    client = self._clients[base_url] = OsrmClient(base_url, **self.settings)
+        return client
+
+    def info(self) -> Dict:
+        with self._lock:
+            clients = list(self._clients.values())
+        return {
+            'pool_size': self.settings.get('pool_size'),
+            'max_concurrency': self.settings.get('max_concurrency'),
+            'hosts': [client.info() for client in clients]
+        }
@@ -5,45 +5,226 @@ Provides AI-powered POI recommendations based on current itinerary
 
 from flask import Flask, request, jsonify
 from flask_cors import CORS
-from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
+import requests
 import sys
 import os
+import hmac
 import json
+import threading
 
 # Add current directory to path for imports
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
+from recommendation_cache import RecommendationCache, recommendation_key
+from recommender_registry import DataWatcher, RecommenderRegistry, discover_cities
+
 app = Flask(__name__)
 CORS(app)  # Enable CORS for frontend
 
-# Initialize recommender (will be loaded on first request to avoid startup delay)
-recommender = None
-recommendation_cache = {}
+# Routing API that gets asked to prefetch routes from the last POI to the top
+# recommendations, so a click on a suggestion routes from cache. Off unless
+# set, e.g. ROUTING_API_URL=http://localhost:5001
+ROUTING_API_URL = os.environ.get('ROUTING_API_URL', '')
+ROUTE_PREFETCH_TOP_K = int(os.environ.get('ROUTE_PREFETCH_TOP_K', '3'))
 
-@lru_cache(maxsize=100)
-def get_cached_recommendations(route_tuple, num_recs):
-    """Cache recommendations for faster repeated queries"""
-    recommender_instance = get_recommender()
-    if recommender_instance is None:
-        return None
+# Prefetch notifications waiting to be sent; past this, new ones are dropped
+# so a slow or missing routing API cannot grow the queue without bound
+ROUTE_PREFETCH_MAX_PENDING = int(os.environ.get('ROUTE_PREFETCH_MAX_PENDING', '32'))
+
+# Prefetch notifications are sent from here so responses never wait on them
+_prefetch_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='route-prefetch')
+_prefetch_slots = threading.BoundedSemaphore(max(1, ROUTE_PREFETCH_MAX_PENDING))
+_prefetch_stats_lock = threading.Lock()
+prefetch_stats = {'sent': 0, 'failed': 0, 'dropped': 0, 'failing': False}
+
+# Cities served, from RECOMMENDER_CITIES or every city with POI and visit CSVs
+# in DATA_DIR; requests pick one with "city" and default to RECOMMENDER_DEFAULT_CITY
+DATA_DIR = os.environ.get('DATA_DIR', 'Data')
+RECOMMENDER_DEFAULT_CITY = os.environ.get('RECOMMENDER_DEFAULT_CITY', 'Legazpi')
+RECOMMENDER_CITIES = [c.strip() for c in os.environ.get('RECOMMENDER_CITIES', '').split(',') if c.strip()] \
+    or discover_cities(DATA_DIR) or [RECOMMENDER_DEFAULT_CITY]
+
+# Loaded cities are unloaded least recently used first once their recommenders
+# together take more than this many MB (0 = no limit); the default city stays
+RECOMMENDER_MEMORY_BUDGET_MB = float(os.environ.get('RECOMMENDER_MEMORY_BUDGET_MB', '2048'))
+
+# Recommenders are built on a background thread so no request pays for loading
+# data, BERT and the smart cache: the default city at import, other cities on
+# first use. Failed attempts are retried with jittered exponential backoff
+# between RECOMMENDER_RETRY_BACKOFF and RECOMMENDER_RETRY_MAX_BACKOFF seconds,
+# up to RECOMMENDER_MAX_ATTEMPTS (0 = forever)
+RECOMMENDER_EAGER_LOAD = os.environ.get('RECOMMENDER_EAGER_LOAD', '1') != '0'
+RECOMMENDER_MAX_ATTEMPTS = int(os.environ.get('RECOMMENDER_MAX_ATTEMPTS', '0'))
+RECOMMENDER_RETRY_BACKOFF = float(os.environ.get('RECOMMENDER_RETRY_BACKOFF', '2'))
+RECOMMENDER_RETRY_MAX_BACKOFF = float(os.environ.get('RECOMMENDER_RETRY_MAX_BACKOFF', '300'))
+
+# Seconds between checks of the Data/ CSVs and smart cache files; a change
+# rebuilds the city's recommender in the background and swaps it in (0 disables)
+RECOMMENDER_WATCH_INTERVAL = float(os.environ.get('RECOMMENDER_WATCH_INTERVAL', '10'))
+
+# /api/recommendations/admin/* requires this in an X-Admin-Token header and is
+# disabled while it is unset
+RECOMMENDER_ADMIN_TOKEN = os.environ.get('RECOMMENDER_ADMIN_TOKEN', '')
+
+# Seconds clients are told to wait before retrying while the recommender warms up
+WARMUP_RETRY_AFTER = 5
+
+# Most routes /api/recommendations/batch accepts in one call
+RECOMMENDATION_BATCH_MAX = int(os.environ.get('RECOMMENDATION_BATCH_MAX', '50'))
+
+# Ranked recommendations per route (see recommendation_cache.py)
+RECOMMENDATION_CACHE_SIZE = int(os.environ.get('RECOMMENDATION_CACHE_SIZE', '1000'))
+RECOMMENDATION_CACHE_TTL = float(os.environ.get('RECOMMENDATION_CACHE_TTL', '3600'))
+
+recommendation_cache = RecommendationCache(RECOMMENDATION_CACHE_SIZE, RECOMMENDATION_CACHE_TTL)
+
+# Requests for up to this many recommendations are all scored at this count
+# and sliced, so a route's top 5 is the head of its top 10, whether cached or not
+RECOMMENDATION_SCORE_COUNT = int(os.environ.get('RECOMMENDATION_SCORE_COUNT', '10'))
+
+def build_recommender(city, rebuild_cache=False):
+    """Build a city's recommender and run one recommendation so lazy paths are warm too"""
+    from lakbai_hybrid_smart_recommender import HybridSmartRecommender
+    instance = HybridSmartRecommender(city=city, rebuild_cache=rebuild_cache)
+    if instance.pois is None or not instance.distance_matrix:
+        raise RuntimeError('Recommender data or smart cache is missing')
+    instance.recommend_next_pois([], 1)
+    return instance
+
+recommenders = RecommenderRegistry(
+    build_recommender,
+    RECOMMENDER_CITIES,
+    memory_budget=int(RECOMMENDER_MEMORY_BUDGET_MB * 1024 * 1024),
+    pinned=[RECOMMENDER_DEFAULT_CITY],
+    max_attempts=RECOMMENDER_MAX_ATTEMPTS,
+    retry_backoff=RECOMMENDER_RETRY_BACKOFF,
+    retry_max_backoff=RECOMMENDER_RETRY_MAX_BACKOFF
+)
+
+def recommender_data_paths(city):
+    """(CSV paths, smart cache path) a city's recommender is built from"""
+    from lakbai_hybrid_smart_recommender import smart_cache_path
+    return ([os.path.join(DATA_DIR, f"POI-{city}.csv"), os.path.join(DATA_DIR, f"userVisits-{city}-allPOI.csv")],
+            smart_cache_path(city))
+
+data_watcher = DataWatcher(recommenders, recommender_data_paths, RECOMMENDER_WATCH_INTERVAL)
+
+def get_cached_recommendations(recommender_instance, routes, counts):
+    """
+    Recommendations for each route from one recommender, computing only the cache misses
+    Every route is scored at max(count, RECOMMENDATION_SCORE_COUNT) and the
+    list is cut to `count`, so the answer does not depend on earlier requests.
+    Misses are computed together in one batch and cached for later requests.
+    Callers pass the recommender they already hold, so a request that started
+    before a hot reload finishes on the same recommender.
+    """
+    city = recommender_instance.city
+    generation = recommender_instance.smart_cache_generation
+    keys = [recommendation_key(route, recommender_instance.route_order_matters(route), city) for route in routes]
+    score_counts = [max(num_recs, RECOMMENDATION_SCORE_COUNT) for num_recs in counts]
+    results = [recommendation_cache.get(key, score_count, generation) for key, score_count in zip(keys, score_counts)]
     
-    route_list = list(route_tuple) if route_tuple else []
-    return recommender_instance.recommend_next_pois(route_list, num_recs)
+    misses = [index for index, result in enumerate(results) if result is None]
+    if misses:
+        computed = recommender_instance.recommend_next_pois_batch(
+            [routes[index] for index in misses], [score_counts[index] for index in misses])
+        for index, recommendations in zip(misses, computed):
+            recommendation_cache.put(keys[index], score_counts[index], recommendations, generation)
+            results[index] = recommendations
+    return [recommendations[:num_recs] for recommendations, num_recs in zip(results, counts)]
 
-def get_recommender():
-    """Lazy load recommender to avoid startup delay"""
-    global recommender
-    if recommender is None:
-        try:
-            from lakbai_hybrid_smart_recommender import HybridSmartRecommender
-            recommender = HybridSmartRecommender(city="Legazpi")
-            print("✅ Recommender initialized successfully")
-        except Exception as e:
-            print(f"❌ Failed to initialize recommender: {e}")
-            import traceback
-            traceback.print_exc()
-            recommender = False  # Set to False to prevent repeated attempts
-    return recommender if recommender is not False else None
+def notify_route_prefetch(from_coords, to_coords):
+    """
+    Ask the routing API to warm routes from `from_coords` to each of `to_coords`
+    Failures are counted; only the first of a run of failures is logged
+    """
+    try:
+        requests.post(
+            f"{ROUTING_API_URL}/api/routes/prefetch",
+            json={'from': from_coords, 'to': to_coords},
+            timeout=(0.5, 2)
+        )
+    except requests.RequestException as e:
+        with _prefetch_stats_lock:
+            prefetch_stats['failed'] += 1
+            first_failure = not prefetch_stats['failing']
+            prefetch_stats['failing'] = True
+        if first_failure:
+            print(f"⚠️ Route prefetch requests are failing: {e}")
+    else:
+        with _prefetch_stats_lock:
+            prefetch_stats['sent'] += 1
+            prefetch_stats['failing'] = False
+    finally:
+        _prefetch_slots.release()
+
+def schedule_route_prefetch(recommender_instance, current_route, recommendations):
+    """
+    Prefetch routes from the last POI of the route to the top-k recommendations
+    Coordinates are sent rather than POI IDs, since the routing API only knows
+    the IDs of its own city's POIs
+    """
+    if not ROUTING_API_URL or not current_route or ROUTE_PREFETCH_TOP_K <= 0:
+        return
+    last_poi = recommender_instance.get_poi_info(current_route[-1])
+    top = [rec['coordinates'] for rec in recommendations[:ROUTE_PREFETCH_TOP_K]]
+    if last_poi is None or not top:
+        return
+    if not _prefetch_slots.acquire(blocking=False):
+        with _prefetch_stats_lock:
+            prefetch_stats['dropped'] += 1
+        return
+    _prefetch_executor.submit(notify_route_prefetch, [last_poi['long'], last_poi['lat']], top)
+
+def get_recommender(city=RECOMMENDER_DEFAULT_CITY):
+    """
+    The city's loaded recommender, or None while it is still warming up
+    Never loads inline; the first call for an unloaded city starts loading it
+    in the background
+    """
+    return recommenders.get(city)
+
+def start_recommender_warmup(city=RECOMMENDER_DEFAULT_CITY):
+    """Start loading a city's recommender in the background"""
+    recommenders.start(city)
+
+def request_city(data=None):
+    """The city a request is for: "city" in the body or query string, else the default"""
+    city = (data or {}).get('city') or request.args.get('city') or RECOMMENDER_DEFAULT_CITY
+    if city not in recommenders.cities:
+        raise ValueError(f"Unknown city {city!r}; available: {', '.join(recommenders.cities)}")
+    return city
+
+def warming_up_response(city=RECOMMENDER_DEFAULT_CITY):
+    """503 for requests that arrive before the city's recommender is ready"""
+    state = recommenders.state(city)
+    failed = state['status'] == 'failed'
+    response = jsonify({
+        "status": "error",
+        "message": "Recommender failed to initialize" if failed else "Recommender is warming up, retry shortly",
+        "city": city,
+        "warmup": state
+    })
+    if not failed:
+        response.headers['Retry-After'] = str(WARMUP_RETRY_AFTER)
+    return response, 503
+
+def enhance_recommendations(recommender_instance, recommendations):
+    """Add coordinates to recommendations and round their scores"""
+    enhanced_recs = []
+    for rec_item in recommendations:
+        poi_info = recommender_instance.get_poi_info(rec_item['poi_id'])
+        if poi_info:
+            enhanced_recs.append({
+                'poi_id': rec_item['poi_id'],
+                'name': rec_item['name'],
+                'theme': rec_item['theme'],
+                'score': round(rec_item['score'], 3),
+                'reason': rec_item['reason'],
+                'coordinates': [poi_info['long'], poi_info['lat']]
+            })
+    return enhanced_recs
 
 @app.route('/api/recommendations', methods=['POST'])
 def get_recommendations():
@@ -53,7 +234,8 @@ def get_recommendations():
     Request body:
     {
         "current_route": [1, 5, 12],  // Array of POI IDs in the current itinerary
-        "num_recommendations": 10     // Optional, defaults to 10
+        "num_recommendations": 10,    // Optional, defaults to 10
+        "city": "Legazpi"             // Optional, defaults to RECOMMENDER_DEFAULT_CITY
     }
     
     Response:
@@ -73,14 +255,16 @@ def get_recommendations():
     }
     """
     try:
-        recommender_instance = get_recommender()
+        data = request.json
+        try:
+            city = request_city(data)
+        except ValueError as e:
+            return jsonify({"status": "error", "message": str(e)}), 400
+        
+        recommender_instance = get_recommender(city)
         if recommender_instance is None:
-            return jsonify({
-                "status": "error",
-                "message": "Recommender not available. Running in limited mode."
-            }), 503
+            return warming_up_response(city)
         
-        data = request.json
         current_route = data.get('current_route', [])
         num_recommendations = data.get('num_recommendations', 10)
         
@@ -90,35 +274,123 @@ def get_recommendations():
                 "status": "error",
                 "message": "current_route must be an array of POI IDs"
             }), 400
+        if not isinstance(num_recommendations, int) or num_recommendations < 1:
+            return jsonify({
+                "status": "error",
+                "message": "num_recommendations must be a positive integer"
+            }), 400
         
         # Use cached function for faster results
-        route_tuple = tuple(current_route)
-        recommendations = get_cached_recommendations(route_tuple, num_recommendations)
+        recommendations = get_cached_recommendations(recommender_instance, [current_route], [num_recommendations])[0]
+        
+        enhanced_recs = enhance_recommendations(recommender_instance, recommendations)
+        schedule_route_prefetch(recommender_instance, current_route, enhanced_recs)
         
-        if recommendations is None:
+        return jsonify({
+            "status": "success",
+            "recommendations": enhanced_recs,
+            "count": len(enhanced_recs)
+        })
+        
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        return jsonify({
+            "status": "error",
+            "message": str(e)
+        }), 500
+
+@app.route('/api/recommendations/batch', methods=['POST'])
+def get_recommendations_batch():
+    """
+    Get POI recommendations for many routes in one call
+    Routes are scored together, so routes that need real-time BERT share one
+    batched predict call
+    
+    Request body:
+    {
+        "requests": [
+            {"id": "draft-1", "current_route": [1, 5, 12], "num_recommendations": 5},
+            {"id": "draft-2", "current_route": [3, 8]}
+        ],
+        "num_recommendations": 10,    // Optional default for requests without one
+        "city": "Legazpi"             // Optional, one city for the whole batch
+    }
+    
+    Response:
+    {
+        "results": {
+            "draft-1": {"recommendations": [...], "count": 5},
+            "draft-2": {"recommendations": [...], "count": 10}
+        },
+        "count": 2,
+        "status": "success"
+    }
+    """
+    try:
+        data = request.json or {}
+        try:
+            city = request_city(data)
+        except ValueError as e:
+            return jsonify({"status": "error", "message": str(e)}), 400
+        
+        recommender_instance = get_recommender(city)
+        if recommender_instance is None:
+            return warming_up_response(city)
+        
+        items = data.get('requests')
+        default_count = data.get('num_recommendations', 10)
+        
+        # Validate input
+        if not isinstance(items, list) or not items:
             return jsonify({
                 "status": "error",
-                "message": "Recommender not available"
-            }), 503
+                "message": "requests must be a non-empty array"
+            }), 400
+        if len(items) > RECOMMENDATION_BATCH_MAX:
+            return jsonify({
+                "status": "error",
+                "message": f"At most {RECOMMENDATION_BATCH_MAX} requests per batch"
+            }), 400
+        
+        ids, routes, counts = [], [], []
+        for index, item in enumerate(items):
+            current_route = item.get('current_route', []) if isinstance(item, dict) else None
+            if not isinstance(current_route, list):
+                return jsonify({
+                    "status": "error",
+                    "message": f"requests[{index}].current_route must be an array of POI IDs"
+                }), 400
+            num_recommendations = item.get('num_recommendations', default_count)
+            if not isinstance(num_recommendations, int) or num_recommendations < 1:
+                return jsonify({
+                    "status": "error",
+                    "message": f"requests[{index}].num_recommendations must be a positive integer"
+                }), 400
+            ids.append(str(item.get('id', index)))
+            routes.append(current_route)
+            counts.append(num_recommendations)
+        if len(set(ids)) != len(ids):
+            return jsonify({
+                "status": "error",
+                "message": "Request IDs must be unique"
+            }), 400
         
-        # Enhance recommendations with coordinates
-        enhanced_recs = []
-        for rec_item in recommendations:
-            poi_info = recommender_instance.get_poi_info(rec_item['poi_id'])
-            if poi_info:
-                enhanced_recs.append({
-                    'poi_id': rec_item['poi_id'],
-                    'name': rec_item['name'],
-                    'theme': rec_item['theme'],
-                    'score': round(rec_item['score'], 3),
-                    'reason': rec_item['reason'],
-                    'coordinates': [poi_info['long'], poi_info['lat']]
-                })
+        batch_recommendations = get_cached_recommendations(recommender_instance, routes, counts)
+        
+        results = {}
+        for request_id, current_route, recommendations in zip(ids, routes, batch_recommendations):
+            enhanced_recs = enhance_recommendations(recommender_instance, recommendations)
+            schedule_route_prefetch(recommender_instance, current_route, enhanced_recs)
+            results[request_id] = {
+                "recommendations": enhanced_recs,
+                "count": len(enhanced_recs)
+            }
         
         return jsonify({
             "status": "success",
-            "recommendations": enhanced_recs,
-            "count": len(enhanced_recs)
+            "results": results,
+            "count": len(results)
         })
         
     except Exception as e:
@@ -129,14 +401,77 @@ def get_recommendations():
             "message": str(e)
         }), 500
 
+@app.route('/api/recommendations/cache/info', methods=['GET'])
+def recommendation_cache_info():
+    """Recommendation cache size, hit/miss counters and limits, plus route prefetch counters"""
+    with _prefetch_stats_lock:
+        prefetch = {'enabled': bool(ROUTING_API_URL), 'max_pending': ROUTE_PREFETCH_MAX_PENDING, **prefetch_stats}
+    return jsonify({**recommendation_cache.info(), 'route_prefetch': prefetch})
+
+@app.route('/api/recommendations/cache/clear', methods=['POST'])
+def clear_recommendation_cache():
+    """Drop every cached recommendation list"""
+    recommendation_cache.clear()
+    return jsonify({'message': 'Recommendation cache cleared successfully'})
+
+def admin_token_error():
+    """403 response unless the request carries RECOMMENDER_ADMIN_TOKEN, else None"""
+    if not RECOMMENDER_ADMIN_TOKEN:
+        return jsonify({"status": "error", "message": "Set RECOMMENDER_ADMIN_TOKEN to enable this endpoint"}), 403
+    if not hmac.compare_digest(request.headers.get('X-Admin-Token', ''), RECOMMENDER_ADMIN_TOKEN):
+        return jsonify({"status": "error", "message": "Admin token required"}), 403
+    return None
+
+@app.route('/api/recommendations/admin/reload', methods=['POST'])
+def reload_recommender():
+    """
+    Rebuild a city's recommender in the background and swap it in when ready
+    Requests are served by the current recommender until then, and requests
+    already running finish on it
+    
+    Request body (optional):
+    {
+        "city": "Legazpi",        // defaults to RECOMMENDER_DEFAULT_CITY
+        "rebuild_cache": true     // rebuild the smart cache from the CSVs instead of loading it
+    }
+    
+    Requires the X-Admin-Token header
+    
+    Response (202):
+    {
+        "status": "reloading",
+        "city": "Legazpi",
+        "state": {"status": "ready", "reloading": true, "reloads": 3, ...}
+    }
+    """
+    error = admin_token_error()
+    if error:
+        return error
+    
+    data = request.get_json(silent=True) or {}
+    try:
+        city = request_city(data)
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    
+    recommenders.reload(city, bool(data.get('rebuild_cache', False)))
+    return jsonify({"status": "reloading", "city": city, "state": recommenders.state(city)}), 202
+
 @app.route('/api/recommendations/health', methods=['GET'])
 def health_check():
-    """Check if recommendation service is available"""
-    recommender_instance = get_recommender()
+    """Check if recommendation service is available for ?city= (default city otherwise)"""
+    try:
+        city = request_city()
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    
+    recommender_instance = get_recommender(city)
     if recommender_instance is None:
         return jsonify({
             "status": "unavailable",
-            "message": "Recommender not initialized"
+            "message": "Recommender not initialized",
+            "city": city,
+            "warmup": recommenders.state(city)['status']
         }), 503
     
     return jsonify({
@@ -145,12 +480,65 @@ def health_check():
         "city": recommender_instance.city if recommender_instance else "Unknown"
     })
 
+@app.route('/api/recommendations/ready', methods=['GET'])
+def readiness_check():
+    """
+    Readiness probe: 200 once POI data and the smart cache are loaded, 503 before
+    Checks ?city= when given, the default city otherwise
+    
+    Response:
+    {
+        "ready": false,
+        "city": "Legazpi",
+        "status": "retrying",
+        "attempts": 2,
+        "last_error": "...",
+        "next_retry_in": 3.4,
+        "load_seconds": null,
+        "ready_at": null,
+        "memory_bytes": null,
+        "loads": 0
+    }
+    """
+    try:
+        city = request_city()
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    ready = get_recommender(city) is not None
+    return jsonify({'ready': ready, 'city': city, **recommenders.state(city)}), 200 if ready else 503
+
+@app.route('/api/recommendations/cities', methods=['GET'])
+def list_cities():
+    """
+    Served cities with their load state, load time and approximate memory
+    
+    Response:
+    {
+        "default_city": "Legazpi",
+        "cities": {"Legazpi": {"status": "ready", "load_seconds": 0.8, "memory_bytes": 5242880, ...}, ...},
+        "loaded": ["Legazpi"],
+        "memory_bytes": 5242880,       // loaded recommenders, shared models counted once
+        "memory_budget": 2147483648,
+        "pinned": ["Legazpi"],
+        "evictions": 0,
+        "process_rss_bytes": 251658240,
+        "watcher": {"interval": 10, "running": true, "reloads": 0}
+    }
+    """
+    return jsonify({'default_city': RECOMMENDER_DEFAULT_CITY, **recommenders.info(), 'watcher': data_watcher.info()})
+
+if RECOMMENDER_EAGER_LOAD:
+    start_recommender_warmup()
+data_watcher.start()
+
 if __name__ == '__main__':
     print("=" * 60)
     print("🚀 Starting LAKBAI Recommendation API")
     print("=" * 60)
     print("📍 Endpoint: http://localhost:5002/api/recommendations")
     print("🏥 Health check: http://localhost:5002/api/recommendations/health")
+    print("🚦 Readiness: http://localhost:5002/api/recommendations/ready")
+    print(f"🏙️ Cities: {', '.join(RECOMMENDER_CITIES)} (default {RECOMMENDER_DEFAULT_CITY})")
     print("=" * 60)
     
     # Disable debug mode to prevent auto-reloader issues with venv_bert
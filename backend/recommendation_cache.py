@@ -0,0 +1,86 @@
+"""
+Recommendation cache for LAKBAI
+Recommendations depend only on the last POI of a route and the set of POIs
+already visited, so routes are cached under that canonical key: [1, 5, 10]
+and [5, 1, 10] share an entry. Routes whose order does matter (BERT input)
+are cached under the exact sequence instead.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Hashable, List, Optional, Sequence, Tuple
+
+STATS_FIELDS = ('hits', 'misses', 'expired', 'evictions', 'invalidations')
+
+def recommendation_key(route: Sequence[int], order_matters: bool = False, city: str = '') -> Tuple:
+    """Cache key for a route in a city: (last POI, visited set), or the exact sequence when order matters"""
+    if order_matters:
+        return (city, 'sequence', tuple(route))
+    return (city, 'visited', route[-1] if route else None, frozenset(route))
+
+class RecommendationCache:
+    """
+    In-process LRU of ranked recommendation lists
+    An entry holds the list computed for one key and recommendation count;
+    the recommender's candidate pool depends on the count, so a list is only
+    served for the count it was computed with. Entries expire after `ttl` seconds,
+    the least recently used are dropped past `max_entries`, and an entry
+    computed from an older smart cache generation than the recommender's
+    current one is dropped when it is next looked up.
+    """
+
+    def __init__(self, max_entries: int = 1000, ttl: float = 3600):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.stats = dict.fromkeys(STATS_FIELDS, 0)
+        self._entries: 'OrderedDict[Tuple[Tuple, int], Tuple[float, List[Dict], Hashable]]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Tuple, count: int, generation: Hashable) -> Optional[List[Dict]]:
+        """The recommendations cached for `key` at `count`, or None on a miss"""
+        with self._lock:
+            entry = self._entries.get((key, count))
+            if entry is None:
+                self.stats['misses'] += 1
+                return None
+            created_at, recommendations, entry_generation = entry
+            if entry_generation != generation:
+                del self._entries[(key, count)]
+                self.stats['invalidations'] += 1
+                self.stats['misses'] += 1
+                return None
+            if time.time() - created_at > self.ttl:
+                del self._entries[(key, count)]
+                self.stats['expired'] += 1
+                self.stats['misses'] += 1
+                return None
+            self._entries.move_to_end((key, count))
+            self.stats['hits'] += 1
+            return recommendations
+
+    def put(self, key: Tuple, count: int, recommendations: List[Dict], generation: Hashable):
+        """Store the recommendations computed for `key` at `count`"""
+        with self._lock:
+            self._entries[(key, count)] = (time.time(), list(recommendations), generation)
+            self._entries.move_to_end((key, count))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats['evictions'] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def info(self) -> Dict:
+        with self._lock:
+            stats = dict(self.stats)
+            size = len(self._entries)
+        lookups = stats['hits'] + stats['misses']
+        return {
+            'size': size,
+            'max_entries': self.max_entries,
+            'ttl': self.ttl,
+            **stats,
+            'hit_rate': round(stats['hits'] / lookups, 4) if lookups else None
+        }
@@ -0,0 +1,355 @@
+"""
+Recommender registry for LAKBAI
+One recommender per city, built on a background thread the first time the
+city is asked for and retried with backoff when loading fails. Loaded cities
+are kept within a memory budget by unloading the least recently used ones,
+and can be rebuilt in the background and swapped in when their data changes.
+"""
+
+import os
+import random
+import threading
+import time
+import traceback
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+
+def discover_cities(data_dir: str) -> List[str]:
+    """Cities with both a POI-{city}.csv and a userVisits-{city}-allPOI.csv in `data_dir`"""
+    try:
+        names = set(os.listdir(data_dir))
+    except OSError:
+        return []
+    return sorted(
+        name[len('POI-'):-len('.csv')] for name in names
+        if name.startswith('POI-') and name.endswith('.csv')
+        and f"userVisits-{name[len('POI-'):-len('.csv')]}-allPOI.csv" in names
+    )
+
+def process_rss_bytes() -> Optional[int]:
+    """Resident set size of this process, where /proc is available"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return None
+
+class RecommenderRegistry:
+    """
+    Lazily loaded recommenders by city
+    `build(city, rebuild_cache=False)` returns a ready recommender or raises. Loaded recommenders
+    report their size through `memory_footprint()`; when the loaded cities
+    together exceed `memory_budget` bytes (0 = no limit) the least recently
+    used city other than the one just loaded and the `pinned` ones is
+    unloaded, and it is loaded again the next time it is asked for. Models
+    shared between recommenders count once.
+    """
+
+    def __init__(self, build: Callable[[str], object], cities: List[str], memory_budget: int = 0,
+                 pinned: Optional[List[str]] = None, max_attempts: int = 0, retry_backoff: float = 2,
+                 retry_max_backoff: float = 300):
+        self.build = build
+        self.cities = list(cities)
+        self.pinned = set(pinned or ())
+        self.memory_budget = memory_budget
+        self.max_attempts = max_attempts
+        self.retry_backoff = retry_backoff
+        self.retry_max_backoff = retry_max_backoff
+        self.evictions = 0
+        self._recommenders: 'OrderedDict[str, object]' = OrderedDict()  # least recently used first
+        self._states: Dict[str, Dict] = {}
+        self._threads: Dict[str, threading.Thread] = {}
+        self._reload_threads: Dict[str, threading.Thread] = {}
+        self._pending_reloads: Dict[str, bool] = {}  # city -> rebuild_cache for the next reload
+        self._loaded_at: Dict[str, float] = {}  # city -> time.time() of its current recommender's swap-in
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _new_state() -> Dict:
+        return {
+            'status': 'pending',  # pending, loading, retrying, ready, failed or evicted
+            'attempts': 0,
+            'last_error': None,
+            'next_retry_in': None,
+            'load_seconds': None,
+            'ready_at': None,
+            'memory_bytes': None,
+            'loads': 0,
+            'reloading': False,
+            'reloads': 0,
+            'last_reload_at': None,
+            'last_reload_error': None
+        }
+
+    def get(self, city: str):
+        """The loaded recommender for `city`, or None while it loads (never loads inline)"""
+        with self._lock:
+            instance = self._recommenders.get(city)
+            if instance is not None:
+                self._recommenders.move_to_end(city)
+                return instance
+        self.start(city)
+        return None
+
+    def start(self, city: str):
+        """Start loading `city` in the background unless it is loaded or already loading"""
+        with self._lock:
+            if city in self._recommenders:
+                return
+            thread = self._threads.get(city)
+            if thread is not None and thread.is_alive():
+                return
+            state = self._states.setdefault(city, self._new_state())
+            if state['status'] == 'failed':
+                return
+            thread = threading.Thread(target=self._load, args=(city,), name=f"recommender-{city}", daemon=True)
+            self._threads[city] = thread
+            thread.start()
+
+    def wait(self, city: str, timeout: Optional[float] = None):
+        """Block until the current load of `city` finishes; returns its recommender or None"""
+        thread = self._threads.get(city)
+        if thread is not None:
+            thread.join(timeout)
+        with self._lock:
+            return self._recommenders.get(city)
+
+    def get_loaded(self, city: str):
+        """The loaded recommender for `city` or None, without loading or touching its LRU position"""
+        with self._lock:
+            return self._recommenders.get(city)
+
+    def loaded_at(self, city: str) -> Optional[float]:
+        """When the city's current recommender was swapped in (time.time()), if loaded"""
+        with self._lock:
+            return self._loaded_at.get(city) if city in self._recommenders else None
+
+    def state(self, city: str) -> Dict:
+        with self._lock:
+            return dict(self._states.get(city) or self._new_state())
+
+    def _update_state(self, city: str, **changes):
+        with self._lock:
+            self._states[city].update(changes)
+
+    def _load(self, city: str):
+        """Build the city's recommender, retrying with backoff until it loads or attempts run out"""
+        attempt = 0
+        while True:
+            attempt += 1
+            self._update_state(city, status='loading', attempts=attempt, next_retry_in=None)
+            start = time.time()
+            try:
+                instance = self.build(city)
+            except Exception as e:
+                print(f"❌ Failed to initialize recommender for {city} (attempt {attempt}): {e}")
+                traceback.print_exc()
+                if self.max_attempts and attempt >= self.max_attempts:
+                    self._update_state(city, status='failed', last_error=str(e))
+                    return
+                delay = min(self.retry_max_backoff, self.retry_backoff * 2 ** (attempt - 1))
+                delay = random.uniform(delay / 2, delay)
+                self._update_state(city, status='retrying', last_error=str(e), next_retry_in=round(delay, 1))
+                time.sleep(delay)
+                continue
+
+            load_seconds = time.time() - start
+            footprint = instance.memory_footprint()
+            with self._lock:
+                self._recommenders[city] = instance
+                self._loaded_at[city] = time.time()
+                state = self._states[city]
+                state.update(status='ready', last_error=None, load_seconds=round(load_seconds, 2),
+                             ready_at=time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+                             memory_bytes=footprint['data_bytes'] + footprint['model_bytes'],
+                             loads=state['loads'] + 1)
+                self._enforce_budget(keep=city)
+            print(f"✅ Recommender for {city} initialized in {load_seconds:.1f}s")
+            return
+
+    def reload(self, city: str, rebuild_cache: bool = False) -> Optional[threading.Thread]:
+        """
+        Rebuild a loaded city's recommender in the background and swap it in
+        Requests keep using the current recommender until the swap, and the
+        ones already holding it finish on it. A reload asked for while one is
+        running is queued to run right after it. A city that is not loaded
+        just starts loading. Returns the thread doing the work.
+        """
+        with self._lock:
+            state = self._states.setdefault(city, self._new_state())
+            loaded = city in self._recommenders
+            if loaded:
+                thread = self._reload_threads.get(city)
+                if thread is not None and thread.is_alive():
+                    self._pending_reloads[city] = self._pending_reloads.get(city, False) or rebuild_cache
+                    return thread
+                state['reloading'] = True
+                thread = threading.Thread(target=self._reload, args=(city, rebuild_cache),
+                                          name=f"recommender-reload-{city}", daemon=True)
+                self._reload_threads[city] = thread
+                thread.start()
+                return thread
+            if state['status'] == 'failed':
+                state['status'] = 'pending'
+        self.start(city)
+        return self._threads.get(city)
+
+    def _reload(self, city: str, rebuild_cache: bool):
+        while True:
+            start = time.time()
+            try:
+                instance = self.build(city, rebuild_cache=rebuild_cache)
+            except Exception as e:
+                print(f"❌ Reloading recommender for {city} failed, keeping the current one: {e}")
+                traceback.print_exc()
+                self._update_state(city, last_reload_error=str(e))
+            else:
+                load_seconds = time.time() - start
+                footprint = instance.memory_footprint()
+                with self._lock:
+                    # Swap in place so the city keeps its LRU position
+                    self._recommenders[city] = instance
+                    self._loaded_at[city] = time.time()
+                    self._states[city].update(
+                        status='ready', load_seconds=round(load_seconds, 2),
+                        memory_bytes=footprint['data_bytes'] + footprint['model_bytes'],
+                        reloads=self._states[city]['reloads'] + 1, last_reload_error=None,
+                        last_reload_at=time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()))
+                    self._enforce_budget(keep=city)
+                print(f"🔁 Recommender for {city} reloaded in {load_seconds:.1f}s")
+
+            with self._lock:
+                if city not in self._pending_reloads:
+                    self._states[city]['reloading'] = False
+                    return
+                rebuild_cache = self._pending_reloads.pop(city)
+
+    def _memory_bytes(self) -> int:
+        """Loaded recommender memory with each shared model counted once; lock held"""
+        total = 0
+        models = {}
+        for instance in self._recommenders.values():
+            footprint = instance.memory_footprint()
+            total += footprint['data_bytes']
+            if footprint['model_id'] is not None:
+                models[footprint['model_id']] = footprint['model_bytes']
+        return total + sum(models.values())
+
+    def _enforce_budget(self, keep: str):
+        """Unload least recently used cities until the budget holds; lock held"""
+        if not self.memory_budget:
+            return
+        while self._memory_bytes() > self.memory_budget:
+            city = next((c for c in self._recommenders if c != keep and c not in self.pinned), None)
+            if city is None:
+                return
+            del self._recommenders[city]
+            self._states[city].update(status='evicted', memory_bytes=None)
+            self.evictions += 1
+            print(f"♻️ Unloaded recommender for {city} to stay within the memory budget")
+
+    def info(self) -> Dict:
+        with self._lock:
+            return {
+                'cities': {city: dict(self._states.get(city) or self._new_state()) for city in self.cities},
+                'loaded': list(self._recommenders),
+                'memory_bytes': self._memory_bytes(),
+                'memory_budget': self.memory_budget,
+                'pinned': sorted(self.pinned),
+                'evictions': self.evictions,
+                'process_rss_bytes': process_rss_bytes()
+            }
+
+class DataWatcher:
+    """
+    Polls each city's data files and reloads the city when they change
+    `paths(city)` returns (CSV paths, smart cache path). A changed CSV
+    reloads with a rebuilt smart cache; a changed smart cache alone reloads
+    from it, unless it was written before the current recommender was
+    swapped in (the load that wrote it already uses it). A change is acted
+    on once the files have stopped changing for one poll, so half-written
+    files are not loaded. Cities that are not loaded, or are reloading, are
+    only tracked; they read the current files when they load.
+    """
+
+    def __init__(self, registry: RecommenderRegistry, paths: Callable[[str], Tuple[List[str], str]],
+                 interval: float = 10):
+        self.registry = registry
+        self.paths = paths
+        self.interval = interval
+        self.reloads = 0
+        self._baseline: Dict[str, Tuple] = {}
+        self._pending: Dict[str, Tuple] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @staticmethod
+    def _signature(paths: List[str]) -> Tuple:
+        signature = []
+        for path in paths:
+            try:
+                stat = os.stat(path)
+                signature.append((stat.st_mtime_ns, stat.st_size))
+            except OSError:
+                signature.append(None)
+        return tuple(signature)
+
+    def _files(self, city: str) -> Tuple[List[str], List[str]]:
+        csv_paths, cache_path = self.paths(city)
+        return csv_paths, csv_paths + [cache_path]
+
+    def check(self):
+        """Run one poll over every city"""
+        for city in self.registry.cities:
+            csv_paths, paths = self._files(city)
+            if self.registry.state(city)['reloading']:
+                continue
+            signature = self._signature(paths)
+            baseline = self._baseline.setdefault(city, signature)
+            if signature == baseline:
+                self._pending.pop(city, None)
+                continue
+            if self._pending.get(city) != signature:
+                # Still changing (or just changed); wait for it to settle
+                self._pending[city] = signature
+                continue
+            del self._pending[city]
+
+            loaded_at = self.registry.loaded_at(city)
+            rebuild_cache = signature[:len(csv_paths)] != baseline[:len(csv_paths)]
+            cache_written = signature[-1][0] / 1e9 if signature[-1] else None
+            own_write = not rebuild_cache and loaded_at is not None and cache_written is not None \
+                and cache_written <= loaded_at
+            if loaded_at is not None and not own_write:
+                print(f"👀 Data for {city} changed, reloading{' with a rebuilt smart cache' if rebuild_cache else ''}")
+                thread = self.registry.reload(city, rebuild_cache)
+                if thread is not None:
+                    thread.join()
+                self.reloads += 1
+                # The reload may have rewritten the smart cache itself
+                signature = self._signature(paths)
+            self._baseline[city] = signature
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.check()
+            except Exception as e:
+                print(f"⚠️ Data watcher check failed: {e}")
+
+    def start(self):
+        if self._thread is None and self.interval > 0:
+            for city in self.registry.cities:
+                self._baseline[city] = self._signature(self._files(city)[1])
+            self._thread = threading.Thread(target=self._run, name='recommender-data-watcher', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def info(self) -> Dict:
+        return {
+            'interval': self.interval,
+            'running': self._thread is not None and self._thread.is_alive(),
+            'reloads': self.reloads
+        }
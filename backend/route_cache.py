@@ -0,0 +1,785 @@
+"""
+Route cache for LAKBAI
+SQLite-backed by default so cached OSRM routes survive restarts and are shared
+by every worker on the host; a Redis-protocol server or an in-process LRU can
+be selected instead
+"""
+
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+# Only refresh an entry's access time when it is older than this many seconds,
+# so hot entries do not turn every cache read into a write
+TOUCH_INTERVAL = 60
+
+# Re-check the total cache size after this many writes
+EVICTION_CHECK_INTERVAL = 50
+
+# Keys per query for bulk reads, well under SQLite's bound-parameter limit
+BULK_CHUNK_SIZE = 500
+
+# Per-worker counters, and how often (seconds) they are added to the shared totals
+STATS_FIELDS = ('hits', 'stale_hits', 'misses', 'negative_hits')
+STATS_FLUSH_INTERVAL = 5
+
+class BaseRouteCache:
+    """
+    Shared behaviour of the route cache backends
+    Entries older than `ttl` seconds are treated as misses, and when the stored
+    payloads exceed `max_bytes` the least recently used entries are dropped.
+
+    Expired entries are kept for another `stale_ttl` seconds so callers can
+    serve them while a refresh runs (stale-while-revalidate). Failed lookups
+    are tracked separately: a failing key is not retried for `negative_ttl`
+    seconds, doubling on every further failure up to `negative_max_ttl`.
+
+    Hit/miss counters are kept per worker process and flushed to the backend
+    every STATS_FLUSH_INTERVAL seconds, so `info` reports every worker sharing
+    the cache, not just the one answering the request.
+    """
+    backend = 'base'
+
+    def __init__(self, ttl: float = 7 * 24 * 3600, max_bytes: int = 256 * 1024 * 1024,
+                 stale_ttl: float = 0, negative_ttl: float = 30, negative_max_ttl: float = 300):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.stale_ttl = stale_ttl
+        self.negative_ttl = negative_ttl
+        self.negative_max_ttl = negative_max_ttl
+        self.hits = 0
+        self.misses = 0
+        self.stale_hits = 0
+        self.negative_hits = 0
+        self._pending = dict.fromkeys(STATS_FIELDS, 0)
+        self._flushed_at = time.time()
+        self._stats_lock = threading.Lock()
+
+    @property
+    def worker(self) -> str:
+        # Read on every flush since gunicorn may fork workers after the cache is created
+        return f"{socket.gethostname()}:{os.getpid()}"
+
+    def _count(self, counter: str, amount: int = 1):
+        with self._stats_lock:
+            setattr(self, counter, getattr(self, counter) + amount)
+            self._pending[counter] += amount
+            due = time.time() - self._flushed_at >= STATS_FLUSH_INTERVAL
+        if due:
+            self.flush_stats()
+
+    def flush_stats(self):
+        """Add this worker's counters since the last flush to the shared totals"""
+        with self._stats_lock:
+            deltas = self._pending
+            self._pending = dict.fromkeys(STATS_FIELDS, 0)
+            self._flushed_at = time.time()
+        if any(deltas.values()):
+            try:
+                self._write_stats(deltas)
+            except Exception as e:
+                print(f"Error flushing cache stats: {e}")
+
+    def _reset_local_stats(self, fields: Tuple[str, ...] = STATS_FIELDS):
+        with self._stats_lock:
+            for field in fields:
+                setattr(self, field, 0)
+                self._pending[field] = 0
+
+    def record_lookups(self, hits: int, misses: int):
+        """Add bulk lookup results to the hit/miss counters"""
+        if hits:
+            self._count('hits', hits)
+        if misses:
+            self._count('misses', misses)
+
+    def get(self, key: str) -> Optional[Dict]:
+        """Return the cached route for `key`, or None on a miss or stale entry"""
+        route, stale = self.lookup(key)
+        return None if stale else route
+
+    def is_failing(self, key: str) -> bool:
+        """Check whether `key` failed recently and should not be retried yet, counting a negative hit"""
+        if not self.backing_off(key):
+            return False
+        self._count('negative_hits')
+        return True
+
+    def _backoff(self, failures: int) -> float:
+        return min(self.negative_ttl * 2 ** (failures - 1), self.negative_max_ttl)
+
+    def info(self) -> Dict:
+        """Cache statistics summed over every worker sharing the cache"""
+        self.flush_stats()
+        workers = self._read_stats()
+        totals = {field: sum(stats.get(field, 0) for stats in workers.values()) for field in STATS_FIELDS}
+        lookups = totals['hits'] + totals['stale_hits'] + totals['misses']
+        return {
+            'backend': self.backend,
+            **totals,
+            **self._storage_info(),
+            'max_bytes': self.max_bytes,
+            'ttl_seconds': self.ttl,
+            'stale_ttl_seconds': self.stale_ttl,
+            'negative_ttl_seconds': self.negative_ttl,
+            'hit_rate': f"{((totals['hits'] + totals['stale_hits']) / lookups * 100):.2f}%" if lookups > 0 else "0%",
+            'workers': [{'worker': worker, **stats} for worker, stats in sorted(workers.items())]
+        }
+
+class RouteCache(BaseRouteCache):
+    """
+    SQLite-backed route cache, shared by every worker process on the host
+    Expired and least recently used entries are evicted by `evict`
+    """
+    backend = 'sqlite'
+
+    def __init__(self, path: str, **settings):
+        super().__init__(**settings)
+        self.path = path
+        self._writes = 0
+        self._local = threading.local()
+        self._create_schema()
+
+    def _connect(self) -> sqlite3.Connection:
+        """Get this thread's connection, opening it on first use"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def _create_schema(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = self._connect()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS routes (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+        """)
+        conn.execute('CREATE INDEX IF NOT EXISTS routes_accessed_at ON routes (accessed_at)')
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS route_failures (
+                key TEXT PRIMARY KEY,
+                failures INTEGER NOT NULL,
+                retry_at REAL NOT NULL
+            )
+        """)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS cache_stats (
+                worker TEXT PRIMARY KEY,
+                hits INTEGER NOT NULL DEFAULT 0,
+                stale_hits INTEGER NOT NULL DEFAULT 0,
+                misses INTEGER NOT NULL DEFAULT 0,
+                negative_hits INTEGER NOT NULL DEFAULT 0,
+                updated_at REAL NOT NULL
+            )
+        """)
+
+    def lookup(self, key: str, count_misses: bool = True) -> Tuple[Optional[Dict], bool]:
+        """
+        Return (route, is_stale) for `key`
+        Stale routes are only returned while within `stale_ttl` of expiring.
+        Pass `count_misses=False` for a peek that is followed by a real lookup.
+        """
+        conn = self._connect()
+        now = time.time()
+        row = conn.execute(
+            'SELECT value, created_at, accessed_at FROM routes WHERE key = ?', (key,)
+        ).fetchone()
+
+        age = now - row[1] if row is not None else None
+        if row is None or age > self.ttl + self.stale_ttl:
+            if count_misses:
+                self._count('misses')
+            return None, False
+
+        if now - row[2] > TOUCH_INTERVAL:
+            conn.execute('UPDATE routes SET accessed_at = ? WHERE key = ?', (now, key))
+
+        stale = age > self.ttl
+        self._count('stale_hits' if stale else 'hits')
+        return json.loads(row[0]), stale
+
+    def get_many(self, keys: List[str]) -> Dict[str, Dict]:
+        """
+        Return fresh routes for every cached key in `keys`, in one query per chunk
+        Hit/miss counters are left to the caller, see `record_lookups`
+        """
+        conn = self._connect()
+        oldest = time.time() - self.ttl
+        found = {}
+        for start in range(0, len(keys), BULK_CHUNK_SIZE):
+            chunk = keys[start:start + BULK_CHUNK_SIZE]
+            placeholders = ','.join('?' * len(chunk))
+            rows = conn.execute(
+                f'SELECT key, value FROM routes WHERE created_at >= ? AND key IN ({placeholders})',
+                (oldest, *chunk)
+            )
+            for key, value in rows:
+                found[key] = json.loads(value)
+        return found
+
+    def sample(self, limit: int) -> List[Tuple[str, Dict]]:
+        """Most recently used route entries, skipping geometry variants and itineraries"""
+        rows = self._connect().execute(
+            "SELECT key, value FROM routes WHERE key NOT LIKE 'variant:%' AND key NOT LIKE 'itinerary:%' "
+            "AND key NOT LIKE 'cell:%' ORDER BY accessed_at DESC LIMIT ?", (limit,)
+        )
+        return [(key, json.loads(value)) for key, value in rows]
+
+    def iter_entries(self) -> Iterator[Tuple[str, str, float]]:
+        """Yield (key, JSON payload, created_at) for every entry still servable, for snapshots"""
+        oldest = time.time() - self.ttl - self.stale_ttl
+        # A separate connection keeps the long read out of this thread's cursor state
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            yield from conn.execute('SELECT key, value, created_at FROM routes WHERE created_at >= ?', (oldest,))
+        finally:
+            conn.close()
+
+    def put_entries(self, entries: List[Tuple[str, str, float]]):
+        """Store raw (key, JSON payload, created_at) entries, keeping newer local copies"""
+        now = time.time()
+        conn = self._connect()
+        conn.execute('BEGIN')
+        try:
+            conn.executemany(
+                """
+                INSERT INTO routes (key, value, size, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (key) DO UPDATE SET
+                    value = excluded.value, size = excluded.size, created_at = excluded.created_at
+                WHERE excluded.created_at > routes.created_at
+                """,
+                [(key, payload, len(payload), created_at, now) for key, payload, created_at in entries]
+            )
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        with self._stats_lock:
+            self._writes += len(entries)
+        self.evict()
+
+    def set(self, key: str, value: Dict):
+        """Store a route, evicting old entries when over the byte budget"""
+        payload = json.dumps(value, separators=(',', ':'))
+        now = time.time()
+        conn = self._connect()
+        conn.execute(
+            'INSERT OR REPLACE INTO routes (key, value, size, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)',
+            (key, payload, len(payload), now, now)
+        )
+        conn.execute('DELETE FROM route_failures WHERE key = ?', (key,))
+
+        with self._stats_lock:
+            self._writes += 1
+            check = self._writes % EVICTION_CHECK_INTERVAL == 0
+        if check:
+            self.evict()
+
+    def set_many(self, items: Dict[str, Dict]):
+        """Store many routes in a single transaction"""
+        now = time.time()
+        rows = []
+        for key, value in items.items():
+            payload = json.dumps(value, separators=(',', ':'))
+            rows.append((key, payload, len(payload), now, now))
+
+        conn = self._connect()
+        conn.execute('BEGIN')
+        try:
+            conn.executemany(
+                'INSERT OR REPLACE INTO routes (key, value, size, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)',
+                rows
+            )
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+        with self._stats_lock:
+            before = self._writes
+            self._writes += len(rows)
+            check = before // EVICTION_CHECK_INTERVAL != self._writes // EVICTION_CHECK_INTERVAL
+        if check:
+            self.evict()
+
+    def backing_off(self, key: str) -> bool:
+        """Whether `key` failed recently and should not be retried yet, without counting anything"""
+        row = self._connect().execute(
+            'SELECT retry_at FROM route_failures WHERE key = ?', (key,)
+        ).fetchone()
+        return row is not None and row[0] > time.time()
+
+    def record_failure(self, key: str):
+        """Remember a failed lookup, backing off further on each repeat failure"""
+        conn = self._connect()
+        row = conn.execute('SELECT failures FROM route_failures WHERE key = ?', (key,)).fetchone()
+        failures = (row[0] if row else 0) + 1
+        delay = self._backoff(failures)
+        conn.execute(
+            'INSERT OR REPLACE INTO route_failures (key, failures, retry_at) VALUES (?, ?, ?)',
+            (key, failures, time.time() + delay)
+        )
+
+    def clear_failures(self):
+        """Forget every failed lookup so they are retried on next use"""
+        conn = self._connect()
+        conn.execute('DELETE FROM route_failures')
+        conn.execute('UPDATE cache_stats SET negative_hits = 0')
+        self._reset_local_stats(('negative_hits',))
+
+    def evict(self):
+        """Drop expired entries, then least recently used ones until under `max_bytes`"""
+        conn = self._connect()
+        now = time.time()
+        conn.execute('DELETE FROM routes WHERE created_at < ?', (now - self.ttl - self.stale_ttl,))
+        conn.execute('DELETE FROM route_failures WHERE retry_at < ?', (now - self.negative_max_ttl,))
+
+        total = conn.execute('SELECT COALESCE(SUM(size), 0) FROM routes').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        # Trim to 90% of the budget so we do not evict again on the next write
+        excess = total - int(self.max_bytes * 0.9)
+        freed = 0
+        stale_keys = []
+        for key, size in conn.execute('SELECT key, size FROM routes ORDER BY accessed_at'):
+            stale_keys.append((key,))
+            freed += size
+            if freed >= excess:
+                break
+        conn.executemany('DELETE FROM routes WHERE key = ?', stale_keys)
+
+    def clear(self):
+        """Remove every cached route and failure and reset the counters"""
+        conn = self._connect()
+        conn.execute('DELETE FROM routes')
+        conn.execute('DELETE FROM route_failures')
+        conn.execute('DELETE FROM cache_stats')
+        self._reset_local_stats()
+
+    def _write_stats(self, deltas: Dict[str, int]):
+        self._connect().execute(
+            """
+            INSERT INTO cache_stats (worker, hits, stale_hits, misses, negative_hits, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT (worker) DO UPDATE SET
+                hits = hits + excluded.hits,
+                stale_hits = stale_hits + excluded.stale_hits,
+                misses = misses + excluded.misses,
+                negative_hits = negative_hits + excluded.negative_hits,
+                updated_at = excluded.updated_at
+            """,
+            (self.worker, *(deltas[field] for field in STATS_FIELDS), time.time())
+        )
+
+    def _read_stats(self) -> Dict[str, Dict]:
+        rows = self._connect().execute(
+            'SELECT worker, hits, stale_hits, misses, negative_hits, updated_at FROM cache_stats'
+        )
+        return {row[0]: {**dict(zip(STATS_FIELDS, row[1:5])), 'updated_at': row[5]} for row in rows}
+
+    def _storage_info(self) -> Dict:
+        conn = self._connect()
+        count, total = conn.execute(
+            'SELECT COUNT(*), COALESCE(SUM(size), 0) FROM routes'
+        ).fetchone()
+        failing = conn.execute(
+            'SELECT COUNT(*) FROM route_failures WHERE retry_at > ?', (time.time(),)
+        ).fetchone()[0]
+        return {'failing_keys': failing, 'size': count, 'bytes': total}
+
+class MemoryRouteCache(BaseRouteCache):
+    """
+    In-process LRU route cache
+    Not shared between workers; meant for a single process and for tests
+    """
+    backend = 'memory'
+
+    def __init__(self, **settings):
+        super().__init__(**settings)
+        self._routes: 'OrderedDict[str, Tuple[str, float]]' = OrderedDict()
+        self._failures: Dict[str, Tuple[int, float]] = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def lookup(self, key: str, count_misses: bool = True) -> Tuple[Optional[Dict], bool]:
+        """Return (route, is_stale) for `key`, see RouteCache.lookup"""
+        now = time.time()
+        with self._lock:
+            entry = self._routes.get(key)
+            if entry is not None and now - entry[1] <= self.ttl + self.stale_ttl:
+                self._routes.move_to_end(key)
+            else:
+                entry = None
+        if entry is None:
+            if count_misses:
+                self._count('misses')
+            return None, False
+        stale = now - entry[1] > self.ttl
+        self._count('stale_hits' if stale else 'hits')
+        return json.loads(entry[0]), stale
+
+    def get_many(self, keys: List[str]) -> Dict[str, Dict]:
+        oldest = time.time() - self.ttl
+        with self._lock:
+            entries = {key: self._routes.get(key) for key in keys}
+        return {key: json.loads(entry[0]) for key, entry in entries.items() if entry is not None and entry[1] >= oldest}
+
+    def sample(self, limit: int) -> List[Tuple[str, Dict]]:
+        with self._lock:
+            keys = [key for key in reversed(self._routes) if not key.startswith(('variant:', 'itinerary:', 'cell:'))][:limit]
+            entries = [(key, self._routes[key][0]) for key in keys]
+        return [(key, json.loads(payload)) for key, payload in entries]
+
+    def iter_entries(self) -> Iterator[Tuple[str, str, float]]:
+        oldest = time.time() - self.ttl - self.stale_ttl
+        with self._lock:
+            entries = [(key, payload, created_at) for key, (payload, created_at) in self._routes.items()]
+        return iter([entry for entry in entries if entry[2] >= oldest])
+
+    def put_entries(self, entries: List[Tuple[str, str, float]]):
+        with self._lock:
+            for key, payload, created_at in entries:
+                previous = self._routes.get(key)
+                if previous is not None:
+                    if previous[1] >= created_at:
+                        continue
+                    self._bytes -= len(previous[0])
+                self._routes[key] = (payload, created_at)
+                self._bytes += len(payload)
+        self.evict()
+
+    def set(self, key: str, value: Dict):
+        self.set_many({key: value})
+
+    def set_many(self, items: Dict[str, Dict]):
+        now = time.time()
+        payloads = {key: json.dumps(value, separators=(',', ':')) for key, value in items.items()}
+        with self._lock:
+            for key, payload in payloads.items():
+                previous = self._routes.pop(key, None)
+                if previous is not None:
+                    self._bytes -= len(previous[0])
+                self._routes[key] = (payload, now)
+                self._bytes += len(payload)
+                self._failures.pop(key, None)
+        self.evict()
+
+    def backing_off(self, key: str) -> bool:
+        failure = self._failures.get(key)
+        return failure is not None and failure[1] > time.time()
+
+    def record_failure(self, key: str):
+        with self._lock:
+            failures = self._failures.get(key, (0, 0))[0] + 1
+            self._failures[key] = (failures, time.time() + self._backoff(failures))
+
+    def clear_failures(self):
+        with self._lock:
+            self._failures.clear()
+        self._reset_local_stats(('negative_hits',))
+
+    def evict(self):
+        """Drop least recently used entries until under `max_bytes`"""
+        with self._lock:
+            if self._bytes <= self.max_bytes:
+                return
+            target = int(self.max_bytes * 0.9)
+            while self._routes and self._bytes > target:
+                _, (payload, _) = self._routes.popitem(last=False)
+                self._bytes -= len(payload)
+
+    def clear(self):
+        with self._lock:
+            self._routes.clear()
+            self._failures.clear()
+            self._bytes = 0
+        self._reset_local_stats()
+
+    def flush_stats(self):
+        # Counters are never shared, so there is nothing to flush
+        with self._stats_lock:
+            self._pending = dict.fromkeys(STATS_FIELDS, 0)
+
+    def _read_stats(self) -> Dict[str, Dict]:
+        return {self.worker: {field: getattr(self, field) for field in STATS_FIELDS}}
+
+    def _storage_info(self) -> Dict:
+        now = time.time()
+        with self._lock:
+            failing = sum(1 for _, retry_at in self._failures.values() if retry_at > now)
+            return {'failing_keys': failing, 'size': len(self._routes), 'bytes': self._bytes}
+
+class RedisRouteCache(BaseRouteCache):
+    """
+    Route cache on a Redis-protocol server (Redis, Valkey, KeyDB, ...), shared
+    by every worker that points at it
+    Entries expire on the server after `ttl + stale_ttl`; the byte budget is
+    left to the server's maxmemory policy (allkeys-lru), so `evict` is a no-op
+    """
+    backend = 'redis'
+
+    def __init__(self, url: str, prefix: str = 'lakbai', **settings):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError('The redis route cache backend needs the redis package (pip install redis)')
+        super().__init__(**settings)
+        self.url = url
+        self.prefix = prefix
+        self.client = redis.Redis.from_url(url)
+        self._info_supported = True
+
+    def _route_key(self, key: str) -> str:
+        return f"{self.prefix}:route:{key}"
+
+    def _failure_key(self, key: str) -> str:
+        return f"{self.prefix}:fail:{key}"
+
+    def _scan(self, kind: str):
+        return self.client.scan_iter(match=f"{self.prefix}:{kind}:*", count=BULK_CHUNK_SIZE)
+
+    def lookup(self, key: str, count_misses: bool = True) -> Tuple[Optional[Dict], bool]:
+        """Return (route, is_stale) for `key`, see RouteCache.lookup"""
+        value, created_at = self.client.hmget(self._route_key(key), 'value', 'created_at')
+        age = time.time() - float(created_at) if value is not None else None
+        if value is None or age > self.ttl + self.stale_ttl:
+            if count_misses:
+                self._count('misses')
+            return None, False
+        stale = age > self.ttl
+        self._count('stale_hits' if stale else 'hits')
+        return json.loads(value), stale
+
+    def get_many(self, keys: List[str]) -> Dict[str, Dict]:
+        oldest = time.time() - self.ttl
+        found = {}
+        for start in range(0, len(keys), BULK_CHUNK_SIZE):
+            chunk = keys[start:start + BULK_CHUNK_SIZE]
+            pipe = self.client.pipeline(transaction=False)
+            for key in chunk:
+                pipe.hmget(self._route_key(key), 'value', 'created_at')
+            for key, (value, created_at) in zip(chunk, pipe.execute()):
+                if value is not None and float(created_at) >= oldest:
+                    found[key] = json.loads(value)
+        return found
+
+    def sample(self, limit: int) -> List[Tuple[str, Dict]]:
+        skip = tuple(f"{self.prefix}:route:{kind}:" for kind in ('variant', 'itinerary', 'cell'))
+        names = []
+        for name in self._scan('route'):
+            name = name.decode()
+            if not name.startswith(skip):
+                names.append(name)
+                if len(names) >= limit:
+                    break
+        pipe = self.client.pipeline(transaction=False)
+        for name in names:
+            pipe.hget(name, 'value')
+        prefix_length = len(f"{self.prefix}:route:")
+        return [(name[prefix_length:], json.loads(value))
+                for name, value in zip(names, pipe.execute()) if value is not None]
+
+    def iter_entries(self) -> Iterator[Tuple[str, str, float]]:
+        oldest = time.time() - self.ttl - self.stale_ttl
+        prefix_length = len(f"{self.prefix}:route:")
+        names = []
+        for name in self._scan('route'):
+            names.append(name)
+            if len(names) >= BULK_CHUNK_SIZE:
+                yield from self._read_entries(names, oldest, prefix_length)
+                names = []
+        yield from self._read_entries(names, oldest, prefix_length)
+
+    def _read_entries(self, names: List[bytes], oldest: float, prefix_length: int) -> List[Tuple[str, str, float]]:
+        pipe = self.client.pipeline(transaction=False)
+        for name in names:
+            pipe.hmget(name, 'value', 'created_at')
+        return [
+            (name.decode()[prefix_length:], value.decode(), float(created_at))
+            for name, (value, created_at) in zip(names, pipe.execute())
+            if value is not None and float(created_at) >= oldest
+        ]
+
+    def put_entries(self, entries: List[Tuple[str, str, float]]):
+        now = time.time()
+        pipe = self.client.pipeline(transaction=False)
+        for key, payload, created_at in entries:
+            remaining = int(created_at + self.ttl + self.stale_ttl - now) + 1
+            if remaining <= 0:
+                continue
+            name = self._route_key(key)
+            pipe.hset(name, mapping={'value': payload, 'created_at': created_at})
+            pipe.expire(name, remaining)
+        pipe.execute()
+
+    def set(self, key: str, value: Dict):
+        self.set_many({key: value})
+
+    def set_many(self, items: Dict[str, Dict]):
+        now = time.time()
+        expire = int(self.ttl + self.stale_ttl) + 1
+        pipe = self.client.pipeline(transaction=False)
+        for key, value in items.items():
+            name = self._route_key(key)
+            pipe.hset(name, mapping={'value': json.dumps(value, separators=(',', ':')), 'created_at': now})
+            pipe.expire(name, expire)
+            pipe.delete(self._failure_key(key))
+        pipe.execute()
+
+    def backing_off(self, key: str) -> bool:
+        retry_at = self.client.hget(self._failure_key(key), 'retry_at')
+        return retry_at is not None and float(retry_at) > time.time()
+
+    def record_failure(self, key: str):
+        name = self._failure_key(key)
+        failures = self.client.hincrby(name, 'failures', 1)
+        delay = self._backoff(failures)
+        pipe = self.client.pipeline(transaction=False)
+        pipe.hset(name, 'retry_at', time.time() + delay)
+        pipe.expire(name, int(delay + self.negative_max_ttl) + 1)
+        pipe.execute()
+
+    def _delete_all(self, kind: str):
+        batch = []
+        for name in self._scan(kind):
+            batch.append(name)
+            if len(batch) >= BULK_CHUNK_SIZE:
+                self.client.delete(*batch)
+                batch = []
+        if batch:
+            self.client.delete(*batch)
+
+    def clear_failures(self):
+        self._delete_all('fail')
+        for name in self._scan('stats'):
+            self.client.hset(name, 'negative_hits', 0)
+        self._reset_local_stats(('negative_hits',))
+
+    def evict(self):
+        pass
+
+    def clear(self):
+        for kind in ('route', 'fail', 'stats'):
+            self._delete_all(kind)
+        self._reset_local_stats()
+
+    def _write_stats(self, deltas: Dict[str, int]):
+        name = f"{self.prefix}:stats:{self.worker}"
+        pipe = self.client.pipeline(transaction=False)
+        for field, delta in deltas.items():
+            if delta:
+                pipe.hincrby(name, field, delta)
+        pipe.hset(name, 'updated_at', time.time())
+        pipe.execute()
+
+    def _read_stats(self) -> Dict[str, Dict]:
+        names = list(self._scan('stats'))
+        pipe = self.client.pipeline(transaction=False)
+        for name in names:
+            pipe.hgetall(name)
+        prefix_length = len(f"{self.prefix}:stats:")
+        workers = {}
+        for name, values in zip(names, pipe.execute()):
+            values = {k.decode(): float(v) for k, v in values.items()}
+            workers[name.decode()[prefix_length:]] = {
+                **{field: int(values.get(field, 0)) for field in STATS_FIELDS},
+                'updated_at': values.get('updated_at')
+            }
+        return workers
+
+    def _storage_info(self) -> Dict:
+        # Counting walks the keyspace, which is fine for an admin endpoint
+        now = time.time()
+        size = sum(1 for _ in self._scan('route'))
+        failing = 0
+        for name in self._scan('fail'):
+            retry_at = self.client.hget(name, 'retry_at')
+            failing += retry_at is not None and float(retry_at) > now
+        used_memory = 0
+        if self._info_supported:
+            try:
+                used_memory = self.client.info('memory').get('used_memory', 0)
+            except Exception:
+                # Minimal Redis-protocol stand-ins may not implement INFO, and
+                # some drop the connection over it, so stop asking and reconnect
+                self._info_supported = False
+                self.client.connection_pool.disconnect()
+        return {'failing_keys': failing, 'size': size, 'bytes': used_memory}
+
+ROUTE_CACHE_BACKENDS = ('sqlite', 'redis', 'memory')
+
+def create_route_cache(backend: str, path: str, redis_url: str, redis_prefix: str = 'lakbai',
+                       **settings) -> BaseRouteCache:
+    """Build the configured route cache backend: 'sqlite', 'redis' or 'memory'"""
+    if backend == 'sqlite':
+        return RouteCache(path, **settings)
+    if backend == 'redis':
+        return RedisRouteCache(redis_url, redis_prefix, **settings)
+    if backend == 'memory':
+        return MemoryRouteCache(**settings)
+    raise ValueError(f"Unknown route cache backend {backend!r}, expected one of {', '.join(ROUTE_CACHE_BACKENDS)}")
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls for the same key
+    The first caller runs the function; callers arriving while it is still
+    running wait for and share its result instead of repeating the work
+    """
+
+    def __init__(self):
+        self.calls = 0
+        self.coalesced = 0
+        self._lock = threading.Lock()
+        self._in_flight: Dict[str, Future] = {}
+
+    def do(self, key: str, fn: Callable, *args):
+        """Run `fn(*args)` once for all concurrent callers using `key`"""
+        with self._lock:
+            future = self._in_flight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._in_flight[key] = future
+                self.calls += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            return future.result()
+
+        try:
+            result = fn(*args)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+
+    def info(self) -> Dict:
+        with self._lock:
+            return {
+                'in_flight': len(self._in_flight),
+                'flight_calls': self.calls,
+                'coalesced_waits': self.coalesced
+            }
@@ -0,0 +1,93 @@
+"""
+Offline route estimator for LAKBAI
+Approximates a route as the straight-line distance times a road detour factor,
+travelled at a per-profile speed, both fitted from routes OSRM already returned
+"""
+
+import statistics
+import threading
+import time
+from typing import Dict, Iterable, Optional, Tuple
+
+from route_keys import haversine_m
+
+Coords = Tuple[float, float]
+
+# Used until enough real routes have been seen for a profile
+DEFAULT_DETOUR_FACTOR = 1.35
+DEFAULT_SPEEDS_M_PER_MIN = {
+    'driving': 400,   # ~24 km/h city traffic
+    'cycling': 250,   # ~15 km/h
+    'foot': 80        # ~4.8 km/h
+}
+
+# Samples per profile needed before fitted values replace the defaults
+MIN_SAMPLES = 10
+
+# Very short routes are dominated by snapping to the road network, so they
+# are left out of the fit
+MIN_SAMPLE_DISTANCE_M = 300
+
+class RouteEstimator:
+    """Per-profile detour factor and speed, refitted from OSRM results"""
+
+    def __init__(self):
+        self.detour: Dict[str, float] = {}
+        self.speed: Dict[str, float] = {}
+        self.samples: Dict[str, int] = {}
+        self.fitted_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def fit(self, samples: Iterable[Tuple[str, float, float, float]]):
+        """
+        Fit from (profile, straight-line meters, route meters, route minutes) samples
+        The detour factor is the median ratio of road to straight-line distance;
+        the speed is total distance over total time so short, minute-rounded
+        durations do not skew it
+        """
+        ratios: Dict[str, list] = {}
+        distance: Dict[str, float] = {}
+        duration: Dict[str, float] = {}
+        for profile, straight_m, route_m, minutes in samples:
+            if straight_m < MIN_SAMPLE_DISTANCE_M or route_m <= 0:
+                continue
+            ratios.setdefault(profile, []).append(route_m / straight_m)
+            if minutes > 0:
+                distance[profile] = distance.get(profile, 0) + route_m
+                duration[profile] = duration.get(profile, 0) + minutes
+
+        detour, speed, counts = {}, {}, {}
+        for profile, values in ratios.items():
+            counts[profile] = len(values)
+            if len(values) < MIN_SAMPLES:
+                continue
+            detour[profile] = max(statistics.median(values), 1.0)
+            if duration.get(profile):
+                speed[profile] = distance[profile] / duration[profile]
+
+        with self._lock:
+            self.detour, self.speed, self.samples = detour, speed, counts
+            self.fitted_at = time.time()
+
+    def estimate(self, from_coords: Coords, to_coords: Coords, profile: str) -> Dict:
+        """Estimated route in the same shape as an OSRM route, flagged `estimated`"""
+        with self._lock:
+            detour = self.detour.get(profile, DEFAULT_DETOUR_FACTOR)
+            speed = self.speed.get(profile, DEFAULT_SPEEDS_M_PER_MIN.get(profile, DEFAULT_SPEEDS_M_PER_MIN['driving']))
+
+        distance = haversine_m(from_coords, to_coords) * detour
+        return {
+            'duration': round(distance / speed),
+            'distance': round(distance, 1),
+            'geometry': {'type': 'LineString', 'coordinates': [list(from_coords), list(to_coords)]},
+            'estimated': True
+        }
+
+    def info(self) -> Dict:
+        with self._lock:
+            return {
+                'fitted_at': self.fitted_at,
+                'samples': dict(self.samples),
+                'detour_factor': {profile: round(value, 3) for profile, value in self.detour.items()},
+                'speed_kmh': {profile: round(value * 60 / 1000, 1) for profile, value in self.speed.items()}
+            }
@@ -0,0 +1,118 @@
+"""
+Route geometry helpers for LAKBAI
+Douglas-Peucker simplification and encoded polyline output for route payloads
+"""
+
+import math
+from typing import List, Optional
+
+import numpy as np
+
+METERS_PER_DEGREE = 111320
+
+# Web Mercator ground resolution at the equator for zoom 0, in meters per pixel
+EQUATOR_METERS_PER_PIXEL = 156543.03392
+
+def zoom_tolerance_m(zoom: float, latitude: float) -> float:
+    """Meters covered by one map pixel at `zoom` and `latitude`"""
+    return EQUATOR_METERS_PER_PIXEL * math.cos(math.radians(latitude)) / 2 ** zoom
+
+def simplify_line(coordinates: List[List[float]], tolerance_m: float) -> List[List[float]]:
+    """
+    Simplify a [lng, lat] line with Douglas-Peucker at `tolerance_m` meters
+    Points are projected onto a local equirectangular plane, which is accurate
+    enough at city scale, and each split is measured with one vectorized pass
+    """
+    n = len(coordinates)
+    if tolerance_m <= 0 or n < 3:
+        return coordinates
+
+    points = np.asarray(coordinates, dtype=float)
+    scale = math.cos(math.radians(points[:, 1].mean()))
+    xy = np.column_stack((points[:, 0] * scale, points[:, 1])) * METERS_PER_DEGREE
+
+    keep = np.zeros(n, dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, n - 1)]
+    while stack:
+        start, end = stack.pop()
+        if end - start < 2:
+            continue
+
+        chord = xy[end] - xy[start]
+        offsets = xy[start + 1:end] - xy[start]
+        chord_length = math.hypot(chord[0], chord[1])
+        if chord_length == 0:
+            distances = np.hypot(offsets[:, 0], offsets[:, 1])
+        else:
+            distances = np.abs(chord[0] * offsets[:, 1] - chord[1] * offsets[:, 0]) / chord_length
+
+        farthest = int(np.argmax(distances))
+        if distances[farthest] > tolerance_m:
+            split = start + 1 + farthest
+            keep[split] = True
+            stack.append((start, split))
+            stack.append((split, end))
+
+    return points[keep].tolist()
+
+def encode_polyline(coordinates: List[List[float]], precision: int = 5) -> str:
+    """Encode [lng, lat] points as a Google encoded polyline (lat, lng order)"""
+    factor = 10 ** precision
+    chunks = []
+    previous_lat = previous_lng = 0
+
+    for lng, lat in coordinates:
+        lat_value, lng_value = int(round(lat * factor)), int(round(lng * factor))
+        for delta in (lat_value - previous_lat, lng_value - previous_lng):
+            delta = ~(delta << 1) if delta < 0 else delta << 1
+            while delta >= 0x20:
+                chunks.append(chr((0x20 | (delta & 0x1f)) + 63))
+                delta >>= 5
+            chunks.append(chr(delta + 63))
+        previous_lat, previous_lng = lat_value, lng_value
+
+    return ''.join(chunks)
+
+def decode_polyline(encoded: str, precision: int = 5) -> List[List[float]]:
+    """Decode a Google encoded polyline into [lng, lat] points"""
+    factor = 10 ** precision
+    coordinates = []
+    index = lat = lng = 0
+
+    while index < len(encoded):
+        deltas = []
+        for _ in range(2):
+            shift = result = 0
+            while True:
+                byte = ord(encoded[index]) - 63
+                index += 1
+                result |= (byte & 0x1f) << shift
+                shift += 5
+                if byte < 0x20:
+                    break
+            deltas.append(~(result >> 1) if result & 1 else result >> 1)
+        lat += deltas[0]
+        lng += deltas[1]
+        coordinates.append([lng / factor, lat / factor])
+
+    return coordinates
+
+def shape_geometry(geometry: Optional[dict], mode: str = 'geojson', tolerance_m: float = 0,
+                   zoom: Optional[float] = None):
+    """
+    Convert a GeoJSON LineString to the requested output
+    `mode` is 'geojson', 'polyline' or 'none'; a `zoom` level overrides
+    `tolerance_m` with one pixel at that zoom
+    """
+    if mode == 'none' or not geometry:
+        return None
+
+    coordinates = geometry['coordinates']
+    if zoom is not None and coordinates:
+        tolerance_m = zoom_tolerance_m(zoom, coordinates[0][1])
+    coordinates = simplify_line(coordinates, tolerance_m)
+
+    if mode == 'polyline':
+        return encode_polyline(coordinates)
+    return {'type': 'LineString', 'coordinates': coordinates}
@@ -0,0 +1,157 @@
+"""
+Route cache keys for LAKBAI
+Quantizes coordinates and snaps endpoints to known POIs so near-identical
+route requests from web and mobile share cache entries
+"""
+
+import csv
+import math
+from typing import Dict, List, Optional, Tuple
+
+Coords = Tuple[float, float]
+
+EARTH_RADIUS_M = 6371000
+
+GEOHASH_ALPHABET = '0123456789bcdefghjkmnpqrstuvwxyz'
+
+# Default precision per quantization mode: decimal places for grid (~1.1 m)
+# and characters for geohash (~4.8 m x 4.8 m cells)
+DEFAULT_PRECISION = {
+    'grid': 5,
+    'geohash': 9,
+}
+
+def haversine_m(a: Coords, b: Coords) -> float:
+    """Great-circle distance in meters between two [lng, lat] points"""
+    lng1, lat1 = math.radians(a[0]), math.radians(a[1])
+    lng2, lat2 = math.radians(b[0]), math.radians(b[1])
+    h = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(math.sqrt(h))
+
+def geohash_encode(lng: float, lat: float, precision: int) -> str:
+    """Encode a point as a geohash string of `precision` characters"""
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    bit_count = 0
+    even = True
+
+    while len(chars) < precision:
+        value_range, value = (lng_range, lng) if even else (lat_range, lat)
+        mid = (value_range[0] + value_range[1]) / 2
+        if value >= mid:
+            bits = (bits << 1) | 1
+            value_range[0] = mid
+        else:
+            bits <<= 1
+            value_range[1] = mid
+        even = not even
+
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(GEOHASH_ALPHABET[bits])
+            bits = 0
+            bit_count = 0
+
+    return ''.join(chars)
+
+def quantize_point(coords: Coords, mode: str = 'none', precision: Optional[int] = None) -> str:
+    """Render a [lng, lat] point for use in a cache key"""
+    if mode == 'grid':
+        places = precision if precision is not None else DEFAULT_PRECISION['grid']
+        return f"{coords[0]:.{places}f},{coords[1]:.{places}f}"
+    if mode == 'geohash':
+        return geohash_encode(coords[0], coords[1], precision or DEFAULT_PRECISION['geohash'])
+    return f"{coords[0]!r},{coords[1]!r}"
+
+def route_key(from_coords: Coords, to_coords: Coords, profile: str,
+              mode: str = 'none', precision: Optional[int] = None) -> str:
+    """Build the cache key for a route between two [lng, lat] points"""
+    return f"{profile}:{quantize_point(from_coords, mode, precision)};{quantize_point(to_coords, mode, precision)}"
+
+def load_poi_coordinates(path: str) -> Dict[int, Coords]:
+    """Read POI IDs and [lng, lat] coordinates from a POI-{city}.csv file"""
+    pois = {}
+    with open(path, newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f, delimiter=';'):
+            pois[int(row['poiID'])] = (float(row['long']), float(row['lat']))
+    return pois
+
+class PoiSnapper:
+    """
+    Snaps points within `radius_m` meters of a known POI to that POI's coordinates
+    POIs are bucketed on a lat/lng grid roughly `radius_m` wide, so a lookup
+    only measures distances to POIs in the neighbouring cells
+    """
+
+    def __init__(self, pois: Dict[int, Coords], radius_m: float):
+        self.pois = pois
+        self.radius_m = radius_m
+        # One degree of latitude is ~111 km; widen longitude cells for the
+        # northernmost POI so neighbouring cells always cover the radius
+        self.cell_deg = max(radius_m, 1) / 111000
+        max_lat = max((abs(lat) for _, lat in pois.values()), default=0)
+        self.lng_cell_deg = self.cell_deg / max(math.cos(math.radians(max_lat)), 0.01)
+        self.grid: Dict[Tuple[int, int], List[int]] = {}
+        for poi_id, coords in pois.items():
+            self.grid.setdefault(self._cell(coords), []).append(poi_id)
+
+    def _cell(self, coords: Coords) -> Tuple[int, int]:
+        return int(math.floor(coords[0] / self.lng_cell_deg)), int(math.floor(coords[1] / self.cell_deg))
+
+    def nearest(self, coords: Coords) -> Optional[int]:
+        """Return the ID of the closest POI within the radius, if any"""
+        if self.radius_m <= 0:
+            return None
+
+        cx, cy = self._cell(coords)
+        best_id, best_distance = None, self.radius_m
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                for poi_id in self.grid.get((cx + dx, cy + dy), ()):
+                    distance = haversine_m(coords, self.pois[poi_id])
+                    if distance <= best_distance:
+                        best_id, best_distance = poi_id, distance
+        return best_id
+
+    def snap(self, coords: Coords) -> Tuple[Coords, bool]:
+        """Return (canonical coordinates, whether the point was snapped)"""
+        poi_id = self.nearest(coords)
+        if poi_id is None:
+            return coords, False
+        canonical = self.pois[poi_id]
+        return canonical, canonical != tuple(coords)
+
+class PoiGrid:
+    """Fixed-size lat/lng grid over POIs for radius queries"""
+
+    def __init__(self, pois: Dict[int, Coords], cell_m: float = 500):
+        self.pois = pois
+        self.cell_deg = cell_m / 111000
+        max_lat = max((abs(lat) for _, lat in pois.values()), default=0)
+        self.lng_cell_deg = self.cell_deg / max(math.cos(math.radians(max_lat)), 0.01)
+        self.grid: Dict[Tuple[int, int], List[int]] = {}
+        for poi_id, coords in pois.items():
+            self.grid.setdefault(self._cell(coords), []).append(poi_id)
+
+    def _cell(self, coords: Coords) -> Tuple[int, int]:
+        return int(math.floor(coords[0] / self.lng_cell_deg)), int(math.floor(coords[1] / self.cell_deg))
+
+    def within(self, coords: Coords, radius_m: float) -> List[Tuple[int, float]]:
+        """(POI ID, straight-line meters) for every POI within `radius_m`, nearest first"""
+        cx, cy = self._cell(coords)
+        reach_x = int(math.ceil(radius_m / 111000 / self.lng_cell_deg))
+        reach_y = int(math.ceil(radius_m / 111000 / self.cell_deg))
+        found = []
+        if (2 * reach_x + 1) * (2 * reach_y + 1) > len(self.grid):
+            # The radius spans more cells than are occupied, so walk the occupied ones
+            cells = [cell for cell in self.grid if abs(cell[0] - cx) <= reach_x and abs(cell[1] - cy) <= reach_y]
+        else:
+            cells = [(cx + dx, cy + dy) for dx in range(-reach_x, reach_x + 1) for dy in range(-reach_y, reach_y + 1)]
+        for cell in cells:
+            for poi_id in self.grid.get(cell, ()):
+                distance = haversine_m(coords, self.pois[poi_id])
+                if distance <= radius_m:
+                    found.append((poi_id, distance))
+        return sorted(found, key=lambda item: item[1])
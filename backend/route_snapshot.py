@@ -0,0 +1,152 @@
+"""
+Route cache snapshots for LAKBAI
+Serializes cached routes (with geometry) to a compact versioned file so a new
+instance can load a warm cache before it takes traffic
+
+File layout:
+    header      magic b'LKCS', version, codec (uint8 each)
+    body        compressed NDJSON, one {"k": key, "t": created_at, "v": route} per line
+
+The body is zstd-compressed when the zstandard package is installed and
+zlib-compressed otherwise; either kind is read back as long as its codec is
+available.
+"""
+
+import json
+import math
+import struct
+import time
+import zlib
+from typing import BinaryIO, Dict, Iterable, Iterator, List, Optional, Tuple
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+MAGIC = b'LKCS'
+VERSION = 1
+HEADER = struct.Struct('<4sBB')
+
+CODEC_ZLIB = 1
+CODEC_ZSTD = 2
+CODEC_NAMES = {CODEC_ZLIB: 'zlib', CODEC_ZSTD: 'zstd'}
+
+# Entries written to the cache per batch while importing
+IMPORT_BATCH_SIZE = 500
+
+# Uncompressed bytes handed to the compressor at a time while exporting
+EXPORT_CHUNK_SIZE = 256 * 1024
+
+def default_codec() -> int:
+    return CODEC_ZSTD if zstandard is not None else CODEC_ZLIB
+
+def _compressor(codec: int):
+    if codec == CODEC_ZSTD:
+        return zstandard.ZstdCompressor(level=10).compressobj()
+    return zlib.compressobj(6)
+
+def _decompressor(codec: int):
+    if codec == CODEC_ZSTD:
+        if zstandard is None:
+            raise ValueError('Snapshot is zstd-compressed but the zstandard package is not installed')
+        return zstandard.ZstdDecompressor().decompressobj()
+    if codec == CODEC_ZLIB:
+        return zlib.decompressobj()
+    raise ValueError(f"Unknown snapshot codec {codec}")
+
+def iter_snapshot(entries: Iterable[Tuple[str, str, float]], codec: Optional[int] = None) -> Iterator[bytes]:
+    """Yield snapshot file chunks for (key, JSON payload, created_at) entries"""
+    codec = codec or default_codec()
+    compressor = _compressor(codec)
+    yield HEADER.pack(MAGIC, VERSION, codec)
+
+    buffer: List[str] = []
+    size = 0
+    for key, payload, created_at in entries:
+        line = f'{{"k":{json.dumps(key)},"t":{created_at!r},"v":{payload}}}\n'
+        buffer.append(line)
+        size += len(line)
+        if size >= EXPORT_CHUNK_SIZE:
+            chunk = compressor.compress(''.join(buffer).encode())
+            buffer, size = [], 0
+            if chunk:
+                yield chunk
+    if buffer:
+        chunk = compressor.compress(''.join(buffer).encode())
+        if chunk:
+            yield chunk
+    yield compressor.flush()
+
+def write_snapshot(cache, f: BinaryIO, codec: Optional[int] = None) -> None:
+    """Write every servable entry of `cache` to the binary file `f`"""
+    for chunk in iter_snapshot(cache.iter_entries(), codec):
+        f.write(chunk)
+
+def read_snapshot(f: BinaryIO) -> Iterator[Tuple[str, str, float]]:
+    """Yield (key, JSON payload, created_at) entries from a snapshot file object"""
+    header = f.read(HEADER.size)
+    if len(header) != HEADER.size:
+        raise ValueError('Snapshot is truncated')
+    magic, version, codec = HEADER.unpack(header)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"Not a version {VERSION} route cache snapshot")
+
+    decompressor = _decompressor(codec)
+    pending = b''
+    while True:
+        chunk = f.read(EXPORT_CHUNK_SIZE)
+        try:
+            data = decompressor.decompress(chunk) if chunk else decompressor.flush()
+        except Exception as e:
+            # zlib.error and zstandard.ZstdError share no base class beyond Exception
+            raise ValueError(f"Snapshot body is corrupt: {e}")
+        pending += data
+        *lines, pending = pending.split(b'\n')
+        for line in lines:
+            if line:
+                yield _parse_record(line)
+        if not chunk:
+            break
+    if pending.strip() or not decompressor.eof:
+        raise ValueError('Snapshot ends with an incomplete record')
+
+def _parse_record(line: bytes) -> Tuple[str, str, float]:
+    """
+    Validate one snapshot line as (key, JSON payload, created_at)
+    The key must be a string and the route an object with numeric duration
+    and distance; a created_at in the future is clamped to now, so an entry
+    cannot outlive its TTL or win merges against newer local entries
+    """
+    record = json.loads(line)
+    if not isinstance(record, dict):
+        raise ValueError('Snapshot record is not an object')
+    key, created_at, route = record.get('k'), record.get('t'), record.get('v')
+    if not isinstance(key, str) or not key:
+        raise ValueError('Snapshot record has no string key')
+    if not isinstance(route, dict) or not all(
+            isinstance(route.get(field), (int, float)) and not isinstance(route.get(field), bool)
+            for field in ('duration', 'distance')):
+        raise ValueError(f"Snapshot record {key!r} is not a route with a numeric duration and distance")
+    if isinstance(created_at, bool) or not isinstance(created_at, (int, float)) or not math.isfinite(created_at):
+        raise ValueError(f"Snapshot record {key!r} has no finite created_at")
+    return key, json.dumps(route, separators=(',', ':')), min(float(created_at), time.time())
+
+def import_snapshot(cache, f: BinaryIO) -> Dict[str, int]:
+    """Load a snapshot into `cache`; entries already expired there are skipped"""
+    oldest = time.time() - cache.ttl - cache.stale_ttl
+    imported = expired = 0
+    batch = []
+    for key, payload, created_at in read_snapshot(f):
+        if created_at < oldest:
+            expired += 1
+            continue
+        batch.append((key, payload, created_at))
+        if len(batch) >= IMPORT_BATCH_SIZE:
+            cache.put_entries(batch)
+            imported += len(batch)
+            batch = []
+    if batch:
+        cache.put_entries(batch)
+        imported += len(batch)
+    return {'imported': imported, 'expired': expired}
@@ -0,0 +1,193 @@
+"""
+Precomputed POI-to-POI route store for LAKBAI
+Dense float32 duration/distance matrices plus an offset-indexed geometry blob,
+memory-mapped so POI-to-POI routes are answered without calling OSRM
+
+File layout (little-endian):
+    header      magic b'LKRS', version, POI count, profile count, flags (uint32 each)
+    profiles    one 16-byte NUL-padded OSRM profile name per profile
+    poi_ids     int32[n]
+    poi_coords  float64[n, 2]           [lng, lat], 8-byte aligned
+    durations   float32[p, n, n]        minutes, NaN when unreachable
+    distances   float32[p, n, n]        meters, NaN when unreachable
+    offsets     uint64[p, n * n + 1]    only when FLAG_GEOMETRY is set
+    geometry    encoded polylines, cell (k, i, j) at offsets[k, i*n+j]:offsets[k, i*n+j+1]
+"""
+
+import mmap
+import os
+import struct
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from route_geometry import decode_polyline
+
+MAGIC = b'LKRS'
+VERSION = 1
+FLAG_GEOMETRY = 1
+HEADER = struct.Struct('<4sIIII')
+PROFILE_NAME_SIZE = 16
+
+# POI coordinates are matched after rounding to this many decimal places
+COORD_PRECISION = 6
+
+def _align(offset: int, alignment: int = 8) -> int:
+    return (offset + alignment - 1) // alignment * alignment
+
+def write_route_store(path: str, poi_ids: Sequence[int], coords: Sequence[Tuple[float, float]],
+                      profiles: Sequence[str], durations: np.ndarray, distances: np.ndarray,
+                      geometries: Optional[List[List[str]]] = None):
+    """
+    Write a route store file
+    `durations`/`distances` are shaped [profile, n, n]; `geometries`, when
+    given, holds one list of n * n encoded polylines per profile. The file
+    is written next to `path` and renamed over it, so processes that have
+    the old store mapped keep reading the old file instead of a truncated one
+    """
+    n, p = len(poi_ids), len(profiles)
+    flags = FLAG_GEOMETRY if geometries is not None else 0
+
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        _write_route_store_file(temp_path, poi_ids, coords, profiles, durations, distances, geometries, n, p, flags)
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+def _write_route_store_file(path, poi_ids, coords, profiles, durations, distances, geometries, n, p, flags):
+    with open(path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, n, p, flags))
+        for profile in profiles:
+            f.write(profile.encode('ascii')[:PROFILE_NAME_SIZE].ljust(PROFILE_NAME_SIZE, b'\0'))
+        f.write(np.asarray(poi_ids, dtype='<i4').tobytes())
+        f.write(b'\0' * (_align(f.tell()) - f.tell()))
+        f.write(np.asarray(coords, dtype='<f8').reshape(n, 2).tobytes())
+        f.write(np.asarray(durations, dtype='<f4').reshape(p, n, n).tobytes())
+        f.write(np.asarray(distances, dtype='<f4').reshape(p, n, n).tobytes())
+
+        if geometries is not None:
+            f.write(b'\0' * (_align(f.tell()) - f.tell()))
+            blobs = [[line.encode('ascii') for line in profile_lines] for profile_lines in geometries]
+            offsets = np.zeros((p, n * n + 1), dtype='<u8')
+            position = 0
+            for k, profile_blobs in enumerate(blobs):
+                for cell, blob in enumerate(profile_blobs):
+                    offsets[k, cell] = position
+                    position += len(blob)
+                offsets[k, n * n] = position
+            f.write(offsets.tobytes())
+            for profile_blobs in blobs:
+                f.write(b''.join(profile_blobs))
+
+class RouteStore:
+    """Read-only, memory-mapped view of a route store file"""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, n, p, flags = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} route store")
+
+        offset = HEADER.size
+        self.profiles = []
+        for _ in range(p):
+            self.profiles.append(self._mm[offset:offset + PROFILE_NAME_SIZE].rstrip(b'\0').decode('ascii'))
+            offset += PROFILE_NAME_SIZE
+
+        self.poi_ids = np.frombuffer(self._mm, dtype='<i4', count=n, offset=offset)
+        offset = _align(offset + 4 * n)
+        self.coords = np.frombuffer(self._mm, dtype='<f8', count=2 * n, offset=offset).reshape(n, 2)
+        offset += 16 * n
+        self.durations = np.frombuffer(self._mm, dtype='<f4', count=p * n * n, offset=offset).reshape(p, n, n)
+        offset += 4 * p * n * n
+        self.distances = np.frombuffer(self._mm, dtype='<f4', count=p * n * n, offset=offset).reshape(p, n, n)
+        offset += 4 * p * n * n
+
+        self.has_geometry = bool(flags & FLAG_GEOMETRY)
+        if self.has_geometry:
+            offset = _align(offset)
+            self.offsets = np.frombuffer(self._mm, dtype='<u8', count=p * (n * n + 1), offset=offset).reshape(p, n * n + 1)
+            self._blob_start = offset + 8 * p * (n * n + 1)
+
+        self.n = n
+        self._profile_index = {profile: k for k, profile in enumerate(self.profiles)}
+        self._coord_index = {self._coord_key(c): i for i, c in enumerate(self.coords.tolist())}
+        self._poi_index = {int(poi_id): i for i, poi_id in enumerate(self.poi_ids.tolist())}
+
+    @staticmethod
+    def _coord_key(coords: Sequence[float]) -> Tuple[float, float]:
+        return round(coords[0], COORD_PRECISION), round(coords[1], COORD_PRECISION)
+
+    def index_of(self, coords: Sequence[float]) -> Optional[int]:
+        """Matrix index of the POI at `coords`, if the point is a stored POI"""
+        return self._coord_index.get(self._coord_key(coords))
+
+    def index_of_poi(self, poi_id: int) -> Optional[int]:
+        """Matrix index of a POI ID, if stored"""
+        return self._poi_index.get(poi_id)
+
+    def has_profile(self, profile: str) -> bool:
+        return profile in self._profile_index
+
+    def geometry(self, k: int, i: int, j: int) -> Optional[Dict]:
+        """Decode the stored geometry for profile index `k` from POI index i to j"""
+        if not self.has_geometry:
+            return None
+        cell = i * self.n + j
+        start, end = int(self.offsets[k, cell]), int(self.offsets[k, cell + 1])
+        if start == end:
+            return None
+        encoded = self._mm[self._blob_start + start:self._blob_start + end].decode('ascii')
+        return {'type': 'LineString', 'coordinates': decode_polyline(encoded)}
+
+    def lookup(self, from_coords: Sequence[float], to_coords: Sequence[float], profile: str,
+               with_geometry: bool = True) -> Optional[Dict]:
+        """
+        Return a stored route between two POIs in the same shape as OSRM routes
+        None when either point is not a stored POI, the pair is unreachable, or
+        geometry was asked for but is not stored
+        """
+        k = self._profile_index.get(profile)
+        i, j = self.index_of(from_coords), self.index_of(to_coords)
+        if k is None or i is None or j is None or i == j:
+            return None
+        if with_geometry and not self.has_geometry:
+            return None
+
+        duration, distance = float(self.durations[k, i, j]), float(self.distances[k, i, j])
+        if np.isnan(duration) or np.isnan(distance):
+            return None
+
+        route = {'duration': round(duration), 'distance': distance}
+        if with_geometry:
+            route['geometry'] = self.geometry(k, i, j)
+            if route['geometry'] is None:
+                return None
+        return route
+
+    def matrix(self, indices: Sequence[int], profile: str) -> Optional[Dict[str, List[List]]]:
+        """Slice duration (minutes) and distance matrices for stored POI indices"""
+        k = self._profile_index.get(profile)
+        if k is None:
+            return None
+        rows = np.asarray(indices)
+        durations = self.durations[k][np.ix_(rows, rows)]
+        distances = self.distances[k][np.ix_(rows, rows)]
+        return {
+            'durations': [[None if np.isnan(v) else round(float(v)) for v in row] for row in durations],
+            'distances': [[None if np.isnan(v) else float(v) for v in row] for row in distances]
+        }
+
+    def info(self) -> Dict:
+        return {
+            'path': self.path,
+            'pois': self.n,
+            'profiles': self.profiles,
+            'geometry': self.has_geometry
+        }
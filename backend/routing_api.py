@@ -3,14 +3,33 @@ Routing API for LAKBAI
 Handles OSRM route calculations and provides endpoints for the frontend
 """
 
-from flask import Flask, request, jsonify
+from flask import Flask, Response, g, request, jsonify, stream_with_context
 from flask_cors import CORS
 import requests
 import os
-from functools import lru_cache
-from typing import Dict, List, Tuple
+import hashlib
+import hmac
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from http_responses import FastJSONProvider, compress_response, dumps_compact, set_cache_validators
+from osrm_client import OsrmClientPool, TokenBucket
+from route_cache import SingleFlight, create_route_cache
+from route_estimator import RouteEstimator
+from route_geometry import shape_geometry
+from route_keys import PoiGrid, PoiSnapper, haversine_m, load_poi_coordinates, route_key
+from route_snapshot import CODEC_NAMES, import_snapshot, iter_snapshot
+from route_store import RouteStore
+import routing_metrics as metrics
+from trip_optimizer import UNREACHABLE, optimize_order, path_cost
 
 app = Flask(__name__)
+app.json = FastJSONProvider(app)
 CORS(app)  # Enable CORS for frontend access
 
 # OSRM service URLs from environment or default to Cloud Run
@@ -18,6 +37,174 @@ OSRM_CAR_URL = os.environ.get('OSRM_CAR_URL', 'https://osrm-car-q2drvffsoa-as.a.
 OSRM_BICYCLE_URL = os.environ.get('OSRM_BICYCLE_URL', 'https://osrm-bicycle-q2drvffsoa-as.a.run.app')
 OSRM_FOOT_URL = os.environ.get('OSRM_FOOT_URL', 'https://osrm-foot-q2drvffsoa-as.a.run.app')
 
+# Maximum number of OSRM lookups the batch endpoints run at the same time
+ROUTE_BATCH_CONCURRENCY = int(os.environ.get('ROUTE_BATCH_CONCURRENCY', '8'))
+
+# OSRM's table service rejects requests with more locations than its
+# --max-table-size (100 by default), so larger matrices are fetched in blocks
+OSRM_TABLE_MAX_LOCATIONS = int(os.environ.get('OSRM_TABLE_MAX_LOCATIONS', '100'))
+
+# Largest matrix /api/routes/matrix will build in one request
+ROUTE_MATRIX_MAX_LOCATIONS = int(os.environ.get('ROUTE_MATRIX_MAX_LOCATIONS', '200'))
+
+# Keep-alive connection pool per OSRM host: pooled connections, concurrent
+# requests allowed per host, split connect/read timeouts, and retries with
+# jittered backoff that must all finish within OSRM_DEADLINE seconds
+OSRM_POOL_SIZE = int(os.environ.get('OSRM_POOL_SIZE', '16'))
+OSRM_MAX_CONCURRENCY = int(os.environ.get('OSRM_MAX_CONCURRENCY', '16'))
+OSRM_CONNECT_TIMEOUT = float(os.environ.get('OSRM_CONNECT_TIMEOUT', '3.05'))
+OSRM_READ_TIMEOUT = float(os.environ.get('OSRM_READ_TIMEOUT', '10'))
+OSRM_RETRIES = int(os.environ.get('OSRM_RETRIES', '2'))
+OSRM_RETRY_BACKOFF = float(os.environ.get('OSRM_RETRY_BACKOFF', '0.2'))
+OSRM_DEADLINE = float(os.environ.get('OSRM_DEADLINE', '15'))
+
+osrm_clients = OsrmClientPool(
+    pool_size=OSRM_POOL_SIZE,
+    max_concurrency=OSRM_MAX_CONCURRENCY,
+    connect_timeout=OSRM_CONNECT_TIMEOUT,
+    read_timeout=OSRM_READ_TIMEOUT,
+    retries=OSRM_RETRIES,
+    backoff=OSRM_RETRY_BACKOFF,
+    deadline=OSRM_DEADLINE
+)
+
+# Frontend profile names mapped to OSRM profile names
+PROFILE_TO_OSRM = {
+    'car': 'driving',
+    'bicycle': 'cycling',
+    'foot': 'foot'
+}
+
+# Persistent route cache shared by every worker process on the host
+ROUTE_CACHE_PATH = os.environ.get(
+    'ROUTE_CACHE_PATH',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'route_cache.sqlite3')
+)
+ROUTE_CACHE_TTL = float(os.environ.get('ROUTE_CACHE_TTL', str(7 * 24 * 3600)))
+ROUTE_CACHE_MAX_BYTES = int(os.environ.get('ROUTE_CACHE_MAX_BYTES', str(256 * 1024 * 1024)))
+
+# How long an expired route may still be served while it is refreshed in the
+# background (stale-while-revalidate); 0 turns the mode off
+ROUTE_CACHE_STALE_TTL = float(os.environ.get('ROUTE_CACHE_STALE_TTL', str(24 * 3600)))
+
+# Failed lookups are not retried for this long, doubling per repeat failure up to the max
+ROUTE_CACHE_NEGATIVE_TTL = float(os.environ.get('ROUTE_CACHE_NEGATIVE_TTL', '30'))
+ROUTE_CACHE_NEGATIVE_MAX_TTL = float(os.environ.get('ROUTE_CACHE_NEGATIVE_MAX_TTL', '300'))
+
+# Cache backend: 'sqlite' (file shared by the workers on one host), 'redis'
+# (any Redis-protocol server at ROUTE_CACHE_REDIS_URL, shareable across hosts)
+# or 'memory' (per process, for development and tests)
+ROUTE_CACHE_BACKEND = os.environ.get('ROUTE_CACHE_BACKEND', 'sqlite').lower()
+ROUTE_CACHE_REDIS_URL = os.environ.get('ROUTE_CACHE_REDIS_URL', 'redis://127.0.0.1:6379/0')
+ROUTE_CACHE_REDIS_PREFIX = os.environ.get('ROUTE_CACHE_REDIS_PREFIX', 'lakbai')
+
+route_cache = create_route_cache(
+    ROUTE_CACHE_BACKEND,
+    path=ROUTE_CACHE_PATH,
+    redis_url=ROUTE_CACHE_REDIS_URL,
+    redis_prefix=ROUTE_CACHE_REDIS_PREFIX,
+    ttl=ROUTE_CACHE_TTL,
+    max_bytes=ROUTE_CACHE_MAX_BYTES,
+    stale_ttl=ROUTE_CACHE_STALE_TTL,
+    negative_ttl=ROUTE_CACHE_NEGATIVE_TTL,
+    negative_max_ttl=ROUTE_CACHE_NEGATIVE_MAX_TTL
+)
+
+# Snapshot (file path or http(s) URL) loaded into the cache at startup, before
+# the instance takes traffic; see /api/cache/export
+ROUTE_CACHE_SNAPSHOT = os.environ.get('ROUTE_CACHE_SNAPSHOT', '')
+
+# /api/cache/export and /api/cache/import require this in an X-Admin-Token
+# header; they are disabled while it is unset. Also sent when
+# ROUTE_CACHE_SNAPSHOT is another instance's export URL
+ROUTING_ADMIN_TOKEN = os.environ.get('ROUTING_ADMIN_TOKEN', '')
+
+# Concurrent misses for the same route share one OSRM call
+route_flights = SingleFlight()
+
+# Cache key quantization: 'none' (exact floats), 'grid' (rounded to
+# ROUTE_KEY_PRECISION decimal places) or 'geohash' (ROUTE_KEY_PRECISION characters)
+ROUTE_KEY_QUANTIZATION = os.environ.get('ROUTE_KEY_QUANTIZATION', 'grid').lower()
+ROUTE_KEY_PRECISION = int(os.environ['ROUTE_KEY_PRECISION']) if os.environ.get('ROUTE_KEY_PRECISION') else None
+
+# Route endpoints within this many meters of a known POI are snapped to the
+# POI's canonical coordinates; 0 turns snapping off
+ROUTE_SNAP_RADIUS_M = float(os.environ.get('ROUTE_SNAP_RADIUS_M', '0'))
+POI_CSV_PATH = os.environ.get(
+    'POI_CSV_PATH',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Data', 'POI-Legazpi.csv')
+)
+
+poi_coordinates = load_poi_coordinates(POI_CSV_PATH) if os.path.exists(POI_CSV_PATH) else {}
+poi_snapper = PoiSnapper(poi_coordinates, ROUTE_SNAP_RADIUS_M)
+poi_grid = PoiGrid(poi_coordinates)
+
+# Precomputed POI-to-POI routes (see build_route_store.py), memory-mapped at startup
+ROUTE_STORE_PATH = os.environ.get(
+    'ROUTE_STORE_PATH',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'route_store.bin')
+)
+route_store = RouteStore(ROUTE_STORE_PATH) if os.path.exists(ROUTE_STORE_PATH) else None
+
+# /api/itinerary/optimize solves trips up to this many stops exactly and uses
+# local search above it; at most TRIP_MAX_STOPS stops are accepted
+TRIP_EXACT_MAX_STOPS = int(os.environ.get('TRIP_EXACT_MAX_STOPS', '12'))
+TRIP_MAX_STOPS = int(os.environ.get('TRIP_MAX_STOPS', '100'))
+
+# Cost matrices kept in memory for repeat optimizations of the same POI set
+TRIP_MATRIX_CACHE_SIZE = int(os.environ.get('TRIP_MATRIX_CACHE_SIZE', '128'))
+
+# Background prefetching of routes the user is likely to request next (see
+# /api/routes/prefetch): OSRM fetches allowed per second and as a burst, the
+# most prefetches waiting at once, and the profiles fetched by default
+ROUTE_PREFETCH_RATE = float(os.environ.get('ROUTE_PREFETCH_RATE', '2'))
+ROUTE_PREFETCH_BURST = float(os.environ.get('ROUTE_PREFETCH_BURST', '10'))
+ROUTE_PREFETCH_MAX_PENDING = int(os.environ.get('ROUTE_PREFETCH_MAX_PENDING', '50'))
+ROUTE_PREFETCH_PROFILES = os.environ.get('ROUTE_PREFETCH_PROFILES', 'car,bicycle,foot').split(',')
+
+# /api/reachable only asks OSRM about POIs whose straight-line distance could
+# be covered at these speeds (km/h) within the time budget
+REACHABLE_MAX_SPEED_KMH = {
+    'driving': 60,
+    'cycling': 25,
+    'foot': 7
+}
+REACHABLE_MAX_MINUTES = float(os.environ.get('REACHABLE_MAX_MINUTES', '120'))
+
+# JSON responses of at least this many bytes are gzip/brotli-compressed for
+# clients that accept it; gzip level 4 is about half the CPU of level 6 for
+# geometry-heavy batches at a few percent larger bodies
+RESPONSE_COMPRESS_MIN_BYTES = int(os.environ.get('RESPONSE_COMPRESS_MIN_BYTES', '1024'))
+RESPONSE_GZIP_LEVEL = int(os.environ.get('RESPONSE_GZIP_LEVEL', '4'))
+RESPONSE_BROTLI_QUALITY = int(os.environ.get('RESPONSE_BROTLI_QUALITY', '5'))
+
+# Browser/CDN cache lifetime (seconds) for route responses made only of real
+# OSRM routes; responses with estimates or failed profiles are not cacheable
+ROUTE_RESPONSE_MAX_AGE = int(os.environ.get('ROUTE_RESPONSE_MAX_AGE', '3600'))
+
+# Default latency budget for /api/route and /api/routes/batch in milliseconds;
+# routes not ready by then are answered with an estimate. 0 waits for OSRM
+ROUTE_DEADLINE_MS = float(os.environ.get('ROUTE_DEADLINE_MS', '0'))
+
+# The estimator is refitted from this many recent cached routes at most once
+# per ROUTE_ESTIMATOR_REFIT seconds
+ROUTE_ESTIMATOR_SAMPLES = int(os.environ.get('ROUTE_ESTIMATOR_SAMPLES', '5000'))
+ROUTE_ESTIMATOR_REFIT = float(os.environ.get('ROUTE_ESTIMATOR_REFIT', '3600'))
+
+route_estimator = RouteEstimator()
+
+# Lookups whose endpoints were snapped to a POI, how many of them hit the
+# cache, and lookups answered by the precomputed route store
+lookup_stats = {'snapped_lookups': 0, 'snapped_hits': 0, 'store_hits': 0, 'estimated_routes': 0}
+_lookup_stats_lock = threading.Lock()
+
+RouteJob = Tuple[Tuple[float, float], Tuple[float, float], str]
+
+# (mode, simplify tolerance in meters, zoom level) requested for route geometry
+GeometryOptions = Tuple[str, float, Optional[float]]
+GEOMETRY_MODES = ('geojson', 'polyline', 'none')
+FULL_GEOMETRY: GeometryOptions = ('geojson', 0.0, None)
+
 def get_osrm_url(profile: str) -> str:
     """Get OSRM base URL for the given profile"""
     urls = {
@@ -30,43 +217,736 @@ def get_osrm_url(profile: str) -> str:
     }
     return urls.get(profile.lower(), OSRM_CAR_URL)
 
-@lru_cache(maxsize=1000)
-def fetch_route_cached(from_coords: Tuple[float, float], to_coords: Tuple[float, float], profile: str) -> Dict:
+def canonical_route(from_coords: Tuple[float, float], to_coords: Tuple[float, float],
+                    profile: str) -> Tuple[str, Tuple[float, float], Tuple[float, float], bool]:
+    """Snap route endpoints and build their cache key: (key, from, to, snapped)"""
+    from_coords, from_snapped = poi_snapper.snap(from_coords)
+    to_coords, to_snapped = poi_snapper.snap(to_coords)
+    key = route_key(from_coords, to_coords, profile, ROUTE_KEY_QUANTIZATION, ROUTE_KEY_PRECISION)
+    return key, from_coords, to_coords, from_snapped or to_snapped
+
+def lookup_store(from_coords: Tuple[float, float], to_coords: Tuple[float, float], profile: str,
+                 with_geometry: bool = True) -> Optional[Dict]:
+    """Answer a POI-to-POI route from the precomputed route store, if loaded"""
+    if route_store is None:
+        return None
+    route = route_store.lookup(from_coords, to_coords, profile, with_geometry)
+    if route is not None:
+        with _lookup_stats_lock:
+            lookup_stats['store_hits'] += 1
+    return route
+
+def fetch_route_cached(from_coords: Tuple[float, float], to_coords: Tuple[float, float], profile: str,
+                       cached_only: bool = False) -> Optional[Dict]:
     """
     Fetch route from OSRM with caching
-    Cache key based on coordinates and profile
+    Cache key based on coordinates and profile; with `cached_only` a miss
+    returns None without calling OSRM and is not counted
     """
-    base_url = get_osrm_url(profile)
-    url = f"{base_url}/route/v1/{profile}/{from_coords[0]},{from_coords[1]};{to_coords[0]},{to_coords[1]}?overview=full&geometries=geojson"
+    with metrics.route_fetch_in_flight.track(profile=profile):
+        key, from_coords, to_coords, snapped = canonical_route(from_coords, to_coords, profile)
+        stored = lookup_store(from_coords, to_coords, profile)
+        if stored is not None:
+            metrics.route_lookups.inc(profile=profile, result='store')
+            return stored
+        
+        cached, stale = route_cache.lookup(key, count_misses=not cached_only)
+        if cached is None and cached_only:
+            return None
+        
+        if snapped:
+            with _lookup_stats_lock:
+                lookup_stats['snapped_lookups'] += 1
+                if cached is not None:
+                    lookup_stats['snapped_hits'] += 1
+        
+        if cached is not None:
+            metrics.route_lookups.inc(profile=profile, result='stale' if stale else 'hit')
+            if stale:
+                schedule_refresh(key, from_coords, to_coords, profile)
+            return cached
+        
+        # Do not hammer OSRM for a segment that just failed
+        if route_cache.is_failing(key):
+            metrics.route_lookups.inc(profile=profile, result='negative')
+            return None
+        
+        metrics.route_lookups.inc(profile=profile, result='miss')
+        return route_flights.do(key, refresh_route, key, from_coords, to_coords, profile)
+
+def refresh_route(key: str, from_coords: Tuple[float, float], to_coords: Tuple[float, float], profile: str) -> Optional[Dict]:
+    """Fetch a route from OSRM and record the outcome in the cache"""
+    route = fetch_route(from_coords, to_coords, profile)
+    if route is None:
+        route_cache.record_failure(key)
+    else:
+        route_cache.set(key, route)
+    return route
+
+# Background refreshes for stale entries run on their own small pool so they
+# never compete with user requests for batch workers
+_refresh_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='osrm-refresh')
+_refreshing = set()
+_refreshing_lock = threading.Lock()
+
+def schedule_refresh(key: str, from_coords: Tuple[float, float], to_coords: Tuple[float, float], profile: str) -> None:
+    """Refresh a stale route in the background, once per key at a time"""
+    if route_cache.is_failing(key):
+        return
+    
+    with _refreshing_lock:
+        if key in _refreshing:
+            return
+        _refreshing.add(key)
     
+    def run():
+        try:
+            refresh_route(key, from_coords, to_coords, profile)
+        finally:
+            with _refreshing_lock:
+                _refreshing.discard(key)
+    
+    _refresh_executor.submit(run)
+
+# Prefetches run on their own pool so they never delay user requests
+_prefetch_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='osrm-prefetch')
+prefetch_budget = TokenBucket(ROUTE_PREFETCH_RATE, ROUTE_PREFETCH_BURST)
+prefetch_stats = {'requested': 0, 'already_cached': 0, 'queued': 0, 'dropped': 0, 'fetched': 0, 'failed': 0, 'pending': 0}
+_prefetch_lock = threading.Lock()
+
+def is_route_cached(from_coords: Tuple[float, float], to_coords: Tuple[float, float], profile: str) -> bool:
+    """Whether a route is answerable without OSRM (or is backing off), without counting a hit or miss"""
+    key, from_coords, to_coords, _ = canonical_route(from_coords, to_coords, profile)
+    if route_store is not None and route_store.lookup(from_coords, to_coords, profile, with_geometry=False) is not None:
+        return True
+    return key in route_cache.get_many([key]) or route_cache.backing_off(key)
+
+def schedule_prefetch(jobs: List[RouteJob]) -> Dict[str, int]:
+    """
+    Warm the cache for likely next routes in the background
+    Uncached jobs each take one token from the prefetch budget; jobs over
+    budget or over ROUTE_PREFETCH_MAX_PENDING are dropped, not queued
+    """
+    counts = {'queued': 0, 'already_cached': 0, 'dropped': 0}
+    for job in dict.fromkeys(jobs):
+        if is_route_cached(*job):
+            counts['already_cached'] += 1
+            continue
+        with _prefetch_lock:
+            accepted = prefetch_stats['pending'] < ROUTE_PREFETCH_MAX_PENDING and prefetch_budget.try_acquire()
+            if accepted:
+                prefetch_stats['pending'] += 1
+        if not accepted:
+            counts['dropped'] += 1
+            continue
+        counts['queued'] += 1
+        _prefetch_executor.submit(run_prefetch, job)
+    
+    with _prefetch_lock:
+        prefetch_stats['requested'] += len(jobs)
+        for name, count in counts.items():
+            prefetch_stats[name] += count
+    return counts
+
+def prefetch_info() -> Dict:
+    with _prefetch_lock:
+        return {**prefetch_stats, 'rate_per_second': ROUTE_PREFETCH_RATE, 'burst': ROUTE_PREFETCH_BURST}
+
+def run_prefetch(job: RouteJob) -> None:
+    try:
+        route = fetch_route_cached(*job)
+    except Exception as e:
+        print(f"Error prefetching {job[2]} route: {e}")
+        route = None
+    with _prefetch_lock:
+        prefetch_stats['pending'] -= 1
+        prefetch_stats['fetched' if route is not None else 'failed'] += 1
+
+# OSRM response codes meaning the request was fine but no route exists
+OSRM_NO_ROUTE_CODES = ('NoRoute', 'NoSegment', 'NoTable', 'NoMatch', 'NoTrips')
+
+def osrm_error_code(response: requests.Response) -> Optional[str]:
+    """The `code` field of an OSRM error body, if it has one"""
+    try:
+        data = response.json()
+    except ValueError:
+        return None
+    return data.get('code') if isinstance(data, dict) else None
+
+def osrm_get(url: str, profile: str, service: str) -> Optional[Dict]:
+    """
+    GET an OSRM URL through the pooled client for the profile's host and
+    return the parsed response when its code is Ok
+    Latency, payload size, in-flight requests and failures are recorded per
+    profile and service (route, table, itinerary)
+    """
+    start = time.perf_counter()
     try:
-        response = requests.get(url, timeout=10)
+        with metrics.osrm_in_flight.track(profile=profile):
+            response = osrm_clients.for_url(get_osrm_url(profile)).get(url)
         response.raise_for_status()
         data = response.json()
-        
-        if data.get('code') == 'Ok' and data.get('routes'):
-            route = data['routes'][0]
-            return {
-                'duration': round(route['duration'] / 60),  # Convert to minutes
-                'distance': route['distance'],  # Keep in meters
-                'geometry': route['geometry']
-            }
-    except Exception as e:
-        print(f"Error fetching {profile} route: {e}")
+    except requests.Timeout as e:
+        kind, error = 'timeout', e
+    except requests.ConnectionError as e:
+        kind, error = 'connection', e
+    except requests.HTTPError as e:
+        kind, error = 'http', e
+        # OSRM answers NoRoute/NoSegment with a 400 whose body carries the code
+        if (e.response is not None and 400 <= e.response.status_code < 500
+                and osrm_error_code(e.response) in OSRM_NO_ROUTE_CODES):
+            metrics.osrm_latency.observe(time.perf_counter() - start, profile=profile, service=service)
+            metrics.osrm_response_bytes.observe(len(e.response.content), profile=profile, service=service)
+            metrics.osrm_errors.inc(profile=profile, service=service, kind='no_route')
+            return None
+    except ValueError as e:
+        kind, error = 'bad_response', e
+    else:
+        metrics.osrm_latency.observe(time.perf_counter() - start, profile=profile, service=service)
+        metrics.osrm_response_bytes.observe(len(response.content), profile=profile, service=service)
+        if data.get('code') == 'Ok':
+            return data
+        metrics.osrm_errors.inc(profile=profile, service=service, kind='no_route')
         return None
     
+    metrics.osrm_latency.observe(time.perf_counter() - start, profile=profile, service=service)
+    metrics.osrm_errors.inc(profile=profile, service=service, kind=kind)
+    print(f"Error fetching {profile} {service}: {error}")
     return None
 
-@app.route('/api/route', methods=['POST'])
+def fetch_route(from_coords: Tuple[float, float], to_coords: Tuple[float, float], profile: str) -> Optional[Dict]:
+    """Fetch route from OSRM without touching the cache"""
+    base_url = get_osrm_url(profile)
+    url = f"{base_url}/route/v1/{profile}/{from_coords[0]},{from_coords[1]};{to_coords[0]},{to_coords[1]}?overview=full&geometries=geojson"
+    
+    data = osrm_get(url, profile, 'route')
+    if data and data.get('routes'):
+        route = data['routes'][0]
+        return {
+            'duration': round(route['duration'] / 60),  # Convert to minutes
+            'distance': route['distance'],  # Keep in meters
+            'geometry': route['geometry']
+        }
+    
+    return None
+
+_batch_executor = ThreadPoolExecutor(max_workers=ROUTE_BATCH_CONCURRENCY, thread_name_prefix='osrm-batch')
+
+def set_batch_concurrency(limit: int) -> None:
+    """Replace the batch executor with one allowing `limit` concurrent lookups"""
+    global _batch_executor, ROUTE_BATCH_CONCURRENCY
+    old_executor = _batch_executor
+    ROUTE_BATCH_CONCURRENCY = max(1, int(limit))
+    _batch_executor = ThreadPoolExecutor(max_workers=ROUTE_BATCH_CONCURRENCY, thread_name_prefix='osrm-batch')
+    old_executor.shutdown(wait=False)
+
+def to_osrm_profile(profile: str) -> str:
+    """Map a frontend profile name to its OSRM profile name"""
+    return PROFILE_TO_OSRM.get(profile, 'driving')
+
+def format_distance(distance: float) -> str:
+    """Format a distance in meters for display"""
+    return f"{distance / 1000:.1f} km" if distance >= 1000 else f"{round(distance)} m"
+
+def parse_geometry_options(data: Dict) -> GeometryOptions:
+    """
+    Read geometry options from a request body
+    "geometry" is "geojson" (default), "polyline" or "none"; "simplify" is a
+    Douglas-Peucker tolerance in meters and "zoom" picks one pixel at that
+    map zoom as the tolerance. Raises ValueError on bad input.
+    """
+    mode = data.get('geometry', 'geojson')
+    if mode not in GEOMETRY_MODES:
+        raise ValueError(f"geometry must be one of {', '.join(GEOMETRY_MODES)}")
+    tolerance = float(data.get('simplify') or 0)
+    zoom = float(data['zoom']) if data.get('zoom') is not None else None
+    if tolerance < 0:
+        raise ValueError('simplify must be a non-negative tolerance in meters')
+    return mode, tolerance, zoom
+
+def shape_cached(route: Dict, variant_key: str, options: GeometryOptions) -> Dict:
+    """
+    Apply geometry options to a route, caching the shaped geometry next to it
+    The variant remembers the distance of the route it came from, so a
+    refreshed route never picks up a variant of its old geometry
+    """
+    if options == FULL_GEOMETRY:
+        return route
+    if options[0] == 'none':
+        return {k: v for k, v in route.items() if k != 'geometry'}
+    
+    variant_key = f"variant:{variant_key}|{options[0]}|{options[1]}|{options[2]}"
+    variant = route_cache.get_many([variant_key]).get(variant_key)
+    if variant is None or variant.get('distance') != route['distance']:
+        variant = {'distance': route['distance'], 'geometry': shape_geometry(route.get('geometry'), *options)}
+        route_cache.set(variant_key, variant)
+    
+    return {**route, 'geometry': variant['geometry']}
+
+def fetch_route_summary(from_coords: Tuple[float, float], to_coords: Tuple[float, float], profile: str,
+                        cached_only: bool = False) -> Optional[Dict]:
+    """
+    Fetch duration and distance only
+    Matrix cells count as cache hits here since no geometry is needed
+    """
+    key, from_coords, to_coords, _ = canonical_route(from_coords, to_coords, profile)
+    stored = lookup_store(from_coords, to_coords, profile, with_geometry=False)
+    if stored is not None:
+        return stored
+    
+    cached = route_cache.get_many([key, 'cell:' + key])
+    entry = cached.get(key) or cached.get('cell:' + key)
+    if entry is not None:
+        route_cache.record_lookups(1, 0)
+        return {'duration': entry['duration'], 'distance': entry['distance']}
+    
+    route = fetch_route_cached(from_coords, to_coords, profile, cached_only)
+    return {'duration': route['duration'], 'distance': route['distance']} if route else None
+
+def fetch_route_shaped(from_coords: Tuple[float, float], to_coords: Tuple[float, float], profile: str,
+                       options: GeometryOptions = FULL_GEOMETRY, cached_only: bool = False) -> Optional[Dict]:
+    """Fetch a cached route and apply the requested geometry options"""
+    if options[0] == 'none':
+        return fetch_route_summary(from_coords, to_coords, profile, cached_only)
+    
+    route = fetch_route_cached(from_coords, to_coords, profile, cached_only)
+    if route is None or options == FULL_GEOMETRY:
+        return route
+    return shape_cached(route, canonical_route(from_coords, to_coords, profile)[0], options)
+
+def fetch_routes_concurrently(jobs: List[RouteJob], options: GeometryOptions = FULL_GEOMETRY,
+                              timeout: Optional[float] = None) -> List[Optional[Dict]]:
+    """
+    Fetch routes for many (from, to, osrm_profile) jobs at once
+    Identical jobs are fetched once, results keep the order of `jobs`,
+    and a failing job only blanks its own result. With a `timeout` in
+    seconds, jobs still running by then come back as None and keep running,
+    so their routes land in the cache for the next request
+    """
+    futures = {}
+    for job in jobs:
+        if job not in futures:
+            futures[job] = _batch_executor.submit(fetch_route_shaped, *job, options)
+    
+    if timeout is not None:
+        wait(futures.values(), timeout=timeout)
+    
+    results = {}
+    for job, future in futures.items():
+        if timeout is not None and not future.done():
+            results[job] = None
+            continue
+        try:
+            results[job] = future.result()
+        except Exception as e:
+            print(f"Error fetching {job[2]} route: {e}")
+            results[job] = None
+    
+    return [results[job] for job in jobs]
+
+def sample_estimator_routes():
+    """Yield (profile, straight-line m, route m, minutes) samples from the store and cache"""
+    if route_store is not None:
+        step = max(route_store.n // 40, 1)
+        for k, profile in enumerate(route_store.profiles):
+            for i in range(0, route_store.n, step):
+                for j in range(0, route_store.n, step):
+                    duration, distance = float(route_store.durations[k, i, j]), float(route_store.distances[k, i, j])
+                    if i != j and duration == duration and distance == distance:
+                        yield profile, haversine_m(route_store.coords[i], route_store.coords[j]), distance, duration
+    
+    for key, route in route_cache.sample(ROUTE_ESTIMATOR_SAMPLES):
+        coordinates = (route.get('geometry') or {}).get('coordinates')
+        if coordinates and len(coordinates) >= 2:
+            profile = key.split(':', 1)[0]
+            yield profile, haversine_m(coordinates[0], coordinates[-1]), route['distance'], route['duration']
+
+_estimator_fit_lock = threading.Lock()
+
+def refit_estimator() -> None:
+    """Refit the estimator in the background when its fit is older than ROUTE_ESTIMATOR_REFIT"""
+    fitted_at = route_estimator.fitted_at
+    if fitted_at is not None and time.time() - fitted_at < ROUTE_ESTIMATOR_REFIT:
+        return
+    if not _estimator_fit_lock.acquire(blocking=False):
+        return
+    
+    def run():
+        try:
+            route_estimator.fit(sample_estimator_routes())
+        except Exception as e:
+            print(f"Error fitting route estimator: {e}")
+        finally:
+            _estimator_fit_lock.release()
+    
+    _refresh_executor.submit(run)
+
+def estimate_route(from_coords: Tuple[float, float], to_coords: Tuple[float, float], profile: str,
+                   options: GeometryOptions = FULL_GEOMETRY) -> Dict:
+    """Estimated route for a job OSRM could not answer in time"""
+    refit_estimator()
+    with _lookup_stats_lock:
+        lookup_stats['estimated_routes'] += 1
+    route = route_estimator.estimate(from_coords, to_coords, profile)
+    if options[0] == 'none':
+        del route['geometry']
+    elif options != FULL_GEOMETRY:
+        route['geometry'] = shape_geometry(route['geometry'], *options)
+    return route
+
+def parse_deadline(data: Dict) -> Optional[float]:
+    """Read the optional "deadline_ms" budget from a request body, in seconds"""
+    deadline_ms = data.get('deadline_ms', ROUTE_DEADLINE_MS)
+    if deadline_ms is None:
+        return None
+    try:
+        deadline_ms = float(deadline_ms)
+    except (TypeError, ValueError):
+        raise ValueError('deadline_ms must be a number')
+    if deadline_ms < 0:
+        raise ValueError('deadline_ms must not be negative')
+    return deadline_ms / 1000 if deadline_ms > 0 else None
+
+def fetch_routes_within(jobs: List[RouteJob], options: GeometryOptions,
+                        deadline: Optional[float]) -> List[Optional[Dict]]:
+    """
+    Fetch routes, answering with estimates for jobs that fail or miss the deadline
+    Without a deadline this is fetch_routes_concurrently
+    """
+    routes = fetch_routes_concurrently(jobs, options, deadline)
+    if deadline is None:
+        return routes
+    return [route if route is not None else estimate_route(*job, options) for job, route in zip(jobs, routes)]
+
+def mark_cacheable(routes: List[Optional[Dict]]):
+    """Let browsers and CDNs cache this response when every route is a real OSRM route"""
+    if ROUTE_RESPONSE_MAX_AGE > 0 and all(route is not None and not route.get('estimated') for route in routes):
+        g.cache_max_age = ROUTE_RESPONSE_MAX_AGE
+
+def build_segment_result(profiles: List[str], routes: List[Optional[Dict]]) -> Dict:
+    """Assemble the per-profile response for one segment"""
+    segment_results = {}
+    distance = 0
+    
+    for profile, route_data in zip(profiles, routes):
+        if route_data:
+            segment_results[profile] = route_data
+            distance = route_data['distance']
+    
+    segment_results['distance_formatted'] = format_distance(distance)
+    return segment_results
+
+def cell_key(from_coords: Tuple[float, float], to_coords: Tuple[float, float], profile: str) -> str:
+    """Cache key for a duration/distance-only matrix cell"""
+    return 'cell:' + route_key(from_coords, to_coords, profile, ROUTE_KEY_QUANTIZATION, ROUTE_KEY_PRECISION)
+
+def shape_itinerary(itinerary: Optional[Dict], leg_keys: List[str], options: GeometryOptions) -> Optional[Dict]:
+    """Apply geometry options to an itinerary's merged geometry and each leg"""
+    if itinerary is None or options == FULL_GEOMETRY:
+        return itinerary
+    
+    trip_key = 'itinerary:' + hashlib.sha1('|'.join(leg_keys).encode()).hexdigest()
+    shaped = shape_cached({k: v for k, v in itinerary.items() if k != 'legs'}, trip_key, options)
+    shaped['legs'] = [shape_cached(leg, key, options) for leg, key in zip(itinerary['legs'], leg_keys)]
+    return shaped
+
+def fetch_table(coords: List[Tuple[float, float]], profile: str,
+                sources: List[int], destinations: List[int]) -> Optional[Tuple[List[List], List[List]]]:
+    """
+    Fetch duration (seconds) and distance (meters) rows from OSRM's table service
+    Returns (durations, distances) indexed [source][destination], None on failure
+    """
+    base_url = get_osrm_url(profile)
+    locations = ';'.join(f"{lng},{lat}" for lng, lat in coords)
+    url = (f"{base_url}/table/v1/{profile}/{locations}?annotations=duration,distance"
+           f"&sources={';'.join(map(str, sources))}&destinations={';'.join(map(str, destinations))}")
+    
+    data = osrm_get(url, profile, 'table')
+    if data is None:
+        return None
+    return data['durations'], data['distances']
+
+def iter_table_cells(points: List[Tuple[float, float]], profile: str, rows: List[int]):
+    """
+    Yield (row, column, seconds, meters) for every reachable off-diagonal cell in `rows`
+    Past the table size limit the rows are split into source x destination
+    blocks that each fit in one request; failed blocks are skipped
+    """
+    n = len(points)
+    if n <= OSRM_TABLE_MAX_LOCATIONS:
+        blocks = [(rows, list(range(n)))]
+    else:
+        half = max(1, OSRM_TABLE_MAX_LOCATIONS // 2)
+        blocks = [(rows[a:a + half], list(range(b, min(b + half, n))))
+                  for a in range(0, len(rows), half) for b in range(0, n, half)]
+    
+    for src, dst in blocks:
+        if n <= OSRM_TABLE_MAX_LOCATIONS:
+            table = fetch_table(points, profile, src, dst)
+        else:
+            table = fetch_table([points[i] for i in src] + [points[j] for j in dst], profile,
+                                list(range(len(src))), list(range(len(src), len(src) + len(dst))))
+        if table is None:
+            continue
+        
+        for a, i in enumerate(src):
+            for b, j in enumerate(dst):
+                seconds, meters = table[0][a][b], table[1][a][b]
+                if i != j and seconds is not None and meters is not None:
+                    yield i, j, seconds, meters
+
+def fetch_matrix_cached(coords: List[Tuple[float, float]], profile: str) -> Dict[str, List[List]]:
+    """
+    Build duration (minutes) and distance (meters) matrices between all points
+    Cells come from cached routes or matrix cells where possible; rows with
+    any missing cell are fetched with one table call (or one per block of
+    OSRM_TABLE_MAX_LOCATIONS) and every new cell is cached. Unreachable or
+    failed cells are None.
+    """
+    n = len(coords)
+    points = [poi_snapper.snap(c)[0] for c in coords]
+    
+    if route_store is not None and route_store.has_profile(profile):
+        indices = [route_store.index_of(p) for p in points]
+        if None not in indices:
+            with _lookup_stats_lock:
+                lookup_stats['store_hits'] += 1
+            return route_store.matrix(indices, profile)
+    
+    durations = [[0 if i == j else None for j in range(n)] for i in range(n)]
+    distances = [[0 if i == j else None for j in range(n)] for i in range(n)]
+    
+    pairs = [(i, j) for i in range(n) for j in range(n) if i != j]
+    full_keys = {pair: route_key(points[pair[0]], points[pair[1]], profile, ROUTE_KEY_QUANTIZATION, ROUTE_KEY_PRECISION)
+                 for pair in pairs}
+    cell_keys = {pair: cell_key(points[pair[0]], points[pair[1]], profile) for pair in pairs}
+    cached = route_cache.get_many(list(full_keys.values()) + list(cell_keys.values()))
+    
+    missing_rows = set()
+    hits = 0
+    for i, j in pairs:
+        entry = cached.get(full_keys[(i, j)]) or cached.get(cell_keys[(i, j)])
+        if entry is None:
+            missing_rows.add(i)
+        else:
+            hits += 1
+            durations[i][j] = entry['duration']
+            distances[i][j] = entry['distance']
+    
+    route_cache.record_lookups(hits, len(pairs) - hits)
+    if not missing_rows:
+        return {'durations': durations, 'distances': distances}
+    
+    new_cells = {}
+    for i, j, seconds, meters in iter_table_cells(points, profile, sorted(missing_rows)):
+        durations[i][j] = round(seconds / 60)
+        distances[i][j] = meters
+        new_cells[cell_keys[(i, j)]] = {'duration': durations[i][j], 'distance': meters}
+    
+    if new_cells:
+        route_cache.set_many(new_cells)
+    
+    return {'durations': durations, 'distances': distances}
+
+_trip_matrices: 'OrderedDict[Tuple[str, Tuple[int, ...]], Tuple[np.ndarray, np.ndarray]]' = OrderedDict()
+_trip_matrices_lock = threading.Lock()
+
+def trip_cost_matrix(poi_ids: List[int], profile: str) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Duration and distance matrices for POIs in the order of `poi_ids`
+    Complete matrices are kept per (profile, POI set) in a small LRU, so
+    reordering the same stops does not rebuild them; unreachable cells are
+    UNREACHABLE
+    """
+    ids = tuple(sorted(poi_ids))
+    cache_key = (profile, ids)
+    with _trip_matrices_lock:
+        matrices = _trip_matrices.get(cache_key)
+        if matrices is not None:
+            _trip_matrices.move_to_end(cache_key)
+    
+    if matrices is None:
+        matrix = fetch_matrix_cached([poi_coordinates[poi_id] for poi_id in ids], profile)
+        durations = np.array([[UNREACHABLE if v is None else v for v in row] for row in matrix['durations']], dtype=float)
+        distances = np.array([[UNREACHABLE if v is None else v for v in row] for row in matrix['distances']], dtype=float)
+        matrices = (durations, distances)
+        # Partial matrices usually mean OSRM failed, so they are not kept
+        if not (durations >= UNREACHABLE).any():
+            with _trip_matrices_lock:
+                _trip_matrices[cache_key] = matrices
+                while len(_trip_matrices) > TRIP_MATRIX_CACHE_SIZE:
+                    _trip_matrices.popitem(last=False)
+    
+    positions = [ids.index(poi_id) for poi_id in poi_ids]
+    rows = np.ix_(positions, positions)
+    return matrices[0][rows], matrices[1][rows]
+
+def fetch_reachable(origin: Tuple[float, float], profile: str, minutes: float) -> Tuple[List[Dict], Dict]:
+    """
+    POIs reachable from `origin` within `minutes`, fastest first, plus lookup stats
+    Candidates come from the POI grid within the distance coverable at
+    REACHABLE_MAX_SPEED_KMH; their times come from the route store, then the
+    cache, then one OSRM table call (one source row) for the rest
+    """
+    origin = poi_snapper.snap(origin)[0]
+    radius_m = minutes / 60 * REACHABLE_MAX_SPEED_KMH.get(profile, REACHABLE_MAX_SPEED_KMH['driving']) * 1000
+    candidates = [poi_id for poi_id, _ in poi_grid.within(origin, radius_m) if poi_coordinates[poi_id] != tuple(origin)]
+    times: Dict[int, Tuple[float, float]] = {}
+    stats = {'candidates': len(candidates), 'from_store': 0, 'from_cache': 0, 'from_osrm': 0}
+    
+    remaining = candidates
+    if route_store is not None and route_store.has_profile(profile) and route_store.index_of(origin) is not None:
+        k, i = route_store.profiles.index(profile), route_store.index_of(origin)
+        remaining = []
+        for poi_id in candidates:
+            j = route_store.index_of_poi(poi_id)
+            if j is None:
+                remaining.append(poi_id)
+                continue
+            duration, distance = float(route_store.durations[k, i, j]), float(route_store.distances[k, i, j])
+            if not (np.isnan(duration) or np.isnan(distance)):
+                times[poi_id] = (round(duration), distance)
+                stats['from_store'] += 1
+        with _lookup_stats_lock:
+            lookup_stats['store_hits'] += 1
+    
+    full_keys = {poi_id: route_key(origin, poi_coordinates[poi_id], profile, ROUTE_KEY_QUANTIZATION, ROUTE_KEY_PRECISION)
+                 for poi_id in remaining}
+    cell_keys = {poi_id: cell_key(origin, poi_coordinates[poi_id], profile) for poi_id in remaining}
+    cached = route_cache.get_many(list(full_keys.values()) + list(cell_keys.values()))
+    missing = []
+    for poi_id in remaining:
+        entry = cached.get(full_keys[poi_id]) or cached.get(cell_keys[poi_id])
+        if entry is None:
+            missing.append(poi_id)
+        else:
+            times[poi_id] = (entry['duration'], entry['distance'])
+    stats['from_cache'] = len(remaining) - len(missing)
+    route_cache.record_lookups(stats['from_cache'], len(missing))
+    
+    if missing:
+        points = [origin] + [poi_coordinates[poi_id] for poi_id in missing]
+        new_cells = {}
+        for _, j, seconds, meters in iter_table_cells(points, profile, [0]):
+            poi_id = missing[j - 1]
+            times[poi_id] = (round(seconds / 60), meters)
+            new_cells[cell_keys[poi_id]] = {'duration': times[poi_id][0], 'distance': meters}
+        stats['from_osrm'] = len(new_cells)
+        if new_cells:
+            route_cache.set_many(new_cells)
+    
+    reachable = [
+        {'poi_id': poi_id, 'duration': duration, 'distance': distance, 'coordinates': list(poi_coordinates[poi_id])}
+        for poi_id, (duration, distance) in times.items() if duration <= minutes
+    ]
+    reachable.sort(key=lambda item: (item['duration'], item['distance']))
+    return reachable, stats
+
+def join_line_coordinates(parts: List[List]) -> List:
+    """Concatenate LineString coordinate lists, dropping repeated junction points"""
+    merged = []
+    for coordinates in parts:
+        for point in coordinates:
+            if not merged or merged[-1] != point:
+                merged.append(point)
+    return merged
+
+def fetch_itinerary(points: List[Tuple[float, float]], profile: str) -> Optional[Dict]:
+    """
+    Route through all waypoints with one OSRM request and split it into legs
+    `continue_straight=false` lets every leg be routed as if on its own, so
+    legs match the per-pair routes and are stored in the per-pair cache
+    """
+    base_url = get_osrm_url(profile)
+    locations = ';'.join(f"{lng},{lat}" for lng, lat in points)
+    url = f"{base_url}/route/v1/{profile}/{locations}?overview=full&geometries=geojson&steps=true&continue_straight=false"
+    
+    data = osrm_get(url, profile, 'itinerary')
+    if data is None or not data.get('routes'):
+        return None
+    route = data['routes'][0]
+    
+    legs = []
+    for leg in route['legs']:
+        coordinates = join_line_coordinates([step['geometry']['coordinates'] for step in leg.get('steps', [])])
+        legs.append({
+            'duration': round(leg['duration'] / 60),  # Convert to minutes
+            'distance': leg['distance'],  # Keep in meters
+            'geometry': {'type': 'LineString', 'coordinates': coordinates}
+        })
+    
+    route_cache.set_many({
+        route_key(points[i], points[i + 1], profile, ROUTE_KEY_QUANTIZATION, ROUTE_KEY_PRECISION): leg
+        for i, leg in enumerate(legs)
+    })
+    
+    return {
+        'duration': round(route['duration'] / 60),
+        'distance': route['distance'],
+        'geometry': route['geometry'],
+        'legs': legs
+    }
+
+def fetch_itinerary_cached(points: List[Tuple[float, float]], profile: str,
+                           options: GeometryOptions = FULL_GEOMETRY) -> Optional[Dict]:
+    """
+    Route a whole itinerary, answering from the route store and per-pair cache
+    when every leg is available there
+    Otherwise makes a single multi-waypoint OSRM request
+    """
+    points = [poi_snapper.snap(p)[0] for p in points]
+    keys = [route_key(points[i], points[i + 1], profile, ROUTE_KEY_QUANTIZATION, ROUTE_KEY_PRECISION)
+            for i in range(len(points) - 1)]
+    cached = route_cache.get_many(keys)
+    
+    legs = []
+    for i, key in enumerate(keys):
+        leg = cached.get(key) or lookup_store(points[i], points[i + 1], profile)
+        if leg is None or not leg.get('geometry'):
+            route_cache.record_lookups(0, 1)
+            return shape_itinerary(fetch_itinerary(points, profile), keys, options)
+        legs.append(leg)
+    
+    route_cache.record_lookups(1, 0)
+    return shape_itinerary({
+        'duration': sum(leg['duration'] for leg in legs),
+        'distance': sum(leg['distance'] for leg in legs),
+        'geometry': {
+            'type': 'LineString',
+            'coordinates': join_line_coordinates([leg['geometry']['coordinates'] for leg in legs])
+        },
+        'legs': legs
+    }, keys, options)
+
+def route_query_args(args) -> Dict:
+    """
+    Read a GET /api/route query string into the shape of a POST body
+    ?from=lng,lat&to=lng,lat&profiles=car,foot plus the other body fields as is
+    """
+    data = args.to_dict()
+    for name in ('from', 'to'):
+        if name in data:
+            data[name] = [float(value) for value in data[name].split(',')]
+    if 'profiles' in data:
+        data['profiles'] = data['profiles'].split(',')
+    return data
+
+@app.route('/api/route', methods=['GET', 'POST'])
 def get_route():
     """
     Get route information for a single segment
+    Also available as GET /api/route?from=lng,lat&to=lng,lat&profiles=car,foot
+    so browser and CDN caches can serve repeats
     
     Request body:
     {
         "from": [lng, lat],
         "to": [lng, lat],
-        "profiles": ["car", "bicycle", "foot"]  // optional, defaults to all
+        "profiles": ["car", "bicycle", "foot"],  // optional, defaults to all
+        "geometry": "geojson",  // optional: "geojson", "polyline" or "none"
+        "simplify": 10,         // optional: simplification tolerance in meters
+        "zoom": 14,             // optional: simplify to one pixel at this map zoom
+        "deadline_ms": 800      // optional: answer with estimates after this long
     }
     
     Response:
@@ -76,35 +956,112 @@ def get_route():
         "foot": {"duration": 60, "distance": 5000, "geometry": {...}},
         "distance_formatted": "5.0 km"
     }
+    
+    With a deadline, profiles OSRM cannot answer in time (or at all) come
+    back as straight-line estimates marked "estimated": true; the OSRM
+    lookup keeps running so a repeat request gets the real route
     """
-    data = request.json
-    from_coords = tuple(data['from'])
-    to_coords = tuple(data['to'])
+    try:
+        data = route_query_args(request.args) if request.method == 'GET' else request.json
+        from_coords = tuple(data['from'])
+        to_coords = tuple(data['to'])
+    except (KeyError, ValueError) as e:
+        return jsonify({'error': f"from and to must be [lng, lat] coordinates: {e}"}), 400
     profiles = data.get('profiles', ['car', 'bicycle', 'foot'])
-    
-    results = {}
-    distance = 0
+    try:
+        options = parse_geometry_options(data)
+        deadline = parse_deadline(data)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     
     # Fetch routes for each profile
-    for profile in profiles:
-        osrm_profile = {
-            'car': 'driving',
-            'bicycle': 'cycling',
-            'foot': 'foot'
-        }.get(profile, 'driving')
-        
-        route_data = fetch_route_cached(from_coords, to_coords, osrm_profile)
-        if route_data:
-            results[profile] = route_data
-            distance = route_data['distance']
+    jobs = [(from_coords, to_coords, to_osrm_profile(profile)) for profile in profiles]
+    routes = fetch_routes_within(jobs, options, deadline)
+    mark_cacheable(routes)
     
-    # Format distance
-    distance_formatted = f"{distance / 1000:.1f} km" if distance >= 1000 else f"{round(distance)} m"
+    return jsonify(build_segment_result(profiles, routes))
+
+# Streaming formats for /api/routes/batch and their content types
+STREAM_FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'sse': 'text/event-stream'
+}
+
+def format_stream_record(record: Dict, stream: str) -> str:
+    """Render one streamed record as an NDJSON line or a Server-Sent Event"""
+    payload = dumps_compact(record)
+    if stream == 'sse':
+        return f"event: {record['type']}\ndata: {payload}\n\n"
+    return payload + '\n'
+
+def stream_batch(segments: List[Dict], profiles: List[str], options: GeometryOptions, stream: str):
+    """
+    Yield batch results segment by segment
+    Segments fully answered by the cache go out first; the remaining lookups
+    run on the batch executor and each segment is sent once all its profiles
+    are done. A summary record closes the stream.
+    """
+    start = time.time()
+    cached_segments = 0
+    failed_routes = 0
+    pending = []
     
-    return jsonify({
-        **results,
-        'distance_formatted': distance_formatted
-    })
+    for segment in segments:
+        jobs = [(tuple(segment['from']), tuple(segment['to']), to_osrm_profile(profile)) for profile in profiles]
+        routes = [fetch_route_shaped(*job, options, cached_only=True) for job in jobs]
+        if all(route is not None for route in routes):
+            cached_segments += 1
+            yield format_stream_record({
+                'type': 'segment',
+                'id': segment['id'],
+                'cached': True,
+                'result': build_segment_result(profiles, routes)
+            }, stream)
+        else:
+            pending.append((segment, jobs, routes))
+    
+    # Fan out the misses, fetching each distinct job once
+    futures = {}
+    waiting = {}
+    for index, (_, jobs, routes) in enumerate(pending):
+        for job, route in zip(jobs, routes):
+            if route is None:
+                if job not in waiting:
+                    futures[_batch_executor.submit(fetch_route_shaped, *job, options)] = job
+                waiting.setdefault(job, []).append(index)
+    
+    remaining = [sum(route is None for route in routes) for _, _, routes in pending]
+    for future in as_completed(futures):
+        job = futures[future]
+        try:
+            route = future.result()
+        except Exception as e:
+            print(f"Error fetching {job[2]} route: {e}")
+            route = None
+        
+        for index in waiting[job]:
+            segment, jobs, routes = pending[index]
+            for position, segment_job in enumerate(jobs):
+                if segment_job == job:
+                    routes[position] = route
+            remaining[index] -= 1
+            if remaining[index] == 0:
+                failed_routes += sum(r is None for r in routes)
+                yield format_stream_record({
+                    'type': 'segment',
+                    'id': segment['id'],
+                    'cached': False,
+                    'result': build_segment_result(profiles, routes)
+                }, stream)
+    
+    yield format_stream_record({
+        'type': 'summary',
+        'segments': len(segments),
+        'cached': cached_segments,
+        'fetched': len(pending),
+        'failed_routes': failed_routes,
+        'elapsed_ms': round((time.time() - start) * 1000)
+    }, stream)
 
 @app.route('/api/routes/batch', methods=['POST'])
 def get_routes_batch():
@@ -121,7 +1078,12 @@ def get_routes_batch():
             },
             ...
         ],
-        "profiles": ["car", "bicycle", "foot"]  // optional
+        "profiles": ["car", "bicycle", "foot"],  // optional
+        "geometry": "geojson",  // optional, same geometry options as /api/route
+        "simplify": 10,
+        "zoom": 14,
+        "deadline_ms": 800,     // optional: estimate routes not ready by then (not streamed)
+        "stream": "ndjson"      // optional: "ndjson" or "sse" to stream segments
     }
     
     Response:
@@ -132,41 +1094,375 @@ def get_routes_batch():
         },
         ...
     }
+    
+    Streamed response (one record per line for ndjson, one event for sse),
+    cached segments first, then the rest as their lookups finish:
+    {"type": "segment", "id": "loc1-loc2", "cached": true, "result": {"car": {...}, ...}}
+    ...
+    {"type": "summary", "segments": 11, "cached": 4, "fetched": 7, "failed_routes": 0, "elapsed_ms": 812}
     """
     data = request.json
     segments = data['segments']
     profiles = data.get('profiles', ['car', 'bicycle', 'foot'])
+    try:
+        options = parse_geometry_options(data)
+        deadline = parse_deadline(data)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     
-    results = {}
+    stream = data.get('stream')
+    if stream is True or (not stream and request.accept_mimetypes.best == 'application/x-ndjson'):
+        stream = 'ndjson'
+    if stream:
+        if stream not in STREAM_FORMATS:
+            return jsonify({'error': f"stream must be one of {', '.join(STREAM_FORMATS)}"}), 400
+        return Response(
+            stream_with_context(stream_batch(segments, profiles, options, stream)),
+            mimetype=STREAM_FORMATS[stream],
+            headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+        )
     
+    # Queue every segment/profile pair up front so the lookups run concurrently
+    jobs = []
     for segment in segments:
-        segment_id = segment['id']
         from_coords = tuple(segment['from'])
         to_coords = tuple(segment['to'])
-        
-        segment_results = {}
-        distance = 0
-        
         for profile in profiles:
-            osrm_profile = {
-                'car': 'driving',
-                'bicycle': 'cycling',
-                'foot': 'foot'
-            }.get(profile, 'driving')
-            
-            route_data = fetch_route_cached(from_coords, to_coords, osrm_profile)
-            if route_data:
-                segment_results[profile] = route_data
-                distance = route_data['distance']
-        
-        # Format distance
-        distance_formatted = f"{distance / 1000:.1f} km" if distance >= 1000 else f"{round(distance)} m"
-        segment_results['distance_formatted'] = distance_formatted
-        
-        results[segment_id] = segment_results
+            jobs.append((from_coords, to_coords, to_osrm_profile(profile)))
+    
+    routes = fetch_routes_within(jobs, options, deadline)
+    mark_cacheable(routes)
+    
+    results = {}
+    for index, segment in enumerate(segments):
+        segment_routes = routes[index * len(profiles):(index + 1) * len(profiles)]
+        results[segment['id']] = build_segment_result(profiles, segment_routes)
+    
+    return jsonify(results)
+
+@app.route('/api/routes/prefetch', methods=['POST'])
+def prefetch_routes():
+    """
+    Fetch routes the user is likely to request next into the cache
+    Returns at once; the routes are fetched in the background within the
+    prefetch rate budget
+    
+    Request body (POI IDs or coordinates for each side):
+    {
+        "from_poi": 12,                 // or "from": [lng, lat]
+        "to_poi_ids": [23, 7, 41],      // or "to": [[lng, lat], ...]
+        "profiles": ["car", "foot"]     // optional, defaults to ROUTE_PREFETCH_PROFILES
+    }
+    
+    Response (202):
+    {"queued": 4, "already_cached": 2, "dropped": 0}
+    """
+    data = request.json or {}
+    try:
+        from_coords = poi_coordinates[data['from_poi']] if 'from_poi' in data else tuple(data['from'])
+        targets = ([poi_coordinates[poi_id] for poi_id in data['to_poi_ids']] if 'to_poi_ids' in data
+                   else [tuple(point) for point in data.get('to', [])])
+    except KeyError as e:
+        return jsonify({'error': f"Unknown POI or missing field: {e}"}), 400
+    
+    profiles = data.get('profiles', ROUTE_PREFETCH_PROFILES)
+    jobs = [(from_coords, to_coords, to_osrm_profile(profile))
+            for to_coords in targets if to_coords != from_coords for profile in profiles]
+    return jsonify(schedule_prefetch(jobs)), 202
+
+@app.route('/api/reachable', methods=['POST'])
+def get_reachable():
+    """
+    Get the POIs reachable within a travel-time budget, fastest first
+    
+    Request body (either "from" or "from_poi"):
+    {
+        "from": [lng, lat],
+        "from_poi": 12,
+        "profile": "foot",     // optional, defaults to foot
+        "minutes": 15
+    }
+    
+    Response:
+    {
+        "reachable": [
+            {"poi_id": 7, "duration": 4, "distance": 310, "coordinates": [lng, lat]},
+            ...
+        ],
+        "count": 9,
+        "candidates": 14,      // POIs close enough in a straight line to be checked
+        "from_store": 0, "from_cache": 10, "from_osrm": 4
+    }
+    """
+    data = request.json or {}
+    if 'from_poi' in data:
+        if data['from_poi'] not in poi_coordinates:
+            return jsonify({'error': f"Unknown POI ID: {data['from_poi']}"}), 400
+        origin = poi_coordinates[data['from_poi']]
+    elif 'from' in data:
+        origin = tuple(data['from'])
+    else:
+        return jsonify({'error': 'Either "from" or "from_poi" is required'}), 400
+    
+    try:
+        minutes = float(data['minutes'])
+    except (KeyError, TypeError, ValueError):
+        return jsonify({'error': 'minutes must be a number'}), 400
+    if not 0 < minutes <= REACHABLE_MAX_MINUTES:
+        return jsonify({'error': f"minutes must be between 0 and {REACHABLE_MAX_MINUTES:g}"}), 400
+    
+    reachable, stats = fetch_reachable(origin, to_osrm_profile(data.get('profile', 'foot')), minutes)
+    return jsonify({'reachable': reachable, 'count': len(reachable), **stats})
+
+@app.route('/api/routes/matrix', methods=['POST'])
+def get_routes_matrix():
+    """
+    Get travel-time and distance matrices between many locations
+    Uses one OSRM table call per profile for the cells not already cached
+    
+    Request body (either "coordinates" or "poi_ids"):
+    {
+        "coordinates": [[lng, lat], ...],
+        "poi_ids": [1, 5, 12],
+        "profiles": ["car", "bicycle", "foot"]  // optional, defaults to all
+    }
+    
+    Response:
+    {
+        "coordinates": [[lng, lat], ...],
+        "car": {
+            "durations": [[0, 4, ...], ...],   // minutes, null if unreachable
+            "distances": [[0, 1800, ...], ...] // meters, null if unreachable
+        },
+        ...
+    }
+    """
+    data = request.json
+    profiles = data.get('profiles', ['car', 'bicycle', 'foot'])
+    
+    if 'poi_ids' in data:
+        unknown = [poi_id for poi_id in data['poi_ids'] if poi_id not in poi_coordinates]
+        if unknown:
+            return jsonify({'error': f"Unknown POI IDs: {unknown}"}), 400
+        coords = [poi_coordinates[poi_id] for poi_id in data['poi_ids']]
+    else:
+        coords = [tuple(c) for c in data.get('coordinates', [])]
+    
+    if not coords:
+        return jsonify({'error': 'Provide "coordinates" or "poi_ids"'}), 400
+    if len(coords) > ROUTE_MATRIX_MAX_LOCATIONS:
+        return jsonify({'error': f"At most {ROUTE_MATRIX_MAX_LOCATIONS} locations per matrix"}), 400
+    
+    # One matrix per profile, built concurrently
+    futures = {
+        profile: _batch_executor.submit(fetch_matrix_cached, coords, to_osrm_profile(profile))
+        for profile in profiles
+    }
+    
+    results = {'coordinates': [list(c) for c in coords]}
+    if 'poi_ids' in data:
+        results['poi_ids'] = data['poi_ids']
+    for profile, future in futures.items():
+        try:
+            results[profile] = future.result()
+        except Exception as e:
+            print(f"Error building {profile} matrix: {e}")
     
     return jsonify(results)
 
+@app.route('/api/itinerary/route', methods=['POST'])
+def get_itinerary_route():
+    """
+    Route a whole itinerary in one OSRM request per profile
+    
+    Request body (either "waypoints" or "poi_ids", at least two stops):
+    {
+        "waypoints": [[lng, lat], ...],
+        "poi_ids": [1, 5, 12],
+        "profiles": ["car", "bicycle", "foot"],  // optional, defaults to all
+        "geometry": "geojson",  // optional, same geometry options as /api/route
+        "simplify": 10,
+        "zoom": 14
+    }
+    
+    Response:
+    {
+        "car": {
+            "duration": 42,       // whole trip, minutes
+            "distance": 15000,    // whole trip, meters
+            "geometry": {...},    // merged full-trip GeoJSON
+            "legs": [
+                {"duration": 15, "distance": 5000, "geometry": {...}},
+                ...
+            ]
+        },
+        ...
+        "distance_formatted": "15.0 km"
+    }
+    """
+    data = request.json
+    profiles = data.get('profiles', ['car', 'bicycle', 'foot'])
+    
+    if 'poi_ids' in data:
+        unknown = [poi_id for poi_id in data['poi_ids'] if poi_id not in poi_coordinates]
+        if unknown:
+            return jsonify({'error': f"Unknown POI IDs: {unknown}"}), 400
+        points = [poi_coordinates[poi_id] for poi_id in data['poi_ids']]
+    else:
+        points = [tuple(p) for p in data.get('waypoints', [])]
+    
+    if len(points) < 2:
+        return jsonify({'error': 'An itinerary needs at least two stops'}), 400
+    try:
+        options = parse_geometry_options(data)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    futures = {
+        profile: _batch_executor.submit(fetch_itinerary_cached, points, to_osrm_profile(profile), options)
+        for profile in profiles
+    }
+    
+    routes = []
+    for future in futures.values():
+        try:
+            routes.append(future.result())
+        except Exception as e:
+            print(f"Error routing itinerary: {e}")
+            routes.append(None)
+    mark_cacheable(routes)
+    
+    return jsonify(build_segment_result(profiles, routes))
+
+@app.route('/api/itinerary/optimize', methods=['POST'])
+def optimize_itinerary():
+    """
+    Find the visiting order of POIs with the lowest total travel time
+    
+    Request body:
+    {
+        "poi_ids": [1, 5, 12, 7],
+        "profile": "car",      // optional, defaults to car
+        "start": 1,            // optional: POI to visit first
+        "end": 7               // optional: POI to visit last; equal to start for a round trip
+    }
+    
+    Response:
+    {
+        "order": [1, 12, 5, 7],
+        "duration": 42,            // minutes along the optimized order
+        "distance": 15000,         // meters along the optimized order
+        "original_duration": 55,   // minutes in the order given
+        "method": "held-karp",     // or "2-opt+or-opt" above TRIP_EXACT_MAX_STOPS
+        "distance_formatted": "15.0 km"
+    }
+    """
+    data = request.json
+    poi_ids = data.get('poi_ids', [])
+    profile = to_osrm_profile(data.get('profile', 'car'))
+    start, end = data.get('start'), data.get('end')
+    
+    unknown = [poi_id for poi_id in poi_ids if poi_id not in poi_coordinates]
+    if unknown:
+        return jsonify({'error': f"Unknown POI IDs: {unknown}"}), 400
+    if len(set(poi_ids)) != len(poi_ids):
+        return jsonify({'error': 'poi_ids must not repeat'}), 400
+    if len(poi_ids) < 2 or len(poi_ids) > TRIP_MAX_STOPS:
+        return jsonify({'error': f"Between 2 and {TRIP_MAX_STOPS} stops are supported"}), 400
+    for name, poi_id in (('start', start), ('end', end)):
+        if poi_id is not None and poi_id not in poi_ids:
+            return jsonify({'error': f"{name} must be one of poi_ids"}), 400
+    
+    durations, distances = trip_cost_matrix(poi_ids, profile)
+    # Durations are whole minutes, so meters break ties between equal-time orders
+    cost = durations + distances / 1e6
+    start_index = poi_ids.index(start) if start is not None else None
+    end_index = poi_ids.index(end) if end is not None else None
+    round_trip = start is not None and start == end
+    
+    order, method = optimize_order(cost, start_index, end_index, TRIP_EXACT_MAX_STOPS)
+    duration = path_cost(durations, order, round_trip)
+    if duration >= UNREACHABLE:
+        return jsonify({'error': 'Some stops could not be routed'}), 502
+    distance = path_cost(distances, order, round_trip)
+    
+    return jsonify({
+        'order': [poi_ids[i] for i in order],
+        'duration': round(duration),
+        'distance': distance,
+        'original_duration': round(path_cost(durations, list(range(len(poi_ids))), round_trip)),
+        'method': method,
+        'distance_formatted': format_distance(distance)
+    })
+
+@app.before_request
+def start_request_metrics():
+    g.request_start = time.perf_counter()
+    g.metrics_endpoint = request.endpoint or 'unknown'
+    metrics.http_in_flight.inc(endpoint=g.metrics_endpoint)
+
+@app.after_request
+def record_request_metrics(response):
+    endpoint = g.get('metrics_endpoint', request.endpoint or 'unknown')
+    metrics.http_requests.inc(endpoint=endpoint, status=response.status_code)
+    if 'request_start' in g:
+        metrics.http_latency.observe(time.perf_counter() - g.request_start, endpoint=endpoint)
+    if not response.is_streamed and response.content_length is not None:
+        metrics.http_response_bytes.observe(response.content_length, endpoint=endpoint)
+    return response
+
+@app.after_request
+def finish_response(response):
+    """
+    Add cache validators to cacheable route responses, then compress
+    Registered after the metrics hook so it runs first and the metrics see
+    the bytes actually sent
+    """
+    if 'cache_max_age' in g:
+        set_cache_validators(response, request, g.cache_max_age)
+    return compress_response(response, request.accept_encodings, RESPONSE_COMPRESS_MIN_BYTES,
+                             RESPONSE_GZIP_LEVEL, RESPONSE_BROTLI_QUALITY)
+
+@app.teardown_request
+def finish_request_metrics(error=None):
+    if 'metrics_endpoint' in g:
+        metrics.http_in_flight.dec(endpoint=g.metrics_endpoint)
+
+# route_cache.info() scans the whole cache (COUNT/SUM in SQLite, the keyspace
+# in Redis), so scrapes reuse its result for this many seconds
+CACHE_METRICS_TTL = float(os.environ.get('CACHE_METRICS_TTL', '30'))
+_cache_metrics_lock = threading.Lock()
+_cache_metrics_info: Tuple[float, Optional[Dict]] = (0.0, None)
+
+def collect_cache_metrics():
+    """Refresh cache metrics right before a scrape"""
+    global _cache_metrics_info
+    with _cache_metrics_lock:
+        refreshed_at, info = _cache_metrics_info
+        if info is None or time.monotonic() - refreshed_at >= CACHE_METRICS_TTL:
+            info = route_cache.info()
+            _cache_metrics_info = (time.monotonic(), info)
+        # SingleFlight keeps its own running total; advance the counter to it
+        coalesced = route_flights.info()['coalesced_waits']
+        metrics.coalesced_waits.inc(max(0, coalesced - metrics.coalesced_waits.value()))
+    metrics.cache_entries.set(info['size'])
+    metrics.cache_bytes.set(info['bytes'])
+
+metrics.registry.collectors.append(collect_cache_metrics)
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Routing metrics in the Prometheus text exposition format"""
+    return Response(metrics.registry.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/api/metrics/summary', methods=['GET'])
+def metrics_summary():
+    """Latency percentiles (p50/p95/p99) for OSRM calls and API endpoints"""
+    return jsonify({
+        'osrm': metrics.latency_summary(metrics.osrm_latency),
+        'endpoints': metrics.latency_summary(metrics.http_latency)
+    })
+
 @app.route('/api/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
@@ -176,27 +1472,136 @@ def health_check():
             'car': OSRM_CAR_URL,
             'bicycle': OSRM_BICYCLE_URL,
             'foot': OSRM_FOOT_URL
-        }
+        },
+        'osrm_pools': osrm_clients.info()
     })
 
+def admin_token_error():
+    """403 response unless the request carries ROUTING_ADMIN_TOKEN, else None"""
+    if not ROUTING_ADMIN_TOKEN:
+        return jsonify({'error': 'Set ROUTING_ADMIN_TOKEN to enable this endpoint'}), 403
+    if not hmac.compare_digest(request.headers.get('X-Admin-Token', ''), ROUTING_ADMIN_TOKEN):
+        return jsonify({'error': 'Admin token required'}), 403
+    return None
+
+@app.route('/api/cache/export', methods=['GET'])
+def export_cache():
+    """
+    Download the route cache as a compressed snapshot
+    Query: ?codec=zstd|zlib (defaults to zstd when available)
+    Requires the X-Admin-Token header
+    """
+    error = admin_token_error()
+    if error:
+        return error
+    
+    codec = request.args.get('codec')
+    codecs = {name: codec_id for codec_id, name in CODEC_NAMES.items()}
+    if codec is not None and codec not in codecs:
+        return jsonify({'error': f"codec must be one of {', '.join(codecs)}"}), 400
+    
+    return Response(
+        iter_snapshot(route_cache.iter_entries(), codecs.get(codec)),
+        mimetype='application/octet-stream',
+        headers={'Content-Disposition': 'attachment; filename=lakbai-route-cache.lkcs'}
+    )
+
+@app.route('/api/cache/import', methods=['POST'])
+def import_cache():
+    """
+    Load a snapshot from /api/cache/export into the route cache
+    The snapshot is the raw request body or a "snapshot" form file; entries
+    keep their age, so expired ones are skipped and newer local ones win.
+    Requires the X-Admin-Token header
+    """
+    error = admin_token_error()
+    if error:
+        return error
+    
+    source = request.files['snapshot'].stream if 'snapshot' in request.files else request.stream
+    start = time.time()
+    try:
+        result = import_snapshot(route_cache, source)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    return jsonify({**result, 'elapsed_ms': round((time.time() - start) * 1000)})
+
+def load_cache_snapshot(source: str) -> None:
+    """Warm the cache from a snapshot file or URL; a bad snapshot only logs an error"""
+    start = time.time()
+    try:
+        if source.startswith(('http://', 'https://')):
+            headers = {'X-Admin-Token': ROUTING_ADMIN_TOKEN} if ROUTING_ADMIN_TOKEN else {}
+            response = requests.get(source, headers=headers, stream=True, timeout=(3.05, 60))
+            response.raise_for_status()
+            response.raw.decode_content = True
+            result = import_snapshot(route_cache, response.raw)
+        else:
+            with open(source, 'rb') as f:
+                result = import_snapshot(route_cache, f)
+        print(f"✅ Loaded {result['imported']} cached routes from {source} in {time.time() - start:.1f}s")
+    except Exception as e:
+        print(f"❌ Could not load cache snapshot {source}: {e}")
+
 @app.route('/api/cache/clear', methods=['POST'])
 def clear_cache():
-    """Clear the route cache"""
-    fetch_route_cached.cache_clear()
+    """
+    Clear the route cache
+    
+    Request body (optional):
+    {
+        "failures_only": true  // only forget failed lookups, keep good routes
+    }
+    """
+    data = request.get_json(silent=True) or {}
+    if data.get('failures_only'):
+        route_cache.clear_failures()
+        return jsonify({'message': 'Failed lookups cleared successfully'})
+    
+    route_cache.clear()
+    # Trip matrices were built from the cleared routes
+    with _trip_matrices_lock:
+        _trip_matrices.clear()
+    with _lookup_stats_lock:
+        lookup_stats.update(snapped_lookups=0, snapped_hits=0, store_hits=0, estimated_routes=0)
     return jsonify({'message': 'Cache cleared successfully'})
 
 @app.route('/api/cache/info', methods=['GET'])
 def cache_info():
-    """Get cache statistics"""
-    info = fetch_route_cached.cache_info()
+    """
+    Get cache statistics
+    Top-level hit/miss counters and storage figures are totals over every
+    worker sharing the cache; "worker" holds counters kept only by the
+    process that answered (lookups, in-flight coalescing, prefetch, estimator)
+    """
+    with _lookup_stats_lock:
+        lookups = dict(lookup_stats)
     return jsonify({
-        'hits': info.hits,
-        'misses': info.misses,
-        'size': info.currsize,
-        'maxsize': info.maxsize,
-        'hit_rate': f"{(info.hits / (info.hits + info.misses) * 100):.2f}%" if (info.hits + info.misses) > 0 else "0%"
+        **route_cache.info(),
+        'route_store': route_store.info() if route_store else None,
+        'key_quantization': ROUTE_KEY_QUANTIZATION,
+        'snap_radius_m': ROUTE_SNAP_RADIUS_M,
+        'worker': {
+            'id': route_cache.worker,
+            **lookups,
+            **route_flights.info(),
+            'prefetch': prefetch_info(),
+            'estimator': route_estimator.info()
+        }
     })
 
+if ROUTE_CACHE_SNAPSHOT:
+    load_cache_snapshot(ROUTE_CACHE_SNAPSHOT)
+
 if __name__ == '__main__':
+    import argparse
+    
+    parser = argparse.ArgumentParser(description='LAKBAI routing API development server')
+    parser.add_argument('--cache-snapshot', help='snapshot file or URL to load into the cache before serving')
+    args = parser.parse_args()
+    if args.cache_snapshot:
+        load_cache_snapshot(args.cache_snapshot)
+    
     # Development server
     app.run(host='0.0.0.0', port=5001, debug=True)
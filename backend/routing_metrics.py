@@ -0,0 +1,266 @@
+"""
+Routing metrics for LAKBAI
+Thread-safe counters, gauges and histograms rendered in the Prometheus text format
+"""
+
+import bisect
+import math
+import threading
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+# Latency buckets in seconds, from cache hits up to the OSRM timeout
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+# Payload size buckets in bytes
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+LabelValues = Tuple[str, ...]
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = '') -> str:
+    pairs = [f'{name}="{value}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+class Metric:
+    """Base class holding one value per label combination"""
+    kind = 'untyped'
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+        self._values: Dict[LabelValues, object] = {}
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        return tuple(str(labels.get(name, '')) for name in self.label_names)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return self.header() + [
+            f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}" for key, value in items
+        ]
+
+class Gauge(Counter):
+    kind = 'gauge'
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def track(self, **labels) -> 'GaugeTracker':
+        """Context manager that counts the enclosed block as in flight"""
+        return GaugeTracker(self, labels)
+
+class GaugeTracker:
+    def __init__(self, gauge: Gauge, labels: Dict[str, str]):
+        self.gauge = gauge
+        self.labels = labels
+
+    def __enter__(self):
+        self.gauge.inc(**self.labels)
+
+    def __exit__(self, *exc):
+        self.gauge.dec(**self.labels)
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = {'counts': [0] * (len(self.buckets) + 1), 'sum': 0.0, 'count': 0}
+            state['counts'][index] += 1
+            state['sum'] += value
+            state['count'] += 1
+
+    def quantile(self, q: float, **labels) -> Optional[float]:
+        """Estimate a quantile by linear interpolation within buckets, like histogram_quantile()"""
+        with self._lock:
+            state = self._values.get(self._key(labels))
+            if state is None or state['count'] == 0:
+                return None
+            counts = list(state['counts'])
+            total = state['count']
+
+        rank = q * total
+        cumulative = 0
+        for index, count in enumerate(counts):
+            if cumulative + count >= rank and count > 0:
+                if index == len(self.buckets):
+                    return self.buckets[-1]
+                lower = self.buckets[index - 1] if index > 0 else 0.0
+                upper = self.buckets[index]
+                return lower + (upper - lower) * (rank - cumulative) / count
+            cumulative += count
+        return self.buckets[-1]
+
+    def label_sets(self) -> List[Dict[str, str]]:
+        with self._lock:
+            return [dict(zip(self.label_names, key)) for key in sorted(self._values)]
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted((key, {'counts': list(s['counts']), 'sum': s['sum'], 'count': s['count']})
+                           for key, s in self._values.items())
+        lines = self.header()
+        for key, state in items:
+            cumulative = 0
+            for bound, count in zip(list(self.buckets) + [math.inf], state['counts']):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.label_names, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.label_names, key)} {_format_value(state['sum'])}")
+            lines.append(f"{self.name}_count{_format_labels(self.label_names, key)} {state['count']}")
+        return lines
+
+class Registry:
+    """Collection of metrics plus callbacks that refresh gauges at scrape time"""
+
+    def __init__(self):
+        self.metrics: List[Metric] = []
+        self.collectors: List[Callable[[], None]] = []
+
+    def register(self, metric: Metric) -> Metric:
+        self.metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, documentation: str, labels: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labels))
+
+    def gauge(self, name: str, documentation: str, labels: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labels))
+
+    def histogram(self, name: str, documentation: str, labels: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labels, buckets))
+
+    def render(self) -> str:
+        """Render every metric in the Prometheus text exposition format"""
+        for collect in self.collectors:
+            try:
+                collect()
+            except Exception as e:
+                print(f"Metrics collector failed: {e}")
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+registry = Registry()
+
+route_lookups = registry.counter(
+    'lakbai_route_lookups_total',
+    'Route lookups by profile and outcome (store, hit, stale, miss, negative)',
+    ['profile', 'result']
+)
+route_fetch_in_flight = registry.gauge(
+    'lakbai_route_fetch_in_flight',
+    'fetch_route_cached calls currently running',
+    ['profile']
+)
+osrm_latency = registry.histogram(
+    'lakbai_osrm_request_duration_seconds',
+    'Upstream OSRM request latency',
+    ['profile', 'service']
+)
+osrm_errors = registry.counter(
+    'lakbai_osrm_errors_total',
+    'Failed upstream OSRM requests by kind (timeout, connection, http, bad_response, no_route)',
+    ['profile', 'service', 'kind']
+)
+osrm_retries = registry.counter(
+    'lakbai_osrm_retries_total',
+    'OSRM requests retried after a connection error, timeout or 429/5xx response',
+    ['host']
+)
+osrm_in_flight = registry.gauge(
+    'lakbai_osrm_in_flight',
+    'Upstream OSRM requests currently open',
+    ['profile']
+)
+osrm_response_bytes = registry.histogram(
+    'lakbai_osrm_response_bytes',
+    'Upstream OSRM response payload size',
+    ['profile', 'service'],
+    SIZE_BUCKETS
+)
+http_requests = registry.counter(
+    'lakbai_http_requests_total',
+    'Routing API requests by endpoint and status code',
+    ['endpoint', 'status']
+)
+http_latency = registry.histogram(
+    'lakbai_http_request_duration_seconds',
+    'Routing API request latency until the response is handed to the server',
+    ['endpoint']
+)
+http_in_flight = registry.gauge(
+    'lakbai_http_in_flight',
+    'Routing API requests currently being handled',
+    ['endpoint']
+)
+http_response_bytes = registry.histogram(
+    'lakbai_http_response_bytes',
+    'Routing API response payload size (buffered responses only)',
+    ['endpoint'],
+    SIZE_BUCKETS
+)
+
+cache_entries = registry.gauge(
+    'lakbai_route_cache_entries',
+    'Entries in the shared route cache'
+)
+cache_bytes = registry.gauge(
+    'lakbai_route_cache_bytes',
+    'Payload bytes stored in the shared route cache'
+)
+coalesced_waits = registry.counter(
+    'lakbai_route_coalesced_waits_total',
+    'Route lookups that waited on an identical in-flight OSRM call'
+)
+
+def latency_summary(histogram: Histogram) -> Dict[str, Dict[str, Optional[float]]]:
+    """p50/p95/p99 in milliseconds for every label set of a latency histogram"""
+    summary = {}
+    for labels in histogram.label_sets():
+        name = '/'.join(labels.values()) or 'all'
+        summary[name] = {
+            f"p{int(q * 100)}_ms": (round(value * 1000, 2) if value is not None else None)
+            for q in (0.5, 0.95, 0.99)
+            for value in [histogram.quantile(q, **labels)]
+        }
+    return summary
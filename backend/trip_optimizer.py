@@ -0,0 +1,191 @@
+"""
+Trip order optimizer for LAKBAI
+Finds the visiting order with the lowest total cost over an asymmetric cost
+matrix: exact Held-Karp for small trips, 2-opt plus Or-opt local search above
+that. Both work on a closed tour through an origin node, which is how fixed
+start/end stops and open trips are expressed.
+"""
+
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+# Stand-in cost for unreachable legs and forbidden dummy edges
+UNREACHABLE = 1e7
+
+# Longest segment Or-opt tries to move elsewhere in the tour
+OR_OPT_MAX_SEGMENT = 3
+
+def _closed_problem(cost: np.ndarray, start: Optional[int], end: Optional[int]) -> Tuple[np.ndarray, bool]:
+    """
+    Express the trip as a closed tour starting at node 0
+    A round trip (start == end) is the matrix itself rotated so start is node 0.
+    Otherwise a dummy node 0 is added whose edges pin the start and end, or
+    cost nothing when they are free. Returns (matrix, has_dummy).
+    """
+    n = len(cost)
+    if start is not None and start == end:
+        order = [start] + [i for i in range(n) if i != start]
+        return cost[np.ix_(order, order)], False
+
+    closed = np.full((n + 1, n + 1), UNREACHABLE)
+    closed[1:, 1:] = cost
+    closed[0, 0] = 0
+    if start is None:
+        closed[0, 1:] = 0
+    else:
+        closed[0, start + 1] = 0
+    if end is None:
+        closed[1:, 0] = 0
+    else:
+        closed[end + 1, 0] = 0
+    return closed, True
+
+def held_karp(closed: np.ndarray) -> np.ndarray:
+    """
+    Exact shortest closed tour from node 0, O(2^k * k^2) for k = len - 1
+    Subsets are processed one size at a time so every (subset, last node)
+    update for a given last node is a single vectorized min
+    """
+    k = len(closed) - 1
+    if k == 0:
+        return np.array([0])
+    size = 1 << k
+    dp = np.full((size, k), np.inf)
+    parent = np.zeros((size, k), dtype=np.int16)
+    bits = np.arange(k)
+    single = 1 << bits
+    dp[single, bits] = closed[0, 1:]
+
+    masks = np.arange(size)
+    popcount = np.zeros(size, dtype=np.int16)
+    for bit in range(k):
+        popcount += (masks >> bit) & 1
+    edges = closed[1:, 1:]
+
+    for count in range(2, k + 1):
+        layer = masks[popcount == count]
+        for j in range(k):
+            members = layer[(layer >> j) & 1 == 1]
+            previous = members ^ (1 << j)
+            candidates = dp[previous] + edges[:, j]
+            best = np.argmin(candidates, axis=1)
+            dp[members, j] = candidates[np.arange(len(members)), best]
+            parent[members, j] = best
+
+    full = size - 1
+    last = int(np.argmin(dp[full] + closed[1:, 0]))
+    tour = []
+    mask = full
+    while mask:
+        tour.append(last + 1)
+        previous_last = int(parent[mask, last])
+        mask ^= 1 << last
+        last = previous_last
+    return np.array([0] + tour[::-1])
+
+def nearest_neighbour(closed: np.ndarray) -> np.ndarray:
+    """Greedy starting tour from node 0"""
+    n = len(closed)
+    visited = np.zeros(n, dtype=bool)
+    visited[0] = True
+    tour = [0]
+    for _ in range(n - 1):
+        row = np.where(visited, np.inf, closed[tour[-1]])
+        nxt = int(np.argmin(row))
+        visited[nxt] = True
+        tour.append(nxt)
+    return np.array(tour)
+
+def two_opt_move(closed: np.ndarray, tour: np.ndarray) -> Optional[Tuple[int, int, float]]:
+    """
+    Best reversal of the segment tour[i+1..j] as (i, j, gain), or None
+    Costs are asymmetric, so the reversed segment is priced from prefix sums
+    of its edges in both directions
+    """
+    n = len(tour)
+    nxt = np.roll(tour, -1)
+    forward = np.concatenate(([0], np.cumsum(closed[tour[:-1], tour[1:]])))
+    backward = np.concatenate(([0], np.cumsum(closed[tour[1:], tour[:-1]])))
+
+    i = np.arange(n - 1)[:, None]
+    j = np.arange(1, n)[None, :]
+    valid = j > i + 1
+    first, last = np.minimum(i + 1, n - 1), j
+    removed = closed[tour[i], tour[first]] + closed[tour[last], nxt[last]] + (forward[last] - forward[first])
+    added = closed[tour[i], tour[last]] + closed[tour[first], nxt[last]] + (backward[last] - backward[first])
+    gain = np.where(valid, removed - added, 0)
+
+    best = np.unravel_index(np.argmax(gain), gain.shape)
+    if gain[best] <= 1e-9:
+        return None
+    return int(best[0]), int(best[1]) + 1, float(gain[best])
+
+def or_opt_move(closed: np.ndarray, tour: np.ndarray) -> Optional[Tuple[int, int, int, float]]:
+    """Best relocation of a segment of 1-3 stops, as (start, length, insert after, gain), or None"""
+    n = len(tour)
+    nxt = np.roll(tour, -1)
+    best = None
+    for length in range(1, min(OR_OPT_MAX_SEGMENT, n - 2) + 1):
+        for start in range(1, n - length + 1):
+            end = start + length - 1
+            before, after = tour[start - 1], nxt[end]
+            head, tail = tour[start], tour[end]
+            removal_gain = closed[before, head] + closed[tail, after] - closed[before, after]
+
+            # Insert between tour[p] and nxt[p] for every p outside the segment
+            positions = np.array([p for p in range(n) if p < start - 1 or p > end])
+            if len(positions) == 0:
+                continue
+            insert_cost = closed[tour[positions], head] + closed[tail, nxt[positions]] - closed[tour[positions], nxt[positions]]
+            index = int(np.argmin(insert_cost))
+            gain = removal_gain - insert_cost[index]
+            if gain > 1e-9 and (best is None or gain > best[3]):
+                best = (start, length, int(positions[index]), float(gain))
+    return best
+
+def local_search(closed: np.ndarray, tour: np.ndarray, max_rounds: int = 1000) -> np.ndarray:
+    """Apply the best 2-opt or Or-opt move until neither improves the tour"""
+    tour = tour.copy()
+    for _ in range(max_rounds):
+        reversal = two_opt_move(closed, tour)
+        relocation = or_opt_move(closed, tour)
+        if reversal is None and relocation is None:
+            break
+        if relocation is None or (reversal is not None and reversal[2] >= relocation[3]):
+            i, j, _ = reversal
+            tour[i + 1:j + 1] = tour[i + 1:j + 1][::-1]
+        else:
+            start, length, after, _ = relocation
+            segment = tour[start:start + length]
+            rest = np.concatenate((tour[:start], tour[start + length:]))
+            insert_at = after + 1 if after < start else after + 1 - length
+            tour = np.concatenate((rest[:insert_at], segment, rest[insert_at:]))
+    return tour
+
+def optimize_order(cost: np.ndarray, start: Optional[int] = None, end: Optional[int] = None,
+                   exact_max_stops: int = 12) -> Tuple[List[int], str]:
+    """
+    Lowest-cost visiting order of every stop in an n x n cost matrix
+    `start`/`end` pin the first/last stop (equal for a round trip). Returns
+    (stop indices in visiting order, method used)
+    """
+    n = len(cost)
+    if n <= 1:
+        return list(range(n)), 'trivial'
+
+    closed, has_dummy = _closed_problem(np.asarray(cost, dtype=float), start, end)
+    if len(closed) - 1 <= exact_max_stops:
+        tour, method = held_karp(closed), 'held-karp'
+    else:
+        tour, method = local_search(closed, nearest_neighbour(closed)), '2-opt+or-opt'
+
+    if has_dummy:
+        return [int(node) - 1 for node in tour[1:]], method
+    order = [start] + [i for i in range(n) if i != start]
+    return [order[int(node)] for node in tour], method
+
+def path_cost(cost: np.ndarray, order: List[int], round_trip: bool = False) -> float:
+    """Total cost of visiting `order`, returning to the first stop when `round_trip`"""
+    legs = list(zip(order, order[1:] + order[:1])) if round_trip else list(zip(order, order[1:]))
+    return float(sum(cost[i, j] for i, j in legs))